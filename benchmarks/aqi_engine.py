@@ -0,0 +1,129 @@
+"""Benchmark the DAQI engine over a year of hourly rollups for hundreds of schools.
+
+Builds a throw-away test database (in-memory SQLite, or test_<name> on
+PostgreSQL when DATABASE_URL is set), fills it with synthetic hourly
+rollups, then prints the median timing of load_hourly_means() and assess()
+against loading the same rows through the ORM's values_list(). The target
+is a year for hundreds of schools in well under a second.
+
+Rows come through the cursor on every backend, so building a tuple per
+row sets the floor. SQLite's is the higher of the two, so check the target
+against PostgreSQL (DATABASE_URL=postgres://...).
+
+    python benchmarks/aqi_engine.py --schools 300 --days 365
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'schools_airquality_MSP3.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only')
+
+import django  # noqa: E402
+
+django.setup()
+
+import numpy as np  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from monitoring.aqi import HOUR_SECONDS, assess, load_hourly_means  # noqa: E402
+from monitoring.models import School, ReadingRollup, rollup_bucket  # noqa: E402
+
+POLLUTANT = 'PM10'
+
+# Seconds, for a year of data
+TARGET = 1.0
+
+
+def populate(school_count, hours, until):
+    """Insert school_count schools with an hourly PM10 rollup for each of `hours` hours before until"""
+    schools = School.objects.bulk_create(
+        School(name=f"School {i}", location="London, UK", latitude=51.4 + i / 1000, longitude=-0.1)
+        for i in range(school_count)
+    )
+    starts = [
+        connection.ops.adapt_datetimefield_value(until - timedelta(hours=hour))
+        for hour in range(hours, 0, -1)
+    ]
+    # Millions of rows: bulk_create would build a model instance for each
+    table = ReadingRollup._meta.db_table
+    sql = (
+        f"INSERT INTO {table} (school_id, pollutant, period, bucket_start, count, total, minimum, maximum, peak_measured_at) "
+        "VALUES (%s, %s, 'hour', %s, 1, %s, %s, %s, %s)"
+    )
+    with connection.cursor() as cursor:
+        for school in schools:
+            cursor.executemany(sql, [
+                (school.id, POLLUTANT, start, value, value, value, start)
+                for start, value in ((start, random.uniform(5, 80)) for start in starts)
+            ])
+        cursor.execute(f"ANALYZE {table}")
+
+
+def load_via_orm(pollutant, since, until):
+    """The values_list() load this engine started with: a datetime per row, converted in Python"""
+    rows = list(ReadingRollup.objects.filter(
+        period='hour', pollutant=pollutant, bucket_start__gte=since, bucket_start__lt=until
+    ).order_by().values_list('school_id', 'bucket_start', 'total', 'count'))
+    school_col, start_col, total_col, count_col = zip(*rows)
+    ids, rows_index = np.unique(np.array(school_col, dtype=np.int64), return_inverse=True)
+    starts = np.array([start.timestamp() for start in start_col], dtype=np.float64)
+    hour_index = ((starts - since.timestamp()) // HOUR_SECONDS).astype(np.int64)
+    hourly = np.full((len(ids), int((until - since).total_seconds() // HOUR_SECONDS)), np.nan)
+    hourly[rows_index, hour_index] = np.array(total_col) / np.array(count_col)
+    return ids, hourly
+
+
+def measure(run, repeats):
+    """Median runtime in seconds over `repeats` runs"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schools', type=int, default=300)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--repeats', type=int, default=5)
+    args = parser.parse_args()
+
+    until = rollup_bucket(timezone.now(), 'hour')
+    since = until - timedelta(days=args.days)
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        started = time.perf_counter()
+        populate(args.schools, args.days * 24, until)
+        print(f"{ReadingRollup.objects.count()} synthetic hourly rollups on {connection.vendor} "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        ids, hourly = load_hourly_means(POLLUTANT, since, until)
+        orm_ids, orm_hourly = load_via_orm(POLLUTANT, since, until)
+        assert np.array_equal(ids, orm_ids) and np.allclose(hourly, orm_hourly, equal_nan=True)
+
+        runs = {
+            'values_list (before)': lambda: load_via_orm(POLLUTANT, since, until),
+            'load_hourly_means': lambda: load_hourly_means(POLLUTANT, since, until),
+            'assess': lambda: assess(POLLUTANT, since, until),
+        }
+        print("\n===== median s =====")
+        for name, run in runs.items():
+            print(f"{name:22} {measure(run, args.repeats):7.3f}")
+        print(f"target for assess: under {TARGET:.1f}s (check on postgresql)")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,145 @@
+"""Benchmark AirQualityReading lookups with and without the time-series indexes.
+
+Builds a throw-away test database (in-memory SQLite, or test_<name> on
+PostgreSQL when DATABASE_URL is set), fills it with synthetic hourly
+readings, then prints the query plan and median timing of each School
+lookup before and after the composite indexes exist.
+
+    python benchmarks/reading_indexes.py --schools 100 --hours 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'schools_airquality_MSP3.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from django.utils import timezone  # noqa: E402
+from monitoring.models import School, AirQualityReading  # noqa: E402
+
+POLLUTANTS = ['PM10', 'NO2', 'PM2.5']
+
+
+def populate(school_count, hours):
+    """Insert school_count schools with an hourly reading per pollutant for `hours` hours"""
+    schools = School.objects.bulk_create(
+        School(name=f"School {i}", location="London, UK", latitude=51.4 + i / 1000, longitude=-0.1)
+        for i in range(school_count)
+    )
+    start = timezone.now() - timedelta(hours=hours)
+    batch = []
+    for school in schools:
+        for pollutant in POLLUTANTS:
+            for hour in range(hours):
+                batch.append(AirQualityReading(
+                    school_id=school.id,
+                    pollutant=pollutant,
+                    value=random.uniform(5, 80),
+                    measured_at=start + timedelta(hours=hour),
+                ))
+                if len(batch) >= 20000:
+                    AirQualityReading.objects.bulk_create(batch)
+                    batch = []
+    AirQualityReading.objects.bulk_create(batch)
+    return [school.id for school in schools]
+
+
+def lookups(school_ids, hours):
+    """The raw-reading access patterns used by School's methods and api_schools"""
+    def school():
+        return School(id=random.choice(school_ids))
+
+    def peak_day():
+        # Peak and top-N lookups find their buckets in the rollups, then read one day of raw rows
+        start = timezone.now() - timedelta(hours=random.randrange(24, hours))
+        return {'measured_at__gte': start, 'measured_at__lt': start + timedelta(days=1)}
+
+    return {
+        'get_latest_reading': lambda: school().readings.filter(pollutant='PM10').order_by('-measured_at')[:1],
+        'get_top_readings (one day)': lambda: school().readings.filter(pollutant='PM10', **peak_day()).order_by('-value')[:5],
+        'api_schools (all schools)': lambda: School.objects.with_latest_readings(['PM10', 'NO2']),
+    }
+
+
+def measure(name, build_queryset, repeats):
+    """Print the plan of one query and its median runtime over `repeats` runs"""
+    print(f"\n--- {name}")
+    print(build_queryset().explain())
+
+    timings = []
+    for _ in range(repeats):
+        queryset = build_queryset()
+        started = time.perf_counter()
+        list(queryset)
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"median {statistics.median(timings):.2f} ms over {repeats} run(s)")
+    return statistics.median(timings)
+
+
+def set_indexes(enabled):
+    """Add or drop the unique (school, pollutant, measured_at) index and the measured_at index"""
+    meta = AirQualityReading._meta
+    constraints, indexes = list(meta.constraints), list(meta.indexes)
+
+    with connection.schema_editor() as editor:
+        if connection.vendor == 'sqlite':
+            # SQLite can only drop a table-level unique constraint by rebuilding the table
+            if not enabled:
+                meta.constraints, meta.indexes = [], []
+            try:
+                editor._remake_table(AirQualityReading)
+            finally:
+                meta.constraints, meta.indexes = constraints, indexes
+        else:
+            for item in constraints + indexes:
+                add = editor.add_constraint if item in constraints else editor.add_index
+                remove = editor.remove_constraint if item in constraints else editor.remove_index
+                (add if enabled else remove)(AirQualityReading, item)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {meta.db_table}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schools', type=int, default=100)
+    parser.add_argument('--hours', type=int, default=2000, help='Hourly readings per school and pollutant')
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        started = time.perf_counter()
+        school_ids = populate(args.schools, args.hours)
+        rows = AirQualityReading.objects.count()
+        print(f"{rows} synthetic readings on {connection.vendor} in {time.perf_counter() - started:.1f}s")
+
+        results = {}
+        for label, enabled in (('before', False), ('after', True)):
+            # Migrations created the indexes, so drop them for the "before" pass and restore them after
+            set_indexes(enabled)
+            print(f"\n===== {label}: time-series indexes {'present' if enabled else 'dropped'} =====")
+            for name, build_queryset in lookups(school_ids, args.hours).items():
+                results.setdefault(name, {})[label] = measure(name, build_queryset, args.repeats)
+
+        print("\n===== summary (median ms) =====")
+        for name, timing in results.items():
+            print(f"{name:28} before {timing['before']:9.2f}   after {timing['after']:9.2f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Benchmark School viewport and nearest-school lookups on the grid_cell index.
+
+Builds a throw-away test database (in-memory SQLite, or test_<name> on
+PostgreSQL when DATABASE_URL is set), scatters synthetic schools across
+Great Britain, then prints the median timing of bbox and nearest lookups
+against a full-table scan that filters in Python.
+
+    python benchmarks/school_lookups.py --schools 50000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'schools_airquality_MSP3.settings')
+os.environ.setdefault('SECRET_KEY', 'benchmark-only')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.db import connection  # noqa: E402
+from monitoring.models import School, grid_cell, haversine_km  # noqa: E402
+
+# Roughly the extent of Great Britain
+WEST, SOUTH, EAST, NORTH = -5.5, 50.0, 1.7, 58.5
+
+
+def populate(school_count):
+    """Insert school_count schools at random points, filling grid_cell as save() would"""
+    schools = []
+    for i in range(school_count):
+        latitude, longitude = random.uniform(SOUTH, NORTH), random.uniform(WEST, EAST)
+        schools.append(School(
+            name=f"School {i}",
+            location="Great Britain",
+            latitude=latitude,
+            longitude=longitude,
+            grid_cell=grid_cell(latitude, longitude),
+        ))
+    School.objects.bulk_create(schools, batch_size=5000)
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"ANALYZE {School._meta.db_table}")
+
+
+def random_point():
+    return random.uniform(SOUTH + 1, NORTH - 1), random.uniform(WEST + 1, EAST - 1)
+
+
+def viewport():
+    """A street-level map viewport around a random point"""
+    latitude, longitude = random_point()
+    return longitude - 0.02, latitude - 0.01, longitude + 0.02, latitude + 0.01
+
+
+def scan_bbox(west, south, east, north):
+    return [
+        school for school in School.objects.all()
+        if south <= school.latitude <= north and west <= school.longitude <= east
+    ]
+
+
+def scan_nearest(latitude, longitude, k):
+    schools = list(School.objects.all())
+    return sorted(schools, key=lambda s: haversine_km(latitude, longitude, s.latitude, s.longitude))[:k]
+
+
+def lookups():
+    return {
+        'within_bbox': lambda: list(School.objects.within_bbox(*viewport())),
+        'scan bbox': lambda: scan_bbox(*viewport()),
+        'nearest k=5': lambda: School.objects.nearest(*random_point(), k=5),
+        'scan nearest k=5': lambda: scan_nearest(*random_point(), 5),
+    }
+
+
+def measure(lookup, repeats):
+    """Median runtime of one lookup in milliseconds over `repeats` runs"""
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        lookup()
+        timings.append((time.perf_counter() - started) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--schools', type=int, default=50000)
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0)
+    try:
+        populate(args.schools)
+        print(f"{args.schools} synthetic schools on {connection.vendor}")
+
+        bbox = School.objects.within_bbox(*viewport())
+        print(f"\n--- within_bbox plan\n{bbox.explain()}")
+
+        print("\n===== median ms =====")
+        for name, lookup in lookups().items():
+            # Full scans are slow, so a few runs are enough to show the gap
+            repeats = args.repeats if not name.startswith('scan') else min(args.repeats, 5)
+            print(f"{name:20} {measure(lookup, repeats):9.3f}")
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,127 @@
+from datetime import datetime
+from django import forms
 from django.contrib import admin
-from .models import School, AirQualityReading
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.functional import cached_property
+from .models import School, AirQualityReading, SensorMetadata, FetchRun
+
+# Counts are exact up to here; beyond it the changelist shows this many rows
+# (or the planner's estimate when unfiltered) rather than COUNT(*) every page
+COUNT_LIMIT = 10000
+
+
+def estimated_row_count(model):
+    """The planner's row estimate for a table on PostgreSQL, or None"""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass", [model._meta.db_table])
+        row = cursor.fetchone()
+    # -1 until the table has been vacuumed or analysed
+    return row[0] if row and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator that never runs an unbounded COUNT(*) on a large table"""
+
+    @cached_property
+    def count(self):
+        if not self.object_list.query.where:
+            estimate = estimated_row_count(self.object_list.model)
+            if estimate is not None and estimate > COUNT_LIMIT:
+                return estimate
+        # COUNT over a LIMIT subquery stops after COUNT_LIMIT rows
+        return self.object_list[:COUNT_LIMIT].count()
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings that keep page loads constant-time on tables with millions of rows"""
+    paginator = EstimatedCountPaginator
+    # Skip the second, unfiltered COUNT(*) behind "N of M selected"
+    show_full_result_count = False
+
+
+class SchoolAutocompleteFilter(admin.SimpleListFilter):
+    """Filter by school through the admin's autocomplete, loading only the selected school"""
+    title = 'school'
+    parameter_name = 'school'
+    template = 'admin/autocomplete_filter.html'
+
+    def __init__(self, request, params, model, model_admin):
+        super().__init__(request, params, model, model_admin)
+        field = forms.ModelChoiceField(
+            queryset=School.objects.all(),
+            required=False,
+            widget=AutocompleteSelect(model._meta.get_field('school'), model_admin.admin_site),
+        )
+        self.widget = field.widget
+
+    def has_output(self):
+        return True
+
+    def lookups(self, request, model_admin):
+        return []
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(school_id=self.value())
+        return queryset
+
+    def choices(self, changelist):
+        yield {
+            'query_string': changelist.get_query_string(remove=[self.parameter_name]),
+            'widget': self.widget.render(self.parameter_name, self.value(), attrs={'id': 'id_school_filter'}),
+        }
+
+
+class MeasuredMonthFilter(admin.SimpleListFilter):
+    """Year, then month, drill-down on measured_at that replaces date_hierarchy.
+
+    Years come from the MIN/MAX of the indexed column instead of a
+    SELECT DISTINCT over every row, and each choice is a measured_at range
+    that reading_measured_at_idx can serve.
+    """
+    title = 'month'
+    parameter_name = 'measured'
+
+    def lookups(self, request, model_admin):
+        bounds = model_admin.model.objects.aggregate(first=Min('measured_at'), last=Max('measured_at'))
+        if not bounds['first']:
+            return []
+        first, last = (timezone.localtime(bounds[key]) for key in ('first', 'last'))
+
+        selected_year = self.value()[:4] if self.value() else None
+        choices = []
+        for year in range(last.year, first.year - 1, -1):
+            choices.append((str(year), str(year)))
+            if str(year) == selected_year:
+                # Show the months of the chosen year under it
+                choices.extend(
+                    (f'{year}-{month:02d}', datetime(year, month, 1).strftime('%B %Y'))
+                    for month in range(12, 0, -1)
+                    if (first.year, first.month) <= (year, month) <= (last.year, last.month)
+                )
+        return choices
+
+    def queryset(self, request, queryset):
+        if not self.value():
+            return queryset
+        try:
+            year, _, month = self.value().partition('-')
+            start = datetime(int(year), int(month or 1), 1)
+        except ValueError:
+            return queryset.none()
+        if month:
+            end = datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+        else:
+            end = datetime(start.year + 1, 1, 1)
+        return queryset.filter(
+            measured_at__gte=timezone.make_aware(start), measured_at__lt=timezone.make_aware(end)
+        )
 
 
 @admin.register(School)
@@ -9,10 +131,30 @@ class SchoolAdmin(admin.ModelAdmin):
 
 
 @admin.register(AirQualityReading)
-class AirQualityReadingAdmin(admin.ModelAdmin):
+class AirQualityReadingAdmin(LargeTableAdmin):
     list_display = ['school', 'pollutant', 'value', 'measured_at']
-    list_filter = ['pollutant', 'measured_at']
+    # date_hierarchy scans for distinct dates, so months are a range-backed filter instead
+    list_filter = ['pollutant', SchoolAutocompleteFilter, 'measured_at', MeasuredMonthFilter]
+    list_select_related = ['school']
+    autocomplete_fields = ['school']
     search_fields = ['school__name']
-    date_hierarchy = 'measured_at'
+
+    @property
+    def media(self):
+        return super().media + AutocompleteSelect(
+            AirQualityReading._meta.get_field('school'), self.admin_site
+        ).media
+
+
+@admin.register(FetchRun)
+class FetchRunAdmin(admin.ModelAdmin):
+    list_display = ['started_at', 'duration', 'schools_succeeded', 'schools_failed', 'rows_inserted', 'rows_stale', 'rows_skipped']
+    readonly_fields = ['phase_durations', 'endpoint_stats', 'failures']
+
+
+@admin.register(SensorMetadata)
+class SensorMetadataAdmin(admin.ModelAdmin):
+    list_display = ['sensor_id', 'parameter_name', 'parameter_id', 'fetched_at', 'last_used_at']
+    search_fields = ['sensor_id', 'parameter_name']
 
 # Register your models here.
@@ -0,0 +1,231 @@
+"""Vectorised air quality index (UK DAQI) and limit exceedance engine.
+
+Hourly means for many schools are loaded from the hourly rollups into a
+(schools x hours) NumPy grid in one query per pollutant. The database
+returns each rollup as plain numbers (school, Unix hour start, mean), with
+no model or datetime built per row, read from the cursor straight into
+np.fromiter().
+Rolling means, index bands and exceedance counts are then whole-array
+operations. benchmarks/aqi_engine.py times a year for hundreds of schools.
+"""
+from datetime import timedelta
+from typing import NamedTuple
+
+import numpy as np
+from django.db import connection, models
+from django.db.models import ExpressionWrapper, F
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from .models import ReadingRollup, rollup_bucket
+
+HOUR_SECONDS = 3600
+
+# A rolling mean needs this share of its hours present (the UK 18-of-24 rule)
+MIN_COVERAGE = 0.75
+
+# Per pollutant: hours averaged for the index, inclusive upper bounds of DAQI
+# indices 1-9 in µg/m³ (10 is anything above), and the limit whose
+# exceedances are counted with the hours it is averaged over.
+# Sources: Defra Daily Air Quality Index; UK Air Quality Standards
+# Regulations 2010; WHO 2021 guideline for PM2.5, which has no UK daily limit.
+STANDARDS = {
+    'NO2': {
+        'index_hours': 1,
+        'daqi_bounds': [67, 134, 200, 267, 334, 400, 467, 534, 600],
+        'limit': 200, 'limit_hours': 1,
+    },
+    'PM10': {
+        'index_hours': 24,
+        'daqi_bounds': [16, 33, 50, 58, 66, 75, 83, 91, 100],
+        'limit': 50, 'limit_hours': 24,
+    },
+    'PM2.5': {
+        'index_hours': 24,
+        'daqi_bounds': [11, 23, 35, 41, 47, 53, 58, 64, 70],
+        'limit': 15, 'limit_hours': 24,
+    },
+    'O3': {
+        'index_hours': 8,
+        'daqi_bounds': [33, 66, 100, 120, 140, 160, 187, 213, 240],
+        'limit': 100, 'limit_hours': 8,
+    },
+    'SO2': {
+        'index_hours': 1,
+        'daqi_bounds': [88, 177, 266, 354, 443, 532, 710, 887, 1064],
+        'limit': 350, 'limit_hours': 1,
+    },
+}
+
+# DAQI index -> (band, colour used on the map)
+DAQI_BANDS = {
+    0: ('No data', '#808080'),
+    1: ('Low', '#00a651'), 2: ('Low', '#00a651'), 3: ('Low', '#00a651'),
+    4: ('Moderate', '#ffa500'), 5: ('Moderate', '#ffa500'), 6: ('Moderate', '#ffa500'),
+    7: ('High', '#ff6b35'), 8: ('High', '#ff6b35'), 9: ('High', '#ff6b35'),
+    10: ('Very High', '#d32f2f'),
+}
+
+# Hours behind now that a "current" index is taken from
+CURRENT_WINDOW_HOURS = 24
+
+# bucket_start as Unix seconds, read in SQL so no row becomes a datetime
+EPOCH_SQL = {
+    'postgresql': 'CAST(EXTRACT(EPOCH FROM bucket_start) AS BIGINT)',
+    # 2440587.5 is the Julian day of the Unix epoch; julianday() parses faster than strftime()
+    'sqlite': 'CAST(ROUND((julianday(bucket_start) - 2440587.5) * 86400) AS INTEGER)',
+}
+
+# One loaded rollup: school, hour start and mean
+ROW_DTYPE = np.dtype([('school_id', np.int64), ('epoch', np.int64), ('mean', np.float64)])
+
+# Longest averaging period, i.e. the history needed before `since`
+LOOKBACK_HOURS = max(max(s['index_hours'], s['limit_hours']) for s in STANDARDS.values())
+
+
+def load_hourly_means(pollutant, since, until, school_ids=None):
+    """(school_ids, hourly) where hourly[i, h] is school i's mean in hour h after `since`, NaN if missing"""
+    rollups = ReadingRollup.objects.filter(
+        period='hour', pollutant=pollutant, bucket_start__gte=since, bucket_start__lt=until
+    )
+    hours = int((until - since).total_seconds() // HOUR_SECONDS)
+    if school_ids is not None:
+        if not school_ids:
+            # An empty IN () would raise EmptyResultSet when the SQL is built
+            return np.array([], dtype=np.int64), np.full((0, hours), np.nan)
+        rollups = rollups.filter(school_id__in=school_ids)
+    # Numbers only: through the ORM, building a datetime per row costs far more than the arrays
+    sql, params = rollups.order_by().values_list(
+        Cast('school_id', models.BigIntegerField()),
+        RawSQL(EPOCH_SQL[connection.vendor], [], output_field=models.BigIntegerField()),
+        ExpressionWrapper(F('total') / F('count'), output_field=models.FloatField()),
+    ).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = np.fromiter(cursor.fetchall(), dtype=ROW_DTYPE)
+
+    ids, rows_index = np.unique(
+        np.concatenate([rows['school_id'], np.array(list(school_ids or []), dtype=np.int64)]), return_inverse=True
+    )
+    hour_index = ((rows['epoch'] - since.timestamp()) // HOUR_SECONDS).astype(np.int64)
+
+    hourly = np.full((len(ids), hours), np.nan)
+    hourly[rows_index[:len(rows)], hour_index] = rows['mean']
+    return ids, hourly
+
+
+def rolling_mean(hourly, window, min_coverage=MIN_COVERAGE):
+    """Trailing `window`-hour mean at every hour, NaN where too few hours are present"""
+    if window == 1:
+        return hourly.copy()
+
+    present = ~np.isnan(hourly)
+    zeros = np.zeros((hourly.shape[0], 1))
+    sums = np.concatenate([zeros, np.cumsum(np.where(present, hourly, 0.0), axis=1)], axis=1)
+    counts = np.concatenate([zeros, np.cumsum(present, axis=1)], axis=1)
+
+    ends = np.arange(1, hourly.shape[1] + 1)
+    starts = np.maximum(ends - window, 0)
+    window_sums = sums[:, ends] - sums[:, starts]
+    window_counts = counts[:, ends] - counts[:, starts]
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = window_sums / window_counts
+    enough = (window_counts > 0) & (window_counts >= np.ceil(window * min_coverage))
+    return np.where(enough, means, np.nan)
+
+
+def daqi(values, pollutant):
+    """DAQI index 1-10 for each value, 0 where the value is NaN"""
+    bounds = np.array(STANDARDS[pollutant]['daqi_bounds'], dtype=np.float64)
+    index = np.searchsorted(bounds, values, side='left') + 1
+    return np.where(np.isnan(values), 0, index)
+
+
+class Assessment(NamedTuple):
+    """Index and exceedance results for one pollutant; arrays are (schools x hours) from `since`"""
+    pollutant: str
+    since: object
+    school_ids: np.ndarray
+    hourly: np.ndarray
+    rolling_24h: np.ndarray
+    index: np.ndarray
+    exceedance_hours: np.ndarray
+
+    def summary(self, row):
+        """JSON-ready results for the school in `row` of the arrays"""
+        latest = np.flatnonzero(self.index[row])
+        current = int(self.index[row, latest[-1]]) if latest.size else 0
+        peak = int(self.index[row].max()) if self.index.shape[1] else 0
+        rolling = self.rolling_24h[row][~np.isnan(self.rolling_24h[row])]
+        return {
+            'index': current,
+            'band': DAQI_BANDS[current][0],
+            'colour': DAQI_BANDS[current][1],
+            'max_index': peak,
+            'max_band': DAQI_BANDS[peak][0],
+            'exceedance_hours': int(self.exceedance_hours[row]),
+            'rolling_24h_mean': round(float(rolling[-1]), 1) if rolling.size else None,
+            'max_rolling_24h_mean': round(float(rolling.max()), 1) if rolling.size else None,
+        }
+
+    def by_school(self):
+        return {int(school_id): self.summary(row) for row, school_id in enumerate(self.school_ids)}
+
+
+def assess(pollutant, since, until, school_ids=None, min_coverage=MIN_COVERAGE):
+    """Index bands, exceedance hours and rolling 24-hour means for every school over [since, until).
+
+    Hours are UTC; since and until are rounded down to the hour. Enough
+    history before `since` is loaded that the first hours have full
+    averaging windows. Pass a lower min_coverage to average whatever hours
+    exist, e.g. for a best-effort current index from sparse data.
+    """
+    standard = STANDARDS[pollutant]
+    since, until = rollup_bucket(since, 'hour'), rollup_bucket(until, 'hour')
+    lookback = LOOKBACK_HOURS - 1
+
+    school_ids, hourly = load_hourly_means(pollutant, since - timedelta(hours=lookback), until, school_ids)
+
+    index_metric = rolling_mean(hourly, standard['index_hours'], min_coverage)[:, lookback:]
+    limit_metric = rolling_mean(hourly, standard['limit_hours'], min_coverage)[:, lookback:]
+    rolling_24h = rolling_mean(hourly, 24, min_coverage)[:, lookback:]
+
+    with np.errstate(invalid='ignore'):
+        exceedances = (limit_metric > standard['limit']).sum(axis=1)
+
+    return Assessment(
+        pollutant=pollutant,
+        since=since,
+        school_ids=school_ids,
+        hourly=hourly[:, lookback:],
+        rolling_24h=rolling_24h,
+        index=daqi(index_metric, pollutant),
+        exceedance_hours=exceedances,
+    )
+
+
+def overall_index(summaries):
+    """The worst current index across a school's pollutants, as the DAQI is reported"""
+    current = max((summary['index'] for summary in summaries), default=0)
+    return {'index': current, 'band': DAQI_BANDS[current][0], 'colour': DAQI_BANDS[current][1]}
+
+
+def current_indices(pollutants, school_ids=None):
+    """{school_id: {pollutant: summary}} for the last CURRENT_WINDOW_HOURS, for the map.
+
+    Averages whatever hours exist rather than requiring UK coverage, so
+    schools polled only now and then still get a best-effort band.
+    """
+    until = rollup_bucket(timezone.now(), 'hour') + timedelta(hours=1)
+    since = until - timedelta(hours=CURRENT_WINDOW_HOURS)
+
+    results = {}
+    for pollutant in pollutants:
+        if pollutant not in STANDARDS:
+            continue
+        for school_id, summary in assess(pollutant, since, until, school_ids, min_coverage=0).by_school().items():
+            results.setdefault(school_id, {})[pollutant] = summary
+    return results
+
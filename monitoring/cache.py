@@ -0,0 +1,81 @@
+"""Versioned caching for data derived from schools and readings.
+
+Everything cached here is stored under the current data version, so a
+single bump_data_version() after any write invalidates all of it at once.
+Hits and misses are counted per cached item name in the cache itself, so
+every process sharing the backend reports the same totals.
+"""
+import time
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+DATA_VERSION_KEY = 'monitoring:data-version'
+
+# Safety net for caches that a write in another process can't reach (e.g. locmem)
+DERIVED_DATA_TIMEOUT = 300
+
+OUTCOMES = ('hit', 'miss')
+
+# Names passed to get_or_build(), for reporting
+CACHED_ITEMS = ('schools', 'clusters')
+
+
+def cache_is_shared():
+    """Whether every process sees the same cache, and so the same data version"""
+    return not isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache)
+
+
+def data_version():
+    """The current data version, starting a new one if the cache has none"""
+    version = cache.get(DATA_VERSION_KEY)
+    if version is None:
+        cache.add(DATA_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(DATA_VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    """Invalidate everything cached for the previous version"""
+    cache.set(DATA_VERSION_KEY, time.time_ns(), None)
+
+
+def stats_key(name, outcome):
+    return f'monitoring:cache-{outcome}:{name}'
+
+
+def count(name, outcome):
+    key = stats_key(name, outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First count for this name, or the counter was evicted
+        if not cache.add(key, 1, None):
+            cache.incr(key)
+
+
+def get_or_build(name, build, *parts, timeout=DERIVED_DATA_TIMEOUT):
+    """Return the cached `name` value for `parts` at the current data version, building it on a miss"""
+    key = ':'.join(['monitoring', name, *map(str, parts)])
+    version = data_version()
+    value = cache.get(key, version=version)
+    if value is not None:
+        count(name, 'hit')
+        return value
+
+    count(name, 'miss')
+    value = build()
+    cache.set(key, value, timeout, version=version)
+    return value
+
+
+def cache_stats(names=CACHED_ITEMS):
+    """Hit and miss counts for each cached item name"""
+    counts = cache.get_many([stats_key(name, outcome) for name in names for outcome in OUTCOMES])
+    return {
+        name: {outcome: counts.get(stats_key(name, outcome), 0) for outcome in OUTCOMES}
+        for name in names
+    }
+
+
+def reset_cache_stats(names=CACHED_ITEMS):
+    cache.delete_many([stats_key(name, outcome) for name in names for outcome in OUTCOMES])
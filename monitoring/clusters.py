@@ -0,0 +1,73 @@
+"""Server-side grid clustering of school markers per map zoom level"""
+from .aqi import DAQI_BANDS, current_indices, overall_index
+from .models import School, pollutant_key
+
+# Leaflet zoom levels we build clusters for; deeper zooms reuse the last one
+MIN_ZOOM = 0
+MAX_ZOOM = 16
+
+# Cluster cells per 256px map tile side, i.e. about one cluster per 64px
+CELLS_PER_TILE = 4
+
+
+def cell_degrees(zoom):
+    """Width of a cluster cell at a zoom level; a tile spans 360 / 2**zoom degrees"""
+    return 360 / (2 ** zoom * CELLS_PER_TILE)
+
+
+def build_clusters(zoom, pollutants):
+    """Group every school into grid cells with a count, centroid, worst DAQI and max/mean latest readings.
+
+    One query reads the coordinates and latest readings; the grouping is a
+    single pass in Python so it behaves the same on SQLite and PostgreSQL.
+    """
+    size = cell_degrees(zoom)
+    indices = current_indices(pollutants)
+    fields = [f'latest_{pollutant_key(pollutant)}' for pollutant in pollutants]
+    rows = School.objects.with_latest_readings(pollutants).values_list('id', 'latitude', 'longitude', *fields)
+
+    cells = {}
+    for school_id, latitude, longitude, *values in rows.iterator():
+        cell = cells.setdefault((int(latitude // size), int(longitude // size)), {
+            'school_id': school_id,
+            'count': 0,
+            'latitude': 0.0,
+            'longitude': 0.0,
+            'values': [[] for _ in pollutants],
+            'index': 0,
+        })
+        cell['count'] += 1
+        cell['latitude'] += latitude
+        cell['longitude'] += longitude
+        cell['index'] = max(cell['index'], overall_index(indices.get(school_id, {}).values())['index'])
+        for collected, value in zip(cell['values'], values):
+            if value is not None:
+                collected.append(value)
+
+    clusters = []
+    for cell in cells.values():
+        count = cell['count']
+        clusters.append({
+            'count': count,
+            # Lets the client draw a single school as an ordinary marker
+            'school_id': cell['school_id'] if count == 1 else None,
+            'latitude': cell['latitude'] / count,
+            'longitude': cell['longitude'] / count,
+            # Worst current DAQI among the cluster's schools
+            'index': cell['index'],
+            'band': DAQI_BANDS[cell['index']][0],
+            'colour': DAQI_BANDS[cell['index']][1],
+            'readings': {
+                pollutant: {
+                    'max': max(values) if values else None,
+                    'mean': sum(values) / len(values) if values else None,
+                }
+                for pollutant, values in zip(pollutants, cell['values'])
+            },
+        })
+    return clusters
+
+
+def in_bbox(cluster, bbox):
+    west, south, east, north = bbox
+    return south <= cluster['latitude'] <= north and west <= cluster['longitude'] <= east
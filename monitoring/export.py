@@ -0,0 +1,57 @@
+"""Streaming CSV export of readings for the export endpoint and command"""
+import csv
+
+from .models import AirQualityReading
+
+# Rows fetched per database round-trip; one chunk is all that is held in memory
+EXPORT_CHUNK_SIZE = 2000
+
+READING_COLUMNS = ['school_id', 'school', 'pollutant', 'value', 'measured_at']
+
+# Spreadsheets run text cells starting with these as formulas
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+
+def escape_formula(text):
+    """Text that a spreadsheet shows as-is: a leading formula character is quoted with '"""
+    return f"'{text}" if text.startswith(FORMULA_PREFIXES) else text
+
+
+class Echo:
+    """File-like object whose write() hands back the line, for csv.writer to stream through"""
+
+    def write(self, value):
+        return value
+
+
+def export_readings(school_ids=None, pollutants=None, since=None, until=None):
+    """Readings in [since, until) as READING_COLUMNS tuples, oldest first.
+
+    The school name comes from the same JOIN select_related('school') would
+    use, without building a model instance per row.
+    """
+    readings = AirQualityReading.objects.all()
+    if school_ids:
+        readings = readings.filter(school_id__in=school_ids)
+    if pollutants:
+        readings = readings.filter(pollutant__in=pollutants)
+    if since is not None:
+        readings = readings.filter(measured_at__gte=since)
+    if until is not None:
+        readings = readings.filter(measured_at__lt=until)
+    return readings.order_by('measured_at', 'id').values_list(
+        'school_id', 'school__name', 'pollutant', 'value', 'measured_at'
+    )
+
+
+def iter_csv(readings, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield the header and then one CSV line per reading.
+
+    .iterator() uses a server-side cursor on PostgreSQL, so the first bytes
+    go out before the query has finished and memory stays flat.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(READING_COLUMNS)
+    for school_id, school, pollutant, value, measured_at in readings.iterator(chunk_size=chunk_size):
+        # Numbers are left alone, so a negative value stays a number
+        yield writer.writerow([school_id, escape_formula(school), escape_formula(pollutant), value, measured_at.isoformat()])
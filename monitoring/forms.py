@@ -37,4 +37,13 @@ class SchoolForm(forms.ModelForm):
         help_texts = {
             'latitude': 'Find coordinates on Google Maps',
             'longitude': 'Right-click location → "What\'s here?"'
-        }
\ No newline at end of file
+        }
+
+class SchoolImportForm(forms.Form):
+    """CSV upload for adding many schools at once - US-CREATE"""
+    
+    csv_file = forms.FileField(
+        label='CSV File',
+        help_text='Columns: name, location, latitude, longitude',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv'})
+    )
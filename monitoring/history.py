@@ -0,0 +1,116 @@
+"""Downsampled reading history for charts, keeping each bucket's lowest and highest point"""
+from datetime import timedelta
+from django.db.models import Min, Sum
+from .models import ROLLUP_PERIODS, rollup_bucket, rollup_filter
+
+DEFAULT_POINTS = 500
+MAX_POINTS = 5000
+
+
+# Finest first. prune_readings drops raw readings, then hourly rollups, oldest first
+SOURCES = ('raw', 'hour', 'day')
+
+
+def oldest_sample(school, pollutant, source):
+    """When a school's raw readings or hourly rollups for a pollutant start, or None"""
+    if source == 'raw':
+        return school.readings.filter(pollutant=pollutant).aggregate(oldest=Min('measured_at'))['oldest']
+    return school.rollups.filter(pollutant=pollutant, period=source).aggregate(oldest=Min('bucket_start'))['oldest']
+
+
+def source_samples(school, pollutant, source, since, until):
+    """(time, value) points from one source, rollups giving their minimum and maximum"""
+    if source == 'raw':
+        readings = school.readings.filter(
+            pollutant=pollutant, measured_at__gte=since, measured_at__lt=until
+        ).order_by('measured_at').values_list('measured_at', 'value')
+        return list(readings)
+
+    half = ROLLUP_PERIODS[source] / 2
+    rollups = school.rollups.filter(
+        pollutant=pollutant,
+        period=source,
+        bucket_start__gte=rollup_bucket(since, source),
+        bucket_start__lt=until,
+    ).order_by('bucket_start').values_list('bucket_start', 'minimum', 'maximum', 'peak_measured_at')
+
+    samples = []
+    for bucket_start, minimum, maximum, peak_measured_at in rollups:
+        samples.append((bucket_start + half, minimum))
+        samples.append((peak_measured_at, maximum))
+    return samples
+
+
+def history_samples(school, pollutant, since, until, width):
+    """(time, value) points from the coarsest source that still resolves `width`.
+
+    Raw readings are only read when buckets are narrower than an hour;
+    otherwise hourly or daily rollups stand in, contributing their minimum
+    at the bucket's midpoint and their maximum at the time it was measured.
+    Where a source has been pruned, the part of the range before it starts
+    comes from the next coarser one. Returns (source, samples), source being
+    the coarsest one that had any.
+    """
+    finest = 'raw'
+    for period in ('day', 'hour'):
+        if width >= ROLLUP_PERIODS[period]:
+            finest = period
+            break
+
+    source = finest
+    samples = []
+    end = until
+    for candidate in SOURCES[SOURCES.index(finest):]:
+        if candidate != finest:
+            # The bucket holding `end` is covered by the finer source already
+            end = rollup_bucket(end, candidate)
+        start = since if candidate == 'day' else max(oldest_sample(school, pollutant, candidate) or end, since)
+        if start < end:
+            found = source_samples(school, pollutant, candidate, start, end)
+            if found:
+                source = candidate
+            samples = found + samples
+            end = start
+        if end <= since:
+            break
+    return source, samples
+
+
+def downsample(samples, since, until, buckets):
+    """Min/max bucketing: keep the lowest and highest point of each of `buckets` equal time slices"""
+    width = (until - since) / buckets
+    kept = {}
+    for moment, value in samples:
+        index = min(max(int((moment - since) / width), 0), buckets - 1)
+        low, high = kept.get(index, ((moment, value), (moment, value)))
+        if value < low[1]:
+            low = (moment, value)
+        if value > high[1]:
+            high = (moment, value)
+        kept[index] = (low, high)
+
+    points = set()
+    for low, high in kept.values():
+        points.update((low, high))
+    return sorted(points)
+
+
+def reading_history(school, pollutant, since, until, points=DEFAULT_POINTS):
+    """At most `points` (time, value) pairs describing a school's readings in [since, until).
+
+    Returns (source, points), where source is 'raw', 'hour' or 'day'.
+    """
+    buckets = max(points // 2, 1)
+    width = (until - since) / buckets
+
+    # Ranges holding few readings go out untouched, counted cheaply from the rollups
+    stored = school.rollups.filter(rollup_filter(since, until), pollutant=pollutant).aggregate(
+        stored=Sum('count')
+    )['stored'] or 0
+    if stored <= points:
+        width = timedelta(0)
+
+    source, samples = history_samples(school, pollutant, since, until, width)
+    if source == 'raw' and len(samples) <= points:
+        return source, samples
+    return source, downsample(samples, since, until, buckets)
@@ -0,0 +1,60 @@
+import json
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from monitoring.aqi import STANDARDS, assess
+from monitoring.models import School
+
+
+class Command(BaseCommand):
+    help = 'Report DAQI bands, limit exceedance hours and rolling 24-hour means per school'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=365, help='Days of history to assess (default: 365)')
+        parser.add_argument('--pollutant', action='append', help='Pollutant to assess (repeatable, default: PM10, NO2)')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON')
+
+    def handle(self, *args, **options):
+        pollutants = options['pollutant'] or ['PM10', 'NO2']
+        unknown = set(pollutants) - set(STANDARDS)
+        if unknown:
+            raise CommandError(f"No standards for: {', '.join(sorted(unknown))}")
+
+        until = timezone.now()
+        since = until - timedelta(days=options['days'])
+        names = dict(School.objects.values_list('id', 'name'))
+
+        results = {}
+        for pollutant in pollutants:
+            for school_id, summary in assess(pollutant, since, until).by_school().items():
+                results.setdefault(school_id, {})[pollutant] = summary
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'from': since.isoformat(),
+                'to': until.isoformat(),
+                'schools': [
+                    {'id': school_id, 'name': names.get(school_id), 'pollutants': summaries}
+                    for school_id, summaries in sorted(results.items())
+                ],
+            }, indent=2))
+            return
+
+        self.stdout.write(f"📊 Air quality {since:%Y-%m-%d} to {until:%Y-%m-%d} for {len(results)} school(s)\n")
+        for pollutant in pollutants:
+            standard = STANDARDS[pollutant]
+            self.stdout.write(f"{pollutant} (limit {standard['limit']} µg/m³ over {standard['limit_hours']}h)")
+
+            # Worst schools first
+            rows = sorted(
+                ((school_id, summaries[pollutant]) for school_id, summaries in results.items() if pollutant in summaries),
+                key=lambda row: (-row[1]['exceedance_hours'], -row[1]['max_index'])
+            )
+            for school_id, summary in rows:
+                style = self.style.ERROR if summary['exceedance_hours'] else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"   {names.get(school_id, school_id)}: {summary['exceedance_hours']} exceedance hour(s), "
+                    f"worst band {summary['max_band']} ({summary['max_index']}), "
+                    f"max 24h mean {summary['max_rolling_24h_mean'] if summary['max_rolling_24h_mean'] is not None else 'n/a'}"
+                ))
+            self.stdout.write("")
@@ -0,0 +1,145 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from monitoring.models import School, AirQualityReading, BackfillCheckpoint
+from monitoring.openaq import OpenAQClient, TokenBucket, POLLUTANT_MAP, parse_timestamp
+from monitoring.validation import parse_date, positive_float
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Command(BaseCommand):
+    help = 'Backfill historical air quality measurements from OpenAQ API v3, resuming from checkpoints'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=parse_date, required=True, help='Start date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=parse_date, help='End date (YYYY-MM-DD, default: start of today)')
+        parser.add_argument('--school', type=int, action='append', help='Only backfill this school ID (repeatable)')
+        parser.add_argument('--page-size', type=int, default=1000, help='Measurements per API page (default: 1000)')
+        parser.add_argument('--rate', type=positive_float, default=1.0, help='Maximum OpenAQ requests per second (default: 1.0)')
+        parser.add_argument('--restart', action='store_true', help='Ignore saved checkpoints and start the range again')
+
+    def handle(self, *args, **options):
+        api_key = os.environ.get('OPEN_AQ_API_KEY')
+
+        if not api_key:
+            self.stdout.write(self.style.ERROR('❌ OPEN_AQ_API_KEY not found in .env file'))
+            self.stdout.write('Get a free API key from: https://openaq.org/')
+            return
+
+        date_from = options['date_from']
+        # Default to midnight so a re-run later the same day finds the same checkpoints
+        date_to = options['date_to'] or timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        if date_from >= date_to:
+            raise CommandError('--from must be before --to')
+
+        schools = School.objects.all().order_by('id')
+        if options['school']:
+            schools = schools.filter(id__in=options['school'])
+
+        client = OpenAQClient(api_key, TokenBucket(options['rate']))
+        total_inserted = 0
+
+        for school in schools:
+            self.stdout.write(f"📍 {school.name}...")
+
+            sensors = self.find_sensors(client, school)
+            if not sensors:
+                self.stdout.write(self.style.WARNING("   ⚠ No usable sensors within 5km\n"))
+                continue
+
+            for pollutant, sensor_id in sensors.items():
+                checkpoint, created = BackfillCheckpoint.objects.get_or_create(
+                    school=school,
+                    pollutant=pollutant,
+                    date_from=date_from,
+                    defaults={'sensor_id': sensor_id, 'date_to': date_to}
+                )
+                if not created and date_to > checkpoint.date_to:
+                    # e.g. the default --to moved on a day: carry on from the cursor to the new end
+                    checkpoint.date_to = date_to
+                    checkpoint.completed = False
+                    checkpoint.save(update_fields=['date_to', 'completed', 'updated_at'])
+
+                if options['restart']:
+                    checkpoint.cursor = None
+                    checkpoint.rows_inserted = 0
+                    checkpoint.completed = False
+                    checkpoint.save()
+
+                if checkpoint.completed:
+                    self.stdout.write(f"   {pollutant}: already backfilled ({checkpoint.rows_inserted} reading(s))")
+                    continue
+
+                try:
+                    inserted = self.backfill(client, checkpoint, options['page_size'])
+                except Exception as e:
+                    self.stdout.write(self.style.ERROR(f"   ✗ {pollutant}: {e} - will resume from {checkpoint.cursor or date_from}"))
+                    continue
+
+                total_inserted += inserted
+                self.stdout.write(self.style.SUCCESS(f"   ✓ {pollutant}: stored {inserted} new reading(s)"))
+
+            self.stdout.write("")
+
+        self.stdout.write("=" * 60)
+        self.stdout.write(self.style.SUCCESS(f"✓ Backfill stored {total_inserted} new reading(s)"))
+
+    def find_sensors(self, client, school):
+        """Map our pollutant names to sensor IDs at the school's nearest station"""
+        response = client.find_locations(school.latitude, school.longitude)
+        if response.status_code != 200:
+            return {}
+
+        locations = response.json().get('results', [])
+        if not locations:
+            return {}
+
+        location = locations[0]
+        self.stdout.write(f"   Using: {location.get('name', 'Unknown')}")
+
+        sensors = {}
+        for sensor in location.get('sensors', []):
+            pollutant = POLLUTANT_MAP.get(sensor.get('parameter', {}).get('id'))
+            if pollutant and sensor.get('id'):
+                sensors.setdefault(pollutant, sensor['id'])
+        return sensors
+
+    def backfill(self, client, checkpoint, page_size):
+        """Stream pages of history into the database, checkpointing after each page"""
+        inserted = 0
+        start = checkpoint.cursor or checkpoint.date_from
+
+        for page in client.measurement_pages(checkpoint.sensor_id, start, checkpoint.date_to, limit=page_size):
+            readings = []
+            for measurement in page:
+                value = measurement.get('value')
+                period = measurement.get('period') or {}
+                timestamp = period.get('datetimeTo') or period.get('datetimeFrom') or {}
+                timestamp_str = timestamp.get('utc')
+
+                if value is None or not timestamp_str:
+                    continue
+
+                readings.append(AirQualityReading(
+                    school=checkpoint.school,
+                    pollutant=checkpoint.pollutant,
+                    value=value,
+                    measured_at=parse_timestamp(timestamp_str)
+                ))
+
+            # Readings and checkpoint commit together, so a crash never skips a page
+            with transaction.atomic():
+                new_readings = AirQualityReading.objects.bulk_insert_new(readings)
+                if readings:
+                    checkpoint.cursor = max(reading.measured_at for reading in readings)
+                checkpoint.rows_inserted += len(new_readings)
+                checkpoint.save(update_fields=['cursor', 'rows_inserted', 'updated_at'])
+
+            inserted += len(new_readings)
+
+        checkpoint.completed = True
+        checkpoint.save(update_fields=['completed', 'updated_at'])
+        return inserted
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from monitoring.cache import cache_stats, data_version, reset_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Report hit/miss counts for the cached map data'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after reporting them')
+
+    def handle(self, *args, **options):
+        backend = settings.CACHES['default']['BACKEND'].rsplit('.', 1)[-1]
+        self.stdout.write(f"🗄  {backend}, data version {data_version()}")
+
+        for name, counts in cache_stats().items():
+            total = counts['hit'] + counts['miss']
+            ratio = f"{counts['hit'] / total:.0%}" if total else 'n/a'
+            self.stdout.write(f"   {name:10} {counts['hit']} hit(s), {counts['miss']} miss(es), hit rate {ratio}")
+
+        if options['reset']:
+            reset_cache_stats()
+            self.stdout.write(self.style.SUCCESS("✓ Counters reset"))
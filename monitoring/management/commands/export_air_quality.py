@@ -0,0 +1,75 @@
+import json
+import sys
+from django.core.management.base import BaseCommand
+from django.core.serializers.json import DjangoJSONEncoder
+from monitoring.models import School, AirQualityReading
+from monitoring.streaming import open_dump
+
+
+class Command(BaseCommand):
+    help = 'Stream schools and readings to a loaddata-compatible JSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file ('-' for stdout, .gz to compress)")
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows fetched per database round-trip (default: 5000)')
+        parser.add_argument('--no-schools', action='store_true', help='Only export readings')
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        out = sys.stdout if options['path'] == '-' else open_dump(options['path'], 'w')
+
+        counts = {'schools': 0, 'readings': 0}
+        try:
+            out.write('[')
+            first = True
+
+            for obj in self.iter_objects(options['no_schools'], chunk_size, counts):
+                out.write('\n' if first else ',\n')
+                out.write(json.dumps(obj, cls=DjangoJSONEncoder))
+                first = False
+
+            out.write('\n]\n')
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if out is not sys.stdout:
+            self.stdout.write(self.style.SUCCESS(
+                f"✓ Exported {counts['schools']} school(s) and {counts['readings']} reading(s) to {options['path']}"
+            ))
+
+    def iter_objects(self, no_schools, chunk_size, counts):
+        """Yield dumpdata-style dicts, schools first so the file loads in order.
+
+        .iterator() uses a server-side cursor on PostgreSQL, so only one
+        chunk of rows is in memory at a time.
+        """
+        if not no_schools:
+            schools = School.objects.order_by('pk').values_list('pk', 'name', 'location', 'latitude', 'longitude', 'created_by_id')
+            for pk, name, location, latitude, longitude, created_by in schools.iterator(chunk_size=chunk_size):
+                counts['schools'] += 1
+                yield {
+                    'model': 'monitoring.school',
+                    'pk': pk,
+                    'fields': {
+                        'name': name,
+                        'location': location,
+                        'latitude': latitude,
+                        'longitude': longitude,
+                        'created_by': created_by,
+                    }
+                }
+
+        readings = AirQualityReading.objects.order_by('pk').values_list('pk', 'school_id', 'pollutant', 'value', 'measured_at')
+        for pk, school_id, pollutant, value, measured_at in readings.iterator(chunk_size=chunk_size):
+            counts['readings'] += 1
+            yield {
+                'model': 'monitoring.airqualityreading',
+                'pk': pk,
+                'fields': {
+                    'school': school_id,
+                    'pollutant': pollutant,
+                    'value': value,
+                    'measured_at': measured_at,
+                }
+            }
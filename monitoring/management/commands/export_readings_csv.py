@@ -0,0 +1,42 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from monitoring.export import EXPORT_CHUNK_SIZE, export_readings, iter_csv
+from monitoring.streaming import open_dump
+from monitoring.validation import check_pollutants, parse_date
+
+
+class Command(BaseCommand):
+    help = 'Stream readings to a CSV file, optionally filtered by school, pollutant and date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file ('-' for stdout, .gz to compress)")
+        parser.add_argument('--school', type=int, action='append', help='Only export this school ID (repeatable)')
+        parser.add_argument('--pollutant', action='append', help='Only export this pollutant (repeatable)')
+        parser.add_argument('--from', dest='date_from', type=parse_date, help='Start date (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='date_to', type=parse_date, help='End date, exclusive (YYYY-MM-DD)')
+        parser.add_argument('--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+                            help=f'Rows fetched per database round-trip (default: {EXPORT_CHUNK_SIZE})')
+
+    def handle(self, *args, **options):
+        try:
+            check_pollutants(options['pollutant'])
+        except ValueError as e:
+            raise CommandError(str(e))
+        if options['date_from'] and options['date_to'] and options['date_from'] >= options['date_to']:
+            raise CommandError('--from must be before --to')
+
+        readings = export_readings(options['school'], options['pollutant'], options['date_from'], options['date_to'])
+
+        # newline='' so the csv module's \r\n line endings are written as-is
+        out = sys.stdout if options['path'] == '-' else open_dump(options['path'], 'w', newline='')
+        rows = -1  # the header is not a reading
+        try:
+            for line in iter_csv(readings, options['chunk_size']):
+                out.write(line)
+                rows += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if out is not sys.stdout:
+            self.stdout.write(self.style.SUCCESS(f"✓ Exported {rows} reading(s) to {options['path']}"))
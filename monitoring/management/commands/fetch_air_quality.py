@@ -1,190 +1,597 @@
 import requests
+import json
 import os
 import time
+import traceback
+import statistics
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from django.core.management.base import BaseCommand
-from monitoring.models import School, AirQualityReading
+from monitoring.models import School, AirQualityReading, SensorMetadata, StationState, FetchRun
+from monitoring.openaq import OpenAQClient, TokenBucket, POLLUTANT_MAP, parse_timestamp
+from monitoring.validation import positive_float, positive_int
+from django.db.models import Max, Min, Q
 from django.utils import timezone
-from datetime import datetime, timedelta
+from datetime import timedelta
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Skip readings older than 5 days (120 hours)
+STALE_AFTER_HOURS = 120
+
+# Cached sensor metadata unused for this long is evicted
+SENSOR_EVICT_AFTER_DAYS = 90
+
+# Returned by fetch_station when the API says nothing has changed (304)
+UNCHANGED = 'unchanged'
+
+# How much reading history is used to learn each station's publishing interval
+INTERVAL_LEARNING_WINDOW = timedelta(days=14)
+
+# Scheduler mode: how long to wait before retrying a school with no nearby station
+UNRESOLVED_RETRY_AFTER = timedelta(hours=6)
+
+# A school's stored station is reused this long before its nearest station is looked up again
+STATION_RECHECK_AFTER = timedelta(days=7)
+
 
 class Command(BaseCommand):
     help = 'Fetch air quality data from OpenAQ API v3'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=positive_int,
+            default=4,
+            help='Number of concurrent API workers (default: 4)'
+        )
+        parser.add_argument(
+            '--rate',
+            type=positive_float,
+            default=1.0,
+            help='Maximum OpenAQ requests per second, shared by all workers (default: 1.0)'
+        )
+        parser.add_argument(
+            '--burst',
+            type=positive_int,
+            default=5,
+            help='Number of requests allowed back-to-back before the rate applies (default: 5)'
+        )
+        parser.add_argument(
+            '--sensor-ttl-days',
+            type=int,
+            default=30,
+            help='Re-fetch cached sensor metadata older than this many days (default: 30)'
+        )
+        parser.add_argument(
+            '--refresh-sensors',
+            action='store_true',
+            help='Ignore the sensor metadata cache and look every sensor up again'
+        )
+        parser.add_argument(
+            '--relink-stations',
+            action='store_true',
+            help="Look up every school's nearest station again instead of reusing stored links"
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print only a JSON summary of the run (timings, API latency, row counts, failures)'
+        )
+        parser.add_argument(
+            '--schedule',
+            action='store_true',
+            help='Keep running, polling each station only when it is expected to have new data'
+        )
+        parser.add_argument(
+            '--tick',
+            type=int,
+            default=60,
+            help='Scheduler mode: longest sleep between checks for due stations, in seconds (default: 60)'
+        )
+        parser.add_argument(
+            '--max-ticks',
+            type=int,
+            help='Scheduler mode: stop after this many checks (default: run forever)'
+        )
+
     def handle(self, *args, **options):
+        # JSON mode prints only the final summary, for alerting and dashboards
+        self.quiet = options['json']
+
         api_key = os.environ.get('OPEN_AQ_API_KEY')
-        
+
         if not api_key:
             self.stdout.write(self.style.ERROR('❌ OPEN_AQ_API_KEY not found in .env file'))
             self.stdout.write('Get a free API key from: https://openaq.org/')
             return
-        
-        schools = School.objects.all()
-        
-        if not schools.exists():
+
+        schools = list(School.objects.select_related('station'))
+
+        if not schools:
             self.stdout.write(self.style.WARNING('No schools found in database'))
             return
-            
-        self.stdout.write(f"Fetching air quality data for {schools.count()} school(s)...\n")
-        
-        headers = {
-            'Accept': 'application/json',
-            'X-API-Key': api_key
-        }
-        
-        # Cache sensor info to avoid repeated API calls
-        sensor_cache = {}
-        
-        success_count = 0
-        fail_count = 0
-        
-        for school in schools:
-            time.sleep(1)  # Rate limiting
-            
-            try:
-                # Step 1: Find nearby locations
-                locations_url = "https://api.openaq.org/v3/locations"
-                
-                locations_params = {
-                    'coordinates': f"{school.latitude},{school.longitude}",
-                    'radius': 5000,  # 5km
-                    'limit': 5
-                }
-                
-                self.stdout.write(f"📍 {school.name}...")
-                locations_response = requests.get(locations_url, params=locations_params, headers=headers, timeout=15)
-                
-                if locations_response.status_code != 200:
-                    self.stdout.write(self.style.ERROR(f"   ✗ API error: {locations_response.status_code}\n"))
-                    fail_count += 1
-                    continue
-                
-                locations_data = locations_response.json()
-                locations = locations_data.get('results', [])
-                
-                if not locations:
-                    self.stdout.write(self.style.WARNING(f"   ⚠ No monitoring stations within 5km\n"))
-                    fail_count += 1
+
+        # One limiter for every worker keeps the whole run inside the API quota
+        limiter = TokenBucket(options['rate'], options['burst'])
+
+        if options['schedule']:
+            self.run_scheduler(api_key, limiter, options)
+            return
+
+        client = self.make_client(api_key, limiter, options)
+        run = self.fetch(client, schools, options['workers'], options['relink_stations'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(run.summary(), indent=2))
+
+    def make_client(self, api_key, limiter, options, refresh_sensors=None):
+        """API client for one run, primed with the persistent sensor cache"""
+        client = OpenAQClient(api_key, limiter, pool_size=max(1, options['workers']))
+
+        if refresh_sensors is None:
+            refresh_sensors = options['refresh_sensors']
+        if not refresh_sensors:
+            client.sensor_cache.update(self.load_sensor_cache(options['sensor_ttl_days']))
+
+        return client
+
+    def run_scheduler(self, api_key, limiter, options):
+        """Long-running mode: each tick fetches only the schools whose station is due"""
+        unresolved_retry_at = {}
+        ticks = 0
+
+        while options['max_ticks'] is None or ticks < options['max_ticks']:
+            now = timezone.now()
+            due = [
+                school for school in School.objects.select_related('station').filter(
+                    Q(station__isnull=True) | Q(station__next_poll_at__isnull=True) | Q(station__next_poll_at__lte=now)
+                )
+                if unresolved_retry_at.get(school.id, now) <= now
+            ]
+
+            if due:
+                # Fresh client per tick so latency stats describe this run only
+                client = self.make_client(api_key, limiter, options, refresh_sensors=options['refresh_sensors'] and ticks == 0)
+                run = self.fetch(client, due, options['workers'], options['relink_stations'] and ticks == 0)
+
+                if options['json']:
+                    self.stdout.write(json.dumps(run.summary()))
+
+                resolved = set(School.objects.filter(id__in=[school.id for school in due], station__isnull=False).values_list('id', flat=True))
+                for school in due:
+                    if school.id not in resolved:
+                        unresolved_retry_at[school.id] = now + UNRESOLVED_RETRY_AFTER
+            else:
+                self.log("No stations due")
+
+            ticks += 1
+            if options['max_ticks'] is not None and ticks >= options['max_ticks']:
+                break
+
+            # Sleep until the next station is due, but never longer than one tick
+            next_poll_at = StationState.objects.filter(schools__isnull=False).aggregate(Min('next_poll_at'))['next_poll_at__min']
+            wait = options['tick']
+            if next_poll_at is not None:
+                wait = max(1, min(wait, (next_poll_at - timezone.now()).total_seconds()))
+            self.log(f"Sleeping {wait:.0f}s until the next station is due...")
+            time.sleep(wait)
+
+    def log(self, line):
+        """Write a progress line unless only the JSON summary was asked for"""
+        if not self.quiet:
+            self.stdout.write(line)
+
+    @contextmanager
+    def phase(self, run, name):
+        """Record how long a phase of the run took, in seconds"""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            run.phase_durations[name] = round(time.monotonic() - started, 3)
+
+    def fetch(self, client, schools, workers, relink=False):
+        """Fetch and store the latest readings for `schools`, returning the saved FetchRun.
+
+        Schools whose station was looked up within STATION_RECHECK_AFTER
+        reuse it; only the rest (or all of them when `relink`) cost a
+        /locations request.
+        """
+        self.log(f"Fetching air quality data for {len(schools)} school(s)...\n")
+
+        run = FetchRun.objects.create(started_at=timezone.now(), schools_total=len(schools))
+        fetched_schools = []
+        buffer = []
+        unchanged_count = 0
+
+        # High-water mark per (school, pollutant): anything at or before it is already stored
+        watermarks = self.load_watermarks(schools)
+        watermarked_schools = {school_id for school_id, _ in watermarks}
+
+        # Workers only talk to the API; readings are stored here on the main thread
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            # Step 1: Resolve the nearest station for every school not already linked to one
+            stations = {}
+            recheck_before = timezone.now() - STATION_RECHECK_AFTER
+            lookups = []
+
+            for school in schools:
+                if relink or school.station is None or not school.station_checked_at or school.station_checked_at < recheck_before:
+                    lookups.append(school)
                     continue
-                
-                # Step 2: Get latest measurements
-                stored_count = 0
-                
-                location = locations[0]
-                location_id = location.get('id')
-                location_name = location.get('name', 'Unknown')
-                
-                self.stdout.write(f"   Using: {location_name}")
-                
-                latest_url = f"https://api.openaq.org/v3/locations/{location_id}/latest"
-                
-                time.sleep(0.5)
-                latest_response = requests.get(latest_url, headers=headers, timeout=15)
-                
-                if latest_response.status_code == 200:
-                    latest_data = latest_response.json()
-                    measurements = latest_data.get('results', [])
-                    
-                    for measurement in measurements:
-                        value = measurement.get('value')
-                        sensors_id = measurement.get('sensorsId')
-                        datetime_info = measurement.get('datetime', {})
-                        timestamp_str = datetime_info.get('utc')
-                        
-                        if not sensors_id or value is None or not timestamp_str:
-                            continue
-                        
-                        # Get sensor info (with caching)
-                        if sensors_id not in sensor_cache:
-                            time.sleep(0.3)
-                            sensors_url = f"https://api.openaq.org/v3/sensors/{sensors_id}"
-                            sensors_response = requests.get(sensors_url, headers=headers, timeout=10)
-                            
-                            if sensors_response.status_code == 200:
-                                sensor_data = sensors_response.json()
-                                
-                                # Access results array first
-                                sensor_results = sensor_data.get('results', [])
-                                if sensor_results:
-                                    sensor_info_obj = sensor_results[0]
-                                    parameter_info = sensor_info_obj.get('parameter', {})
-                                    
-                                    parameter_id = parameter_info.get('id')
-                                    parameter_name = parameter_info.get('name')
-                                    
-                                    sensor_cache[sensors_id] = {
-                                        'id': parameter_id,
-                                        'name': parameter_name
-                                    }
-                                    self.stdout.write(f"   Sensor {sensors_id}: {parameter_name} (ID: {parameter_id})")
-                                else:
-                                    sensor_cache[sensors_id] = None
-                            else:
-                                self.stdout.write(f"   ✗ Sensor {sensors_id} API error: {sensors_response.status_code}")
-                                sensor_cache[sensors_id] = None
-                        
-                        sensor_info = sensor_cache.get(sensors_id)
-                        if not sensor_info:
+                station = stations.setdefault(school.station_id, {'name': school.station.name, 'schools': []})
+                station['schools'].append(school)
+
+            with self.phase(run, 'location_lookup'):
+                futures = [executor.submit(self.find_station, client, school) for school in lookups]
+
+                for future in as_completed(futures):
+                    school, station, lines, error = future.result()
+
+                    for line in lines:
+                        self.log(line)
+
+                    if station is None:
+                        run.failures.append({'school': school.name, 'error': error})
+                        continue
+
+                    location_id, location_name = station
+                    stations.setdefault(location_id, {'name': location_name, 'schools': []})
+                    stations[location_id]['schools'].append(school)
+
+            # Step 2: Fetch each station's latest measurements once, then fan out to its schools
+            with self.phase(run, 'latest_fetch'):
+                states = {
+                    state.location_id: state
+                    for state in StationState.objects.filter(location_id__in=stations.keys())
+                }
+                for location_id, station in stations.items():
+                    station['state'] = states.get(location_id) or StationState(location_id=location_id)
+                    station['state'].name = station['name']
+
+                futures = {
+                    # A 304 would give a school with nothing stored (e.g. newly linked) no readings at all
+                    executor.submit(
+                        self.fetch_station, client, station['state'],
+                        conditional=all(school.id in watermarked_schools for school in station['schools'])
+                    ): station
+                    for station in stations.values()
+                }
+
+                for future in as_completed(futures):
+                    station = futures[future]
+                    readings, lines, stale_count = future.result()
+
+                    if readings == UNCHANGED:
+                        unchanged_count += 1
+                        readings = []
+
+                    for line in lines:
+                        self.log(line)
+
+                    for school in station['schools']:
+                        if readings is None:
+                            self.log(self.style.ERROR(f"   ✗ {school.name}: no data from {station['name']}"))
+                            run.failures.append({'school': school.name, 'error': f"no data from {station['name']}"})
                             continue
-                        
-                        parameter_id = sensor_info.get('id')
-                        
-                        # Map to our pollutant names
-                        pollutant_map = {
-                            1: 'PM10',   # Fresh data available
-                            2: 'PM2.5',  # Will be filtered if stale
-                            5: 'NO2'     # Fresh data available
-                        }
-                        
-                        pollutant = pollutant_map.get(parameter_id)
-                        
-                        if pollutant:
-                            try:
-                                measured_at = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
-                            except:
-                                measured_at = timezone.now()
-                            
-                            # Calculate age of reading
-                            age_hours = (timezone.now() - measured_at).total_seconds() / 3600
-                            
-                            # Skip readings older than 7 days (168 hours)
-                            if age_hours > 120:
-                                self.stdout.write(f"   ⚠ Skipping stale {pollutant}: {value} µg/m³ ({age_hours:.0f}h / {age_hours/24:.1f} days old)")
+
+                        fetched_schools.append(school)
+                        run.rows_stale += stale_count
+                        for pollutant, value, measured_at in readings:
+                            watermark = watermarks.get((school.id, pollutant))
+                            if watermark is not None and measured_at <= watermark:
+                                run.rows_skipped += 1
                                 continue
-                            
-                            # Store reading
-                            reading, created = AirQualityReading.objects.get_or_create(
-                                school=school,
-                                pollutant=pollutant,
-                                measured_at=measured_at,
-                                defaults={'value': value}
-                            )
-                            
-                            if created:
-                                stored_count += 1
-                                self.stdout.write(f"   ✓ {pollutant}: {value} µg/m³ ({age_hours:.1f}h old)")
-                
-                if stored_count > 0:
-                    self.stdout.write(self.style.SUCCESS(f"   ✓ Stored {stored_count} new reading(s)\n"))
-                    success_count += 1
-                else:
-                    self.stdout.write(self.style.WARNING(f"   ⚠ No fresh readings\n"))
-                    success_count += 1
-                    
-            except requests.exceptions.Timeout:
-                self.stdout.write(self.style.ERROR(f"   ✗ Timeout\n"))
-                fail_count += 1
-            except Exception as e:
-                self.stdout.write(self.style.ERROR(f"   ✗ Error: {str(e)}\n"))
-                import traceback
-                self.stdout.write(traceback.format_exc())
-                fail_count += 1
-        
+                            buffer.append(AirQualityReading(school=school, pollutant=pollutant, value=value, measured_at=measured_at))
+
+                    self.log("")
+
+        # Step 3: Store the whole run's readings in one batched insert
+        with self.phase(run, 'db_write'):
+            new_readings = AirQualityReading.objects.bulk_insert_new(buffer)
+            stored_counts = Counter(reading.school_id for reading in new_readings)
+
+            self.schedule_stations(stations, stored_counts)
+            self.save_station_states([station['state'] for station in stations.values()])
+            self.link_schools(stations, lookups)
+            self.save_sensor_cache(client)
+
+        for school in fetched_schools:
+            stored_count = stored_counts[school.id]
+
+            if stored_count > 0:
+                self.log(self.style.SUCCESS(f"   ✓ {school.name}: stored {stored_count} new reading(s)"))
+            else:
+                self.log(self.style.WARNING(f"   ⚠ {school.name}: no fresh readings"))
+
+        # Every school sharing a station would otherwise have made its own /latest call
+        resolved_count = sum(len(station['schools']) for station in stations.values())
+
+        # Sensor lookups happen inside the latest fetch workers, so report their summed request time
+        run.endpoint_stats = client.latency_summary()
+        sensor_stats = run.endpoint_stats.get('/sensors/{id}', {})
+        run.phase_durations['sensor_lookup'] = round(sensor_stats.get('total_ms', 0) / 1000, 3)
+
+        run.schools_succeeded = len(fetched_schools)
+        run.schools_failed = len(run.failures)
+        run.stations = len(stations)
+        run.api_calls_saved = resolved_count - len(stations)
+        run.rows_inserted = len(new_readings)
+        run.finished_at = timezone.now()
+        run.save()
+
         # Summary
-        self.stdout.write("=" * 60)
-        if success_count > 0:
-            self.stdout.write(self.style.SUCCESS(f"✓ Successfully fetched data for {success_count}/{schools.count()} school(s)"))
-        if fail_count > 0:
-            self.stdout.write(self.style.ERROR(f"✗ Failed for {fail_count} school(s)"))
\ No newline at end of file
+        self.log("=" * 60)
+        if run.schools_succeeded > 0:
+            self.log(self.style.SUCCESS(f"✓ Successfully fetched data for {run.schools_succeeded}/{len(schools)} school(s)"))
+        if run.schools_failed > 0:
+            self.log(self.style.ERROR(f"✗ Failed for {run.schools_failed} school(s)"))
+        self.log(f"{resolved_count} school(s) shared {len(stations)} station(s), saving {run.api_calls_saved} API call(s)")
+        self.log(f"Reused the stored station for {len(schools) - len(lookups)} school(s), looked up {len(lookups)}")
+        self.log(f"Looked up {len(client.sensors_fetched)} sensor(s), {len(client.sensors_used) - len(client.sensors_fetched)} from cache")
+        self.log(f"{unchanged_count} station(s) unchanged since last run, {run.rows_skipped} reading(s) already stored")
+        self.log(f"Phases: " + ", ".join(f"{name} {seconds}s" for name, seconds in run.phase_durations.items()))
+        self.write_latency_summary(client)
+
+        return run
+
+    def load_watermarks(self, schools):
+        """Latest stored measured_at for each of `schools`' pollutants with a reading recent enough to matter.
+
+        Anything older than STALE_AFTER_HOURS is dropped as stale before it
+        is compared with a watermark, so only that window is grouped.
+        """
+        latest = (
+            AirQualityReading.objects
+            .filter(
+                school_id__in=[school.id for school in schools],
+                measured_at__gte=timezone.now() - timedelta(hours=STALE_AFTER_HOURS),
+            )
+            .order_by()
+            .values('school_id', 'pollutant')
+            .annotate(latest=Max('measured_at'))
+        )
+        return {(row['school_id'], row['pollutant']): row['latest'] for row in latest}
+
+    def learn_update_intervals(self, stations):
+        """Median gap between distinct measured_at values in each station's recent readings"""
+        station_of = {
+            school.id: location_id
+            for location_id, station in stations.items()
+            for school in station['schools']
+        }
+        history = (
+            AirQualityReading.objects
+            .filter(school_id__in=station_of.keys(), measured_at__gte=timezone.now() - INTERVAL_LEARNING_WINDOW)
+            .order_by()
+            .values_list('school_id', 'measured_at')
+            .distinct()
+        )
+
+        timestamps = defaultdict(set)
+        for school_id, measured_at in history:
+            timestamps[station_of[school_id]].add(measured_at)
+
+        intervals = {}
+        for location_id, times in timestamps.items():
+            times = sorted(times)
+            gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+            if gaps:
+                intervals[location_id] = statistics.median(gaps)
+        return intervals
+
+    def schedule_stations(self, stations, stored_counts):
+        """Work out when each station fetched this run should next be polled"""
+        now = timezone.now()
+        intervals = self.learn_update_intervals(stations)
+
+        for location_id, station in stations.items():
+            state = station['state']
+            state.update_interval = intervals.get(location_id, state.update_interval)
+            got_new_data = any(stored_counts[school.id] for school in station['schools'])
+            state.schedule_next_poll(now, got_new_data)
+
+    def link_schools(self, stations, looked_up):
+        """Remember which station each looked-up school resolved to, and when"""
+        now = timezone.now()
+        looked_up_ids = {school.id for school in looked_up}
+        changed = []
+        for location_id, station in stations.items():
+            for school in station['schools']:
+                if school.id in looked_up_ids:
+                    school.station_id = location_id
+                    school.station_checked_at = now
+                    changed.append(school)
+
+        School.objects.bulk_update(changed, ['station', 'station_checked_at'], batch_size=500)
+
+    def save_station_states(self, states):
+        """Upsert what we saw from every station this run in one query"""
+        if not states:
+            return
+
+        now = timezone.now()
+        for state in states:
+            state.checked_at = now
+
+        StationState.objects.bulk_create(
+            states,
+            update_conflicts=True,
+            unique_fields=['location_id'],
+            update_fields=[
+                'name', 'etag', 'last_modified', 'latest_measured_at', 'checked_at',
+                'update_interval', 'next_poll_at', 'empty_polls',
+            ],
+        )
+
+    def write_latency_summary(self, client):
+        for endpoint, stats in client.latency_summary().items():
+            self.log(
+                f"   {endpoint}: {stats['requests']} request(s), {stats['retries']} retried, "
+                f"p50 {stats['p50_ms']}ms, p95 {stats['p95_ms']}ms, max {stats['max_ms']}ms"
+            )
+
+    def load_sensor_cache(self, ttl_days):
+        """Load sensor metadata fetched within the TTL, keyed by sensor ID.
+
+        A sensor whose lookup failed is cached as None, so it is not looked
+        up again until its entry expires.
+        """
+        cutoff = timezone.now() - timedelta(days=ttl_days)
+        cached = SensorMetadata.objects.filter(fetched_at__gte=cutoff)
+        return {
+            sensor.sensor_id: (
+                None if sensor.parameter_id is None
+                else {'id': sensor.parameter_id, 'name': sensor.parameter_name}
+            )
+            for sensor in cached
+        }
+
+    def save_sensor_cache(self, client):
+        """Persist newly fetched sensors, failed lookups included, mark used ones and evict long-unused entries"""
+        now = timezone.now()
+
+        for sensors_id, info in client.sensors_fetched.items():
+            info = info or {}
+            SensorMetadata.objects.update_or_create(
+                sensor_id=sensors_id,
+                defaults={
+                    'parameter_id': info.get('id'),
+                    'parameter_name': info.get('name') or '',
+                    'fetched_at': now,
+                    'last_used_at': now,
+                }
+            )
+
+        SensorMetadata.objects.filter(sensor_id__in=client.sensors_used).update(last_used_at=now)
+        SensorMetadata.objects.filter(last_used_at__lt=now - timedelta(days=SENSOR_EVICT_AFTER_DAYS)).delete()
+
+    def find_station(self, client, school):
+        """Find the nearest monitoring station for a school - runs in a worker thread, no DB access.
+
+        Returns (school, (location_id, name) or None, lines, error).
+        """
+        lines = [f"📍 {school.name}..."]
+
+        try:
+            locations_response = client.find_locations(school.latitude, school.longitude)
+
+            if locations_response.status_code != 200:
+                error = f"API error: {locations_response.status_code}"
+                lines.append(self.style.ERROR(f"   ✗ {error}\n"))
+                return school, None, lines, error
+
+            locations = locations_response.json().get('results', [])
+
+            if not locations:
+                error = "No monitoring stations within 5km"
+                lines.append(self.style.WARNING(f"   ⚠ {error}\n"))
+                return school, None, lines, error
+
+            location = locations[0]
+            location_name = location.get('name', 'Unknown')
+            lines.append(f"   Using: {location_name}")
+            return school, (location.get('id'), location_name), lines, None
+
+        except requests.exceptions.Timeout:
+            error = "Timeout"
+            lines.append(self.style.ERROR(f"   ✗ Timeout\n"))
+        except Exception as e:
+            error = str(e)
+            lines.append(self.style.ERROR(f"   ✗ Error: {str(e)}\n"))
+            lines.append(traceback.format_exc())
+
+        return school, None, lines, error
+
+    def fetch_station(self, client, state, conditional=True):
+        """Fetch fresh readings for one station - runs in a worker thread, no DB access.
+
+        Unless `conditional` is False, sends the validators saved on `state`
+        so an unchanged station can answer 304, and updates `state` from the
+        response. Returns
+        (readings, lines, stale_count); readings is None if the station
+        could not be fetched, or UNCHANGED on a 304.
+        """
+        lines = [f"📡 {state.name}..."]
+
+        try:
+            if conditional:
+                latest_response = client.latest(state.location_id, etag=state.etag, last_modified=state.last_modified)
+            else:
+                latest_response = client.latest(state.location_id)
+
+            if latest_response.status_code == 304:
+                lines.append("   No new measurements since last run")
+                return UNCHANGED, lines, 0
+
+            if latest_response.status_code != 200:
+                lines.append(self.style.ERROR(f"   ✗ API error: {latest_response.status_code}"))
+                return [], lines, 0
+
+            state.etag = latest_response.headers.get('ETag', '')
+            state.last_modified = latest_response.headers.get('Last-Modified', '')
+
+            measurements = latest_response.json().get('results', [])
+            readings, stale_count = self.parse_measurements(client, measurements, lines)
+
+            if readings:
+                state.latest_measured_at = max(measured_at for _, _, measured_at in readings)
+            return readings, lines, stale_count
+
+        except requests.exceptions.Timeout:
+            lines.append(self.style.ERROR(f"   ✗ Timeout"))
+        except Exception as e:
+            lines.append(self.style.ERROR(f"   ✗ Error: {str(e)}"))
+            lines.append(traceback.format_exc())
+
+        return None, lines, 0
+
+    def parse_measurements(self, client, measurements, lines):
+        """Turn a /latest payload into (pollutant, value, measured_at) tuples, dropping stale ones.
+
+        Returns (readings, number of stale measurements dropped).
+        """
+        readings = []
+        stale_count = 0
+
+        for measurement in measurements:
+            value = measurement.get('value')
+            sensors_id = measurement.get('sensorsId')
+            datetime_info = measurement.get('datetime', {})
+            timestamp_str = datetime_info.get('utc')
+
+            if not sensors_id or value is None or not timestamp_str:
+                continue
+
+            # Get sensor info (with caching)
+            sensor_info, message = client.sensor_parameter(sensors_id)
+            if message:
+                lines.append(f"   {message}")
+
+            if not sensor_info:
+                continue
+
+            # Map to our pollutant names
+            pollutant = POLLUTANT_MAP.get(sensor_info.get('id'))
+
+            if pollutant:
+                try:
+                    measured_at = parse_timestamp(timestamp_str)
+                except ValueError:
+                    measured_at = timezone.now()
+
+                # Calculate age of reading
+                age_hours = (timezone.now() - measured_at).total_seconds() / 3600
+
+                if age_hours > STALE_AFTER_HOURS:
+                    lines.append(f"   ⚠ Skipping stale {pollutant}: {value} µg/m³ ({age_hours:.0f}h / {age_hours/24:.1f} days old)")
+                    stale_count += 1
+                    continue
+
+                readings.append((pollutant, value, measured_at))
+                lines.append(f"   ✓ {pollutant}: {value} µg/m³ ({age_hours:.1f}h old)")
+
+        return readings, stale_count
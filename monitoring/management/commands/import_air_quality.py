@@ -0,0 +1,112 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.utils.dateparse import parse_datetime
+from monitoring.cache import bump_data_version
+from monitoring.models import School, AirQualityReading
+from monitoring.streaming import open_dump, iter_json_array
+
+
+class Command(BaseCommand):
+    help = 'Stream a dumpdata-style JSON file of schools and readings into the database in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file (.gz files are decompressed on the fly)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Objects per batched insert (default: 5000)')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        self.user_ids = set(User.objects.values_list('id', flat=True))
+        self.schools = []
+        self.readings = []
+        self.school_count = 0
+        self.new_readings = 0
+        skipped = 0
+
+        # All or nothing, like loaddata
+        with transaction.atomic(), open_dump(options['path'], 'r') as fp:
+            try:
+                for obj in iter_json_array(fp):
+                    model = obj.get('model')
+
+                    if model == 'monitoring.school':
+                        self.schools.append(self.build_school(obj))
+                    elif model == 'monitoring.airqualityreading':
+                        # Schools must be in the database before readings that point at them
+                        self.flush_schools()
+                        self.readings.append(self.build_reading(obj))
+                    else:
+                        skipped += 1
+
+                    if len(self.schools) >= batch_size:
+                        self.flush_schools()
+                    if len(self.readings) >= batch_size:
+                        self.flush_readings()
+            except ValueError as e:
+                raise CommandError(f"Could not parse {options['path']}: {e}")
+
+            self.flush_schools()
+            self.flush_readings()
+            self.reset_sequences()
+
+        # Bulk inserts send no signals, so invalidate cached map data here
+        bump_data_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Imported {self.school_count} school(s) and {self.new_readings} new reading(s)"
+        ))
+        if skipped:
+            self.stdout.write(self.style.WARNING(f"⚠ Skipped {skipped} object(s) of other models"))
+
+    def build_school(self, obj):
+        fields = obj['fields']
+        created_by = fields.get('created_by')
+        return School(
+            id=obj['pk'],
+            name=fields['name'],
+            location=fields['location'],
+            latitude=fields['latitude'],
+            longitude=fields['longitude'],
+            # Users are not part of the dump; drop links to ones that don't exist here
+            created_by_id=created_by if created_by in self.user_ids else None,
+        )
+
+    def build_reading(self, obj):
+        # The dump's pk is dropped: readings are matched on (school, pollutant, measured_at),
+        # and a pk already used by another reading here would clash with that row
+        fields = obj['fields']
+        return AirQualityReading(
+            school_id=fields['school'],
+            pollutant=fields['pollutant'],
+            value=fields['value'],
+            measured_at=parse_datetime(fields['measured_at']),
+        )
+
+    def flush_schools(self):
+        """Insert or overwrite the pending schools by primary key, as loaddata would"""
+        if not self.schools:
+            return
+        School.objects.bulk_create(
+            self.schools,
+            update_conflicts=True,
+            unique_fields=['id'],
+            update_fields=['name', 'location', 'latitude', 'longitude', 'created_by'],
+        )
+        self.school_count += len(self.schools)
+        self.schools = []
+
+    def flush_readings(self):
+        """Insert the pending readings, skipping ones already stored"""
+        if not self.readings:
+            return
+        # Also keeps the rollups in step, which a plain bulk_create would not
+        self.new_readings += len(AirQualityReading.objects.bulk_insert_new(self.readings, batch_size=len(self.readings)))
+        self.readings = []
+
+    def reset_sequences(self):
+        """Move the school ID sequence past the imported primary keys (PostgreSQL)"""
+        sql_list = connection.ops.sequence_reset_sql(no_style(), [School])
+        with connection.cursor() as cursor:
+            for sql in sql_list:
+                cursor.execute(sql)
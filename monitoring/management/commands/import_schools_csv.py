@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from monitoring.school_import import IMPORT_BATCH_SIZE, import_schools, read_school_csv
+
+
+class Command(BaseCommand):
+    help = 'Validate a CSV of schools and create them all in one transaction, or none if any row is invalid'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with name, location, latitude and longitude columns')
+        parser.add_argument('--user', help='Username to record as created_by')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                            help=f'Schools per INSERT (default: {IMPORT_BATCH_SIZE})')
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError(f"No user named '{options['user']}'")
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as fp:
+                rows = read_school_csv(fp)
+        except (OSError, UnicodeDecodeError, ValueError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}")
+
+        result = import_schools(rows, user, options['batch_size'])
+
+        if result.errors:
+            for line, messages in result.errors:
+                self.stdout.write(self.style.ERROR(f"   Line {line}: {'; '.join(messages)}"))
+            raise CommandError(f"{len(result.errors)} invalid row(s); no schools were imported")
+
+        self.stdout.write(self.style.SUCCESS(f"✓ Imported {len(result.schools)} school(s)"))
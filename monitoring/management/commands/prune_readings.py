@@ -0,0 +1,83 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Min, Sum
+from django.utils import timezone
+from monitoring.cache import bump_data_version
+from monitoring.models import School, AirQualityReading, ReadingRollup, rollup_bucket
+
+
+class Command(BaseCommand):
+    help = 'Compact old readings: keep raw rows, then hourly rollups, then daily rollups only'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--raw-days', type=int, default=90, help='Days of raw readings to keep (default: 90)')
+        parser.add_argument('--hourly-days', type=int, default=730, help='Days of hourly rollups to keep (default: 730)')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per transaction (default: 5000)')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed without deleting')
+
+    def handle(self, *args, **options):
+        if not 0 < options['raw_days'] <= options['hourly_days']:
+            raise CommandError('--raw-days must be positive and no more than --hourly-days')
+
+        # Cut at UTC midnight so whole days leave the raw table together
+        today = rollup_bucket(timezone.now(), 'day')
+        raw_cutoff = today - timedelta(days=options['raw_days'])
+        hourly_cutoff = today - timedelta(days=options['hourly_days'])
+
+        old_readings = AirQualityReading.objects.filter(measured_at__lt=raw_cutoff)
+        old_hours = ReadingRollup.objects.filter(period='hour', bucket_start__lt=hourly_cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"🔍 Would remove {old_readings.count()} raw reading(s) before {raw_cutoff:%Y-%m-%d}")
+            self.stdout.write(f"🔍 Would remove {old_hours.count()} hourly rollup(s) before {hourly_cutoff:%Y-%m-%d}")
+            return
+
+        repaired = self.ensure_rollups(raw_cutoff)
+        if repaired:
+            self.stdout.write(self.style.WARNING(f"⚠ Rebuilt missing rollups for {repaired} school(s) before pruning"))
+
+        readings_deleted = self.delete_in_batches(AirQualityReading, old_readings, options['batch_size'])
+        hours_deleted = self.delete_in_batches(ReadingRollup, old_hours, options['batch_size'])
+        if readings_deleted:
+            bump_data_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ Removed {readings_deleted} raw reading(s) before {raw_cutoff:%Y-%m-%d} "
+            f"and {hours_deleted} hourly rollup(s) before {hourly_cutoff:%Y-%m-%d}"
+        ))
+
+    def ensure_rollups(self, cutoff):
+        """Make sure every raw reading about to go is counted in the daily rollups first.
+
+        Compares raw and rolled-up counts per school over the days being
+        pruned and rebuilds that span from the raw rows where they differ.
+        """
+        repaired = 0
+        for school in School.objects.order_by('id').only('id'):
+            old = school.readings.filter(measured_at__lt=cutoff)
+            oldest = old.aggregate(oldest=Min('measured_at'))['oldest']
+            if oldest is None:
+                continue
+
+            since = rollup_bucket(oldest, 'day')
+            counted = school.rollups.filter(
+                period='day', bucket_start__gte=since, bucket_start__lt=cutoff
+            ).aggregate(counted=Sum('count'))['counted']
+            if counted != old.count():
+                ReadingRollup.objects.rebuild([school.id], since=since, until=cutoff)
+                repaired += 1
+        return repaired
+
+    def delete_in_batches(self, model, queryset, batch_size):
+        """Delete by primary key a batch at a time, so no transaction holds locks for long"""
+        deleted = 0
+        while True:
+            ids = list(queryset.order_by().values_list('id', flat=True)[:batch_size])
+            if not ids:
+                return deleted
+            with transaction.atomic():
+                batch = model.objects.filter(id__in=ids)
+                # Pruned readings live on in the rollups, so don't recount their days
+                deleted += (batch.delete_keeping_rollups() if model is AirQualityReading else batch.delete())[0]
+            self.stdout.write(f"   🗑  {model._meta.verbose_name_plural}: {deleted} removed so far")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from monitoring.cache import bump_data_version
+from monitoring.models import ReadingRollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the hourly/daily reading rollups from the raw readings still stored (e.g. after deleting readings)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--school', type=int, action='append', help='Only rebuild this school ID (repeatable)')
+
+    def handle(self, *args, **options):
+        ReadingRollup.objects.rebuild(options['school'])
+        bump_data_version()
+
+        self.stdout.write(self.style.SUCCESS(f"✓ {ReadingRollup.objects.count()} rollup bucket(s) rebuilt"))
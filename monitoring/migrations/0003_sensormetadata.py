@@ -0,0 +1,28 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0002_school_created_by'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SensorMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sensor_id', models.BigIntegerField(unique=True)),
+                ('parameter_id', models.IntegerField(blank=True, null=True)),
+                ('parameter_name', models.CharField(blank=True, max_length=50)),
+                ('fetched_at', models.DateTimeField()),
+                ('last_used_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'Sensor Metadata',
+                'verbose_name_plural': 'Sensor Metadata',
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:49
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_readings(apps, schema_editor):
+    """Keep the oldest row of every (school, pollutant, measured_at) duplicate"""
+    AirQualityReading = apps.get_model('monitoring', 'AirQualityReading')
+
+    duplicates = (
+        AirQualityReading.objects
+        .values('school_id', 'pollutant', 'measured_at')
+        .annotate(keep_id=Min('id'), total=Count('id'))
+        .filter(total__gt=1)
+    )
+
+    for duplicate in duplicates:
+        AirQualityReading.objects.filter(
+            school_id=duplicate['school_id'],
+            pollutant=duplicate['pollutant'],
+            measured_at=duplicate['measured_at'],
+        ).exclude(id=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0003_sensormetadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_readings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='airqualityreading',
+            constraint=models.UniqueConstraint(fields=('school', 'pollutant', 'measured_at'), name='unique_reading_per_school_pollutant_time'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:49
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0004_unique_reading'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BackfillCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pollutant', models.CharField(choices=[('PM2.5', 'PM2.5 (Fine Particulate Matter)'), ('NO2', 'NO2 (Nitrogen Dioxide)'), ('PM10', 'PM10 (Coarse Particulate Matter)'), ('O3', 'O3 (Ozone)'), ('SO2', 'SO2 (Sulfur Dioxide)')], max_length=50)),
+                ('sensor_id', models.BigIntegerField()),
+                ('date_from', models.DateTimeField()),
+                ('date_to', models.DateTimeField()),
+                ('cursor', models.DateTimeField(blank=True, null=True)),
+                ('rows_inserted', models.PositiveIntegerField(default=0)),
+                ('completed', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='backfill_checkpoints', to='monitoring.school')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('school', 'pollutant', 'date_from', 'date_to'), name='unique_backfill_per_range')],
+            },
+        ),
+    ]
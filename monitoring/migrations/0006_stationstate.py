@@ -0,0 +1,25 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0005_backfillcheckpoint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StationState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location_id', models.BigIntegerField(unique=True)),
+                ('name', models.CharField(blank=True, max_length=200)),
+                ('etag', models.CharField(blank=True, max_length=200)),
+                ('last_modified', models.CharField(blank=True, max_length=100)),
+                ('latest_measured_at', models.DateTimeField(blank=True, null=True)),
+                ('checked_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0006_stationstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FetchRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('started_at', models.DateTimeField()),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('schools_total', models.PositiveIntegerField(default=0)),
+                ('schools_succeeded', models.PositiveIntegerField(default=0)),
+                ('schools_failed', models.PositiveIntegerField(default=0)),
+                ('stations', models.PositiveIntegerField(default=0)),
+                ('api_calls_saved', models.PositiveIntegerField(default=0)),
+                ('rows_inserted', models.PositiveIntegerField(default=0)),
+                ('rows_stale', models.PositiveIntegerField(default=0)),
+                ('rows_skipped', models.PositiveIntegerField(default=0)),
+                ('phase_durations', models.JSONField(blank=True, default=dict)),
+                ('endpoint_stats', models.JSONField(blank=True, default=dict)),
+                ('failures', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'ordering': ['-started_at'],
+            },
+        ),
+    ]
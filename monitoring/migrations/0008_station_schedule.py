@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0007_fetchrun'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='station',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='schools', to='monitoring.stationstate', to_field='location_id'),
+        ),
+        migrations.AddField(
+            model_name='stationstate',
+            name='empty_polls',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='stationstate',
+            name='next_poll_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='stationstate',
+            name='update_interval',
+            field=models.DurationField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0008_station_schedule'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='airqualityreading',
+            index=models.Index(fields=['school', 'pollutant', '-value'], name='reading_school_poll_value_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0009_reading_value_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='airqualityreading',
+            index=models.Index(fields=['-measured_at'], name='reading_measured_at_idx'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.8 on 2026-10-18 07:59
+
+from django.db import migrations, models
+
+# Copied from monitoring.models as it was when this migration was written,
+# so later changes there cannot alter what this migration does
+GRID_CELL_DEGREES = 0.1
+GRID_COLUMNS = round(360 / GRID_CELL_DEGREES)
+GRID_ROWS = round(180 / GRID_CELL_DEGREES)
+
+
+def grid_cell(latitude, longitude):
+    """Row-major grid cell number for a point"""
+    row = min(max(int((latitude + 90) // GRID_CELL_DEGREES), 0), GRID_ROWS - 1)
+    column = min(max(int((longitude + 180) // GRID_CELL_DEGREES), 0), GRID_COLUMNS - 1)
+    return row * GRID_COLUMNS + column
+
+
+def fill_grid_cells(apps, schema_editor):
+    """Bucket the schools that existed before grid_cell was added"""
+    School = apps.get_model('monitoring', 'School')
+
+    schools = list(School.objects.only('id', 'latitude', 'longitude'))
+    for school in schools:
+        school.grid_cell = grid_cell(school.latitude, school.longitude)
+    School.objects.bulk_update(schools, ['grid_cell'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0010_reading_measured_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='grid_cell',
+            field=models.IntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(fill_grid_cells, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:04
+
+from datetime import timezone as dt_timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+# Copied from monitoring.models as it was when this migration was written,
+# so later changes there cannot alter what this migration does
+ROLLUP_PERIODS = ('hour', 'day')
+
+
+def rollup_bucket(moment, period):
+    """Start of the UTC hour or day containing moment"""
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    start = moment.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return start.replace(hour=0) if period == 'day' else start
+
+
+def summarise_readings(rows):
+    """Hourly and daily [count, total, minimum, maximum, peak_measured_at] per bucket"""
+    summaries = {}
+    for school_id, pollutant, measured_at, value in rows:
+        for period in ROLLUP_PERIODS:
+            key = (school_id, pollutant, period, rollup_bucket(measured_at, period))
+            summary = summaries.get(key)
+            if summary is None:
+                summaries[key] = [1, value, value, value, measured_at]
+                continue
+            summary[0] += 1
+            summary[1] += value
+            summary[2] = min(summary[2], value)
+            if value > summary[3]:
+                summary[3], summary[4] = value, measured_at
+    return summaries
+
+
+def build_rollups(apps, schema_editor):
+    """Summarise the readings stored before rollups existed, one school at a time"""
+    School = apps.get_model('monitoring', 'School')
+    AirQualityReading = apps.get_model('monitoring', 'AirQualityReading')
+    ReadingRollup = apps.get_model('monitoring', 'ReadingRollup')
+
+    for school_id in School.objects.values_list('id', flat=True):
+        rows = AirQualityReading.objects.filter(school_id=school_id).order_by().values_list(
+            'school_id', 'pollutant', 'measured_at', 'value'
+        )
+        ReadingRollup.objects.bulk_create(
+            (
+                ReadingRollup(
+                    school_id=school_id,
+                    pollutant=pollutant,
+                    period=period,
+                    bucket_start=bucket_start,
+                    count=count,
+                    total=total,
+                    minimum=minimum,
+                    maximum=maximum,
+                    peak_measured_at=peak_measured_at,
+                )
+                for (school_id, pollutant, period, bucket_start), (count, total, minimum, maximum, peak_measured_at)
+                in summarise_readings(rows.iterator()).items()
+            ),
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0011_school_grid_cell'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReadingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pollutant', models.CharField(choices=[('PM2.5', 'PM2.5 (Fine Particulate Matter)'), ('NO2', 'NO2 (Nitrogen Dioxide)'), ('PM10', 'PM10 (Coarse Particulate Matter)'), ('O3', 'O3 (Ozone)'), ('SO2', 'SO2 (Sulfur Dioxide)')], max_length=50)),
+                ('period', models.CharField(choices=[('hour', 'Hour'), ('day', 'Day')], max_length=4)),
+                ('bucket_start', models.DateTimeField()),
+                ('count', models.PositiveIntegerField()),
+                ('total', models.FloatField()),
+                ('minimum', models.FloatField()),
+                ('maximum', models.FloatField()),
+                ('peak_measured_at', models.DateTimeField()),
+                ('school', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='monitoring.school')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['school', 'pollutant', 'period', '-maximum'], name='rollup_school_poll_max_idx')],
+                'constraints': [models.UniqueConstraint(fields=('school', 'pollutant', 'period', 'bucket_start'), name='unique_rollup_bucket')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
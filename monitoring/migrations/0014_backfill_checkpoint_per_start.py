@@ -0,0 +1,34 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:26
+
+from django.db import migrations, models
+
+
+def keep_latest_range(apps, schema_editor):
+    """Keep one checkpoint per school, pollutant and start: the one reaching furthest"""
+    BackfillCheckpoint = apps.get_model('monitoring', 'BackfillCheckpoint')
+    seen = set()
+    for checkpoint in BackfillCheckpoint.objects.order_by('school_id', 'pollutant', 'date_from', '-date_to', '-id'):
+        key = (checkpoint.school_id, checkpoint.pollutant, checkpoint.date_from)
+        if key in seen:
+            checkpoint.delete()
+        else:
+            seen.add(key)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0013_school_name_index'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='backfillcheckpoint',
+            name='unique_backfill_per_range',
+        ),
+        migrations.RunPython(keep_latest_range, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='backfillcheckpoint',
+            constraint=models.UniqueConstraint(fields=('school', 'pollutant', 'date_from'), name='unique_backfill_per_start'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0014_backfill_checkpoint_per_start'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='school',
+            name='station_checked_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+    ]
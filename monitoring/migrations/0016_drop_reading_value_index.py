@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-18 08:31
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0015_school_station_checked_at'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='airqualityreading',
+            name='reading_school_poll_value_idx',
+        ),
+    ]
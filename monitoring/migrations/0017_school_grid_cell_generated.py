@@ -0,0 +1,26 @@
+# Generated by Django 5.2.8 on 2026-10-18 09:08
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+import django.db.models.functions.math
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('monitoring', '0016_drop_reading_value_index'),
+    ]
+
+    # A regular column can't be altered into a generated one, so it is dropped and re-added
+    operations = [
+        migrations.RemoveField(
+            model_name='school',
+            name='grid_cell',
+        ),
+        migrations.AddField(
+            model_name='school',
+            name='grid_cell',
+            field=models.GeneratedField(db_index=True, db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Greatest(django.db.models.functions.comparison.Least(django.db.models.functions.comparison.Cast(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('latitude'), '+', models.Value(90)), '/', models.Value(0.1))), models.IntegerField()), 1799), 0), '*', models.Value(3600)), '+', django.db.models.functions.comparison.Greatest(django.db.models.functions.comparison.Least(django.db.models.functions.comparison.Cast(django.db.models.functions.math.Floor(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(models.F('longitude'), '+', models.Value(180)), '/', models.Value(0.1))), models.IntegerField()), 3599), 0)), output_field=models.IntegerField()),
+        ),
+    ]
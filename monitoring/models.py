@@ -1,5 +1,289 @@
-from django.db import models
+import math
+from datetime import timedelta, timezone as dt_timezone
+from django.db import models, transaction
+from django.db.models.functions import Cast, Coalesce, Floor, Greatest, Least, NullIf, TruncDay
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .cache import bump_data_version
+
+# Assumed publishing interval for a station we have no history for yet
+DEFAULT_UPDATE_INTERVAL = timedelta(hours=1)
+
+# Slack after a station's expected publish time before we poll it
+POLL_GRACE = timedelta(minutes=5)
+
+# Longest a stale station is left between polls
+MAX_POLL_BACKOFF = timedelta(days=1)
+
+# Size of a School.grid_cell square, roughly 11km north-south
+GRID_CELL_DEGREES = 0.1
+GRID_COLUMNS = round(360 / GRID_CELL_DEGREES)
+GRID_ROWS = round(180 / GRID_CELL_DEGREES)
+
+# Beyond this many grid rows a bbox is searched as one latitude band
+MAX_BBOX_ROW_RANGES = 32
+
+# Bucket lengths of ReadingRollup, all aligned to UTC
+ROLLUP_PERIODS = {
+    'hour': timedelta(hours=1),
+    'day': timedelta(days=1),
+}
+
+# Marks an annotation that with_stats() did not set
+MISSING = object()
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+
+
+def pollutant_key(pollutant):
+    """Attribute-safe name for a pollutant, e.g. 'PM2.5' -> 'pm25'"""
+    return pollutant.lower().replace('.', '')
+
+
+# floor(x / size) rather than x // size, so Python agrees with the database's FLOOR()
+def grid_row(latitude):
+    return min(max(math.floor((latitude + 90) / GRID_CELL_DEGREES), 0), GRID_ROWS - 1)
+
+
+def grid_column(longitude):
+    return min(max(math.floor((longitude + 180) / GRID_CELL_DEGREES), 0), GRID_COLUMNS - 1)
+
+
+def grid_cell(latitude, longitude):
+    """Row-major grid cell number for a point, so a row of cells is one contiguous range"""
+    return grid_row(latitude) * GRID_COLUMNS + grid_column(longitude)
+
+
+def grid_index_expression(field, offset, count):
+    """grid_row()/grid_column() as a database expression over a coordinate field"""
+    index = Cast(Floor((models.F(field) + offset) / GRID_CELL_DEGREES), models.IntegerField())
+    return Greatest(Least(index, count - 1), 0)
+
+
+# grid_cell() computed by the database, so every write path keeps it in sync
+GRID_CELL_EXPRESSION = (
+    grid_index_expression('latitude', 90, GRID_ROWS) * GRID_COLUMNS
+    + grid_index_expression('longitude', 180, GRID_COLUMNS)
+)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2
+         + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+def as_utc(moment):
+    """An aware UTC datetime, treating naive values as the default time zone like the ORM does"""
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment.astimezone(dt_timezone.utc)
+
+
+def rollup_bucket(moment, period):
+    """Start of the UTC hour or day containing moment"""
+    start = as_utc(moment).replace(minute=0, second=0, microsecond=0)
+    return start.replace(hour=0) if period == 'day' else start
+
+
+def summarise_readings(rows):
+    """Hourly and daily [count, total, minimum, maximum, peak_measured_at] per bucket.
+
+    rows are (school_id, pollutant, measured_at, value) tuples; the result
+    is keyed by (school_id, pollutant, period, bucket_start).
+    """
+    summaries = {}
+    for school_id, pollutant, measured_at, value in rows:
+        measured_at = as_utc(measured_at)
+        for period in ROLLUP_PERIODS:
+            key = (school_id, pollutant, period, rollup_bucket(measured_at, period))
+            summary = summaries.get(key)
+            if summary is None:
+                summaries[key] = [1, value, value, value, measured_at]
+            else:
+                merge_summary(summary, [1, value, value, value, measured_at])
+    return summaries
+
+
+def merge_summary(summary, other):
+    """Fold one bucket summary into another in place"""
+    summary[0] += other[0]
+    summary[1] += other[1]
+    summary[2] = min(summary[2], other[2])
+    if other[3] > summary[3]:
+        summary[3], summary[4] = other[3], other[4]
+
+
+def whole_hours(since=None, until=None):
+    """since rounded up and until rounded down to the hour"""
+    if since is not None:
+        hour = rollup_bucket(since, 'hour')
+        since = hour if hour == as_utc(since) else hour + ROLLUP_PERIODS['hour']
+    if until is not None:
+        until = rollup_bucket(until, 'hour')
+    return since, until
+
+
+def rollup_filter(since=None, until=None):
+    """Q for the fewest rollup buckets covering the whole hours in [since, until).
+
+    Whole days come from daily rollups and only the partial days at either
+    end from hourly ones, so a year costs about 365 rows rather than 8760.
+    Readings in a partial hour at either end are matched by partial_hours().
+    """
+    since, until = whole_hours(since, until)
+    if since is not None and until is not None and since >= until:
+        return models.Q(pk__in=[])
+
+    first_day = since and rollup_bucket(since + ROLLUP_PERIODS['day'] - ROLLUP_PERIODS['hour'], 'day')
+    last_day = until and rollup_bucket(until, 'day')
+    if first_day and last_day and first_day >= last_day:
+        return models.Q(period='hour', **bucket_bounds(since, until))
+
+    buckets = models.Q(period='day', **bucket_bounds(first_day, last_day))
+    if since is not None:
+        buckets |= models.Q(period='hour', **bucket_bounds(since, first_day))
+    if until is not None:
+        buckets |= models.Q(period='hour', **bucket_bounds(last_day, until))
+    return buckets
+
+
+def partial_hours(since=None, until=None):
+    """Q for the readings in [since, until) that rollup_filter() leaves out, or None if there are none"""
+    first, last = whole_hours(since, until)
+    if first is not None and last is not None and first >= last:
+        return models.Q(measured_at__gte=since, measured_at__lt=until)
+
+    partial = None
+    if since is not None and first != as_utc(since):
+        partial = models.Q(measured_at__gte=since, measured_at__lt=first)
+    if until is not None and last != as_utc(until):
+        tail = models.Q(measured_at__gte=last, measured_at__lt=until)
+        partial = tail if partial is None else partial | tail
+    return partial
+
+
+def bucket_bounds(start, end):
+    bounds = {}
+    if start is not None:
+        bounds['bucket_start__gte'] = start
+    if end is not None:
+        bounds['bucket_start__lt'] = end
+    return bounds
+
+
+class SchoolQuerySet(models.QuerySet):
+    """Set-based lookups that avoid one query per school"""
+
+    def with_latest_readings(self, pollutants=('PM10', 'NO2')):
+        """Annotate each school with its latest value per pollutant, e.g. `latest_pm10`.
+
+        Each pollutant is a correlated subquery, so the whole list costs a
+        single query however many schools there are.
+        """
+        annotations = {}
+        for pollutant in pollutants:
+            latest = AirQualityReading.objects.filter(
+                school=models.OuterRef('pk'),
+                pollutant=pollutant
+            ).order_by('-measured_at').values('value')[:1]
+            annotations[f'latest_{pollutant_key(pollutant)}'] = models.Subquery(latest)
+        return self.annotate(**annotations)
+
+    def with_stats(self, pollutants=('PM10', 'NO2'), since=None):
+        """Annotate each school with latest, average, peak and count per pollutant.
+
+        Adds `latest_pm10`, `average_pm10`, `peak_pm10` and `count_pm10` (and
+        so on), plus `stats_since`. Averages, peaks and counts are grouped
+        subqueries over the rollups, plus the raw readings before the first
+        whole hour when `since` is not on the hour, so the whole list is one
+        query. School's statistics methods return these values instead of
+        querying when called without a range on a school annotated without
+        `since`.
+        """
+        buckets = ReadingRollup.objects.filter(rollup_filter(since), school=models.OuterRef('pk')).order_by()
+        partial = partial_hours(since)
+        annotations = {'stats_since': models.Value(since, output_field=models.DateTimeField())}
+        for pollutant in pollutants:
+            key = pollutant_key(pollutant)
+            grouped = buckets.filter(pollutant=pollutant).values('school')
+            total = models.Subquery(grouped.annotate(total=models.Sum('total')).values('total'))
+            count = Coalesce(models.Subquery(grouped.annotate(stored=models.Sum('count')).values('stored')), 0)
+            peak = models.Subquery(grouped.annotate(peak=models.Max('maximum')).values('peak'))
+            if partial is not None:
+                raw = AirQualityReading.objects.filter(
+                    partial, school=models.OuterRef('pk'), pollutant=pollutant
+                ).order_by().values('school')
+                raw_peak = models.Subquery(raw.annotate(peak=models.Max('value')).values('peak'))
+                total = Coalesce(total, 0.0) + Coalesce(
+                    models.Subquery(raw.annotate(total=models.Sum('value')).values('total')), 0.0
+                )
+                count = models.ExpressionWrapper(count + Coalesce(
+                    models.Subquery(raw.annotate(stored=models.Count('pk')).values('stored')), 0
+                ), output_field=models.IntegerField())
+                # Greatest() is NULL if either side is on SQLite
+                peak = Greatest(Coalesce(peak, raw_peak), Coalesce(raw_peak, peak))
+            annotations[f'average_{key}'] = models.ExpressionWrapper(
+                total / NullIf(count, 0), output_field=models.FloatField()
+            )
+            annotations[f'peak_{key}'] = peak
+            annotations[f'count_{key}'] = count
+        return self.with_latest_readings(pollutants).annotate(**annotations)
+
+    def within_grid(self, first_row, last_row, first_column, last_column):
+        """Schools in a block of grid cells, found through the indexed grid_cell column.
+
+        Small blocks become one grid_cell range per row of cells; larger ones a
+        whole latitude band, so they can also hold schools outside the columns.
+        """
+        if last_row - first_row < MAX_BBOX_ROW_RANGES:
+            cells = models.Q()
+            for row in range(first_row, last_row + 1):
+                start = row * GRID_COLUMNS
+                cells |= models.Q(grid_cell__range=(start + first_column, start + last_column))
+        else:
+            cells = models.Q(grid_cell__range=(first_row * GRID_COLUMNS, (last_row + 1) * GRID_COLUMNS - 1))
+        return self.filter(cells)
+
+    def within_bbox(self, west, south, east, north):
+        """Schools inside a bounding box: the grid cells it touches, trimmed by the exact coordinates"""
+        return self.within_grid(
+            grid_row(south), grid_row(north), grid_column(west), grid_column(east)
+        ).filter(latitude__range=(south, north), longitude__range=(west, east))
+
+    def nearest(self, latitude, longitude, k=1):
+        """The k schools closest to a point, nearest first, each with a `distance_km` attribute.
+
+        Searches a box around the point that doubles in size until it holds
+        k schools no further away than the box's inner radius, so only
+        nearby rows are read however large the table is.
+        """
+        if k < 1:
+            return []
+
+        # Half a grid cell usually holds a few schools in a city, so one query suffices
+        radius = GRID_CELL_DEGREES / 2
+        while True:
+            span = radius / max(math.cos(math.radians(latitude)), 0.01)
+            candidates = list(self.within_bbox(
+                max(longitude - span, -180), max(latitude - radius, -90),
+                min(longitude + span, 180), min(latitude + radius, 90),
+            ))
+            for school in candidates:
+                school.distance_km = haversine_km(latitude, longitude, school.latitude, school.longitude)
+            candidates.sort(key=lambda school: school.distance_km)
+
+            # Anything closer than `radius` degrees of latitude must be inside the box
+            covered = radius >= 180 or (
+                len(candidates) >= k and candidates[k - 1].distance_km <= radius * KM_PER_DEGREE
+            )
+            if covered:
+                return candidates[:k]
+            radius *= 2
+
 
 class School(models.Model):
     """A school that we're monitoring - US-1"""
@@ -7,48 +291,214 @@ class School(models.Model):
     location = models.CharField(max_length=200)
     latitude = models.FloatField()
     longitude = models.FloatField()
+
+    # Spatial bucket for bbox/nearest lookups, computed by the database from the coordinates
+    grid_cell = models.GeneratedField(
+        expression=GRID_CELL_EXPRESSION, output_field=models.IntegerField(), db_persist=True, db_index=True
+    )
     
     created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='schools')
+
+    # Nearest OpenAQ station, as last resolved by fetch_air_quality
+    station = models.ForeignKey(
+        'StationState', to_field='location_id', on_delete=models.SET_NULL,
+        null=True, blank=True, related_name='schools'
+    )
+    # When that station was last looked up; links are reused until it is too old
+    station_checked_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = SchoolQuerySet.as_manager()
+
+    def annotated_stat(self, name, pollutant, since=None, until=None):
+        """The value with_stats() annotated for an all-time statistic, or MISSING"""
+        if since is not None or until is not None or getattr(self, 'stats_since', None) is not None:
+            return MISSING
+        return getattr(self, f'{name}_{pollutant_key(pollutant)}', MISSING)
     
     def get_latest_reading(self, pollutant="PM2.5"):
         """Get most recent pollution reading for a specific pollutant"""
+        # Set by with_latest_readings() / with_stats()
+        annotated = getattr(self, f'latest_{pollutant_key(pollutant)}', MISSING)
+        if annotated is not MISSING:
+            return annotated
         latest = self.readings.filter(  # ← CHANGED from airqualityreading_set
             pollutant=pollutant
         ).first()
         return latest.value if latest else None
     
-    def get_average_reading(self, pollutant="PM2.5"):
-        """Calculate average pollution over all time (historical + current)"""
-        from django.db.models import Avg
-        avg = self.readings.filter(  # ← CHANGED
-            pollutant=pollutant
-        ).aggregate(Avg('value'))
-        return avg['value__avg']
+    def get_average_reading(self, pollutant="PM2.5", since=None, until=None):
+        """Calculate average pollution over all time (historical + current), or between since and until"""
+        annotated = self.annotated_stat('average', pollutant, since, until)
+        if annotated is not MISSING:
+            return annotated
+        totals = self.rollups.filter(rollup_filter(since, until), pollutant=pollutant).aggregate(
+            total=models.Sum('total'), count=models.Sum('count')
+        )
+        total, count = totals['total'] or 0, totals['count'] or 0
+        partial = self.partial_hour_readings(pollutant, since, until)
+        if partial is not None:
+            raw = partial.aggregate(total=models.Sum('value'), count=models.Count('pk'))
+            total, count = total + (raw['total'] or 0), count + raw['count']
+        return total / count if count else None
     
-    def get_peak_reading(self, pollutant="PM2.5"):
-        """Get highest pollution reading ever recorded - US-7"""
-        from django.db.models import Max
-        peak = self.readings.filter(  # ← CHANGED
-            pollutant=pollutant
-        ).aggregate(Max('value'))
-        return peak['value__max']
+    def get_peak_reading(self, pollutant="PM2.5", since=None, until=None):
+        """Get highest pollution reading ever recorded, or between since and until - US-7"""
+        annotated = self.annotated_stat('peak', pollutant, since, until)
+        if annotated is not MISSING:
+            return annotated
+        peaks = [self.rollups.filter(rollup_filter(since, until), pollutant=pollutant).aggregate(
+            models.Max('maximum')
+        )['maximum__max']]
+        partial = self.partial_hour_readings(pollutant, since, until)
+        if partial is not None:
+            peaks.append(partial.aggregate(models.Max('value'))['value__max'])
+        return max((peak for peak in peaks if peak is not None), default=None)
     
-    def get_peak_reading_detail(self, pollutant="PM2.5"):
+    def get_peak_reading_detail(self, pollutant="PM2.5", since=None, until=None):
         """Get full details of the highest reading (value + date) - US-7"""
-        peak = self.readings.filter(  # ← CHANGED
-            pollutant=pollutant
-        ).order_by('-value').first()
-        return peak
+        candidates = []
+        bucket = self.rollups.filter(rollup_filter(since, until), pollutant=pollutant).order_by(
+            '-maximum', 'peak_measured_at'
+        ).first()
+        if bucket is not None:
+            # Once prune_readings has removed the raw row, rebuild it from the rollup
+            candidates.append(self.readings.filter(
+                pollutant=pollutant, measured_at=bucket.peak_measured_at
+            ).first() or AirQualityReading(
+                school=self, pollutant=pollutant, value=bucket.maximum, measured_at=bucket.peak_measured_at
+            ))
+        partial = self.partial_hour_readings(pollutant, since, until)
+        if partial is not None:
+            candidates.extend(partial.order_by('-value', 'measured_at')[:1])
+        return min(candidates, key=lambda reading: (-reading.value, reading.measured_at), default=None)
     
-    def get_top_readings(self, pollutant="PM2.5", limit=5):
-        """Get the top N highest readings ever recorded - US-7"""
-        return self.readings.filter(  # ← CHANGED
-            pollutant=pollutant
-        ).order_by('-value')[:limit]
+    def partial_hour_readings(self, pollutant, since, until):
+        """Readings in the partial hours at either end of [since, until), or None if both fall on the hour"""
+        partial = partial_hours(since, until)
+        return None if partial is None else self.readings.filter(partial, pollutant=pollutant)
+    
+    def get_top_readings(self, pollutant="PM2.5", limit=5, since=None, until=None):
+        """Get the top N highest readings ever recorded, or between since and until - US-7
+
+        Returns a list. Pruned readings are rebuilt, unsaved, from their
+        rollup's peak, as in get_peak_reading_detail().
+        """
+        # Each of the top N readings sits in one of the N buckets with the highest maximum
+        buckets = list(self.rollups.filter(rollup_filter(since, until), pollutant=pollutant).order_by(
+            '-maximum'
+        ).values_list('period', 'bucket_start', 'maximum', 'peak_measured_at')[:limit])
+        # Readings in a partial hour at either end have no bucket of their own
+        partial = partial_hours(since, until)
+        if not buckets and partial is None:
+            return []
+        
+        # Buckets older than the oldest raw reading were pruned; only their peak is left
+        oldest = self.readings.filter(pollutant=pollutant).aggregate(oldest=models.Min('measured_at'))['oldest']
+        within = models.Q(pk__in=[]) if partial is None else partial
+        pruned = []
+        for period, start, maximum, peak_measured_at in buckets:
+            end = start + ROLLUP_PERIODS[period]
+            if oldest is None or end <= oldest:
+                pruned.append(AirQualityReading(
+                    school=self, pollutant=pollutant, value=maximum, measured_at=peak_measured_at
+                ))
+            else:
+                within |= models.Q(measured_at__gte=start, measured_at__lt=end)
+        
+        readings = list(self.readings.filter(within, pollutant=pollutant).order_by('-value')[:limit])
+        return sorted(readings + pruned, key=lambda reading: (-reading.value, reading.measured_at))[:limit]
     
     def __str__(self):
         return f"{self.name} ({self.location})"
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the school list by name
+            models.Index(fields=['name', 'id'], name='school_name_id_idx'),
+        ]
+
+
+class AirQualityReadingQuerySet(models.QuerySet):
+    """Bulk helpers used by the ingest commands"""
+
+    def bulk_insert_new(self, readings, batch_size=500):
+        """Insert unsaved readings in batches, skipping any already stored.
+
+        Returns the readings that were actually new. The batch's schools are
+        locked first, so concurrent runs over the same schools take turns
+        and the existing keys read next (one query over the batch's schools
+        and time range) cannot go stale before the insert. Only the readings
+        inserted are added to the rollups, in the same transaction.
+        """
+        readings = list(readings)
+        if not readings:
+            return []
+
+        school_ids = {reading.school_id for reading in readings}
+        times = [reading.measured_at for reading in readings]
+
+        with transaction.atomic():
+            # Ordered so two runs lock overlapping schools in the same order
+            list(School.objects.select_for_update().filter(id__in=school_ids).order_by('id').values_list('id'))
+            existing = set(self.filter(
+                school_id__in=school_ids,
+                measured_at__gte=min(times),
+                measured_at__lte=max(times),
+            ).values_list('school_id', 'pollutant', 'measured_at'))
+
+            new_readings = []
+            for reading in readings:
+                key = (reading.school_id, reading.pollutant, reading.measured_at)
+                if key not in existing:
+                    existing.add(key)
+                    new_readings.append(reading)
+
+            # No ignore_conflicts: a row it silently dropped would still reach the rollups
+            self.bulk_create(new_readings, batch_size=batch_size)
+            ReadingRollup.objects.add_readings(new_readings)
+            if new_readings:
+                # bulk_create sends no post_save signals. Wait for the outermost
+                # commit, or a cache rebuilt before it would miss these rows
+                transaction.on_commit(bump_data_version)
+        return new_readings
+
+    def delete(self):
+        """Delete the readings and recount the rollup days they fell in.
+
+        prune_readings uses delete_keeping_rollups() instead, since the
+        rollups are all that is left of a pruned reading.
+        """
+        with transaction.atomic():
+            # Only days that lose a reading: days between them may hold nothing but pruned rollups
+            days = sorted(self.order_by().annotate(
+                day=TruncDay('measured_at', tzinfo=dt_timezone.utc)
+            ).values_list('school_id', 'pollutant', 'day').distinct())
+            result = super().delete()
+            # Runs of consecutive days are rebuilt as one range each
+            ranges = []
+            for school_id, pollutant, day in days:
+                if ranges and ranges[-1]['key'] == (school_id, pollutant) and ranges[-1]['until'] == day:
+                    ranges[-1]['until'] = day + ROLLUP_PERIODS['day']
+                else:
+                    ranges.append({'key': (school_id, pollutant), 'since': day, 'until': day + ROLLUP_PERIODS['day']})
+            for run in ranges:
+                school_id, pollutant = run['key']
+                ReadingRollup.objects.rebuild([school_id], pollutant, since=run['since'], until=run['until'])
+            if days:
+                transaction.on_commit(bump_data_version)
+        return result
+
+    # Like QuerySet.delete(), never copied onto the manager as objects.delete()
+    delete.alters_data = True
+    delete.queryset_only = True
+
+    def delete_keeping_rollups(self):
+        """Delete the readings but leave their aggregates in the rollups"""
+        return super().delete()
+
+    delete_keeping_rollups.alters_data = True
+    delete_keeping_rollups.queryset_only = True
+
 
 class AirQualityReading(models.Model):
     """A single pollution measurement - handles current and historical data - US-4"""
@@ -65,11 +515,285 @@ class AirQualityReading(models.Model):
     pollutant = models.CharField(max_length=50, choices=POLLUTANT_CHOICES)
     value = models.FloatField()
     measured_at = models.DateTimeField()
+
+    objects = AirQualityReadingQuerySet.as_manager()
     
     def __str__(self):
         return f"{self.school.name} - {self.pollutant}: {self.value} on {self.measured_at.date()}"
     
+    def delete(self, *args, **kwargs):
+        # Deletes send no signal (see signals.py), so recount this reading's day here
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            day = rollup_bucket(self.measured_at, 'day')
+            ReadingRollup.objects.rebuild([self.school_id], self.pollutant, since=day, until=day + ROLLUP_PERIODS['day'])
+            transaction.on_commit(bump_data_version)
+        return result
+    
     class Meta:
         ordering = ['-measured_at']
         verbose_name = "Air Quality Reading"
-        verbose_name_plural = "Air Quality Readings"
\ No newline at end of file
+        verbose_name_plural = "Air Quality Readings"
+        constraints = [
+            # Its index also serves latest-per-pollutant lookups (scanned backwards for -measured_at)
+            models.UniqueConstraint(
+                fields=['school', 'pollutant', 'measured_at'],
+                name='unique_reading_per_school_pollutant_time',
+            ),
+        ]
+        indexes = [
+            # Newest reading overall: map API ETag/Last-Modified and the default ordering
+            models.Index(fields=['-measured_at'], name='reading_measured_at_idx'),
+        ]
+
+
+class ReadingRollupQuerySet(models.QuerySet):
+    """Incremental maintenance of the rollup buckets"""
+
+    def add_readings(self, readings):
+        """Fold newly stored readings into their hourly and daily buckets.
+
+        The touched buckets are read with one query, merged in Python and
+        written back with one insert and one update, so the cost depends on
+        the batch size rather than the history already stored.
+        """
+        summaries = summarise_readings(
+            (reading.school_id, reading.pollutant, reading.measured_at, reading.value)
+            for reading in readings
+        )
+        if not summaries:
+            return
+
+        starts = [key[3] for key in summaries]
+        with transaction.atomic(savepoint=False):
+            existing = {
+                (rollup.school_id, rollup.pollutant, rollup.period, rollup.bucket_start): rollup
+                for rollup in self.select_for_update().filter(
+                    school_id__in={key[0] for key in summaries},
+                    pollutant__in={key[1] for key in summaries},
+                    bucket_start__gte=min(starts),
+                    bucket_start__lte=max(starts),
+                )
+            }
+
+            created, updated = [], []
+            for key, summary in summaries.items():
+                rollup = existing.get(key)
+                if rollup is None:
+                    created.append(ReadingRollup(
+                        school_id=key[0], pollutant=key[1], period=key[2], bucket_start=key[3]
+                    ).set_summary(summary))
+                else:
+                    merge_summary(summary, rollup.summary())
+                    updated.append(rollup.set_summary(summary))
+
+            self.bulk_create(created, batch_size=500)
+            self.bulk_update(updated, ['count', 'total', 'minimum', 'maximum', 'peak_measured_at'], batch_size=500)
+
+    def rebuild(self, school_ids=None, pollutant=None, since=None, until=None):
+        """Recompute rollups from the raw readings, one school at a time.
+
+        Only buckets from `since` (default: the day of the school's oldest
+        raw reading) up to `until` are replaced, so aggregates whose raw
+        readings were pruned by prune_readings are never lost. Both bounds
+        should fall on UTC midnight.
+        """
+        schools = School.objects.order_by('id')
+        if school_ids is not None:
+            schools = schools.filter(id__in=school_ids)
+
+        for school_id in schools.values_list('id', flat=True):
+            readings = AirQualityReading.objects.filter(school_id=school_id)
+            rollups = self.filter(school_id=school_id)
+            if pollutant is not None:
+                readings = readings.filter(pollutant=pollutant)
+                rollups = rollups.filter(pollutant=pollutant)
+            if until is not None:
+                readings = readings.filter(measured_at__lt=until)
+                rollups = rollups.filter(bucket_start__lt=until)
+
+            start = since or readings.aggregate(oldest=models.Min('measured_at'))['oldest']
+            if start is None:
+                continue
+            start = rollup_bucket(start, 'day')
+
+            with transaction.atomic():
+                rollups.filter(bucket_start__gte=start).delete()
+                self.add_readings(readings.filter(measured_at__gte=start).order_by().iterator())
+
+
+class ReadingRollup(models.Model):
+    """Hourly or daily summary of one school's readings for a pollutant, kept up to date on ingest"""
+
+    PERIOD_CHOICES = [
+        ('hour', 'Hour'),
+        ('day', 'Day'),
+    ]
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='rollups')
+    pollutant = models.CharField(max_length=50, choices=AirQualityReading.POLLUTANT_CHOICES)
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket_start = models.DateTimeField()
+    count = models.PositiveIntegerField()
+    total = models.FloatField()
+    minimum = models.FloatField()
+    maximum = models.FloatField()
+    # measured_at of the reading that set `maximum`
+    peak_measured_at = models.DateTimeField()
+
+    objects = ReadingRollupQuerySet.as_manager()
+
+    def summary(self):
+        return [self.count, self.total, self.minimum, self.maximum, self.peak_measured_at]
+
+    def set_summary(self, summary):
+        self.count, self.total, self.minimum, self.maximum, self.peak_measured_at = summary
+        return self
+
+    def __str__(self):
+        return f"{self.school.name} - {self.pollutant} {self.period} from {self.bucket_start:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        constraints = [
+            # Its index also serves the bucket range scans of rollup_filter()
+            models.UniqueConstraint(
+                fields=['school', 'pollutant', 'period', 'bucket_start'],
+                name='unique_rollup_bucket',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['school', 'pollutant', 'period', '-maximum'], name='rollup_school_poll_max_idx'),
+        ]
+
+class SensorMetadata(models.Model):
+    """OpenAQ sensor → parameter mapping, cached between fetch runs"""
+
+    sensor_id = models.BigIntegerField(unique=True)
+    parameter_id = models.IntegerField(null=True, blank=True)
+    parameter_name = models.CharField(max_length=50, blank=True)
+    fetched_at = models.DateTimeField()
+    last_used_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Sensor {self.sensor_id}: {self.parameter_name} (ID: {self.parameter_id})"
+
+    class Meta:
+        verbose_name = "Sensor Metadata"
+        verbose_name_plural = "Sensor Metadata"
+
+
+class StationState(models.Model):
+    """What we last saw from an OpenAQ station, used for incremental fetches"""
+
+    location_id = models.BigIntegerField(unique=True)
+    name = models.CharField(max_length=200, blank=True)
+    etag = models.CharField(max_length=200, blank=True)
+    last_modified = models.CharField(max_length=100, blank=True)
+    latest_measured_at = models.DateTimeField(null=True, blank=True)
+    checked_at = models.DateTimeField(null=True, blank=True)
+
+    # Adaptive polling: learned publishing cadence and when to poll next
+    update_interval = models.DurationField(null=True, blank=True)
+    next_poll_at = models.DateTimeField(null=True, blank=True)
+    empty_polls = models.PositiveIntegerField(default=0)
+
+    def schedule_next_poll(self, now, got_new_data):
+        """Set next_poll_at from the learned interval, backing off while the station is stale.
+
+        A station that keeps to its cadence is polled just after its next
+        expected publication. Once that time has passed without new data,
+        each empty poll doubles the wait, up to MAX_POLL_BACKOFF.
+        """
+        interval = self.update_interval or DEFAULT_UPDATE_INTERVAL
+        self.empty_polls = 0 if got_new_data else self.empty_polls + 1
+
+        if self.latest_measured_at is not None:
+            expected = self.latest_measured_at + interval + POLL_GRACE
+            if expected > now:
+                self.next_poll_at = expected
+                return
+
+        self.next_poll_at = now + min(interval * 2 ** self.empty_polls, MAX_POLL_BACKOFF)
+
+    def __str__(self):
+        return f"{self.name or 'Station'} ({self.location_id})"
+
+
+class FetchRun(models.Model):
+    """Telemetry for one fetch_air_quality run"""
+
+    started_at = models.DateTimeField()
+    finished_at = models.DateTimeField(null=True, blank=True)
+    schools_total = models.PositiveIntegerField(default=0)
+    schools_succeeded = models.PositiveIntegerField(default=0)
+    schools_failed = models.PositiveIntegerField(default=0)
+    stations = models.PositiveIntegerField(default=0)
+    api_calls_saved = models.PositiveIntegerField(default=0)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    rows_stale = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    # {"location_lookup": 1.2, "latest_fetch": 3.4, "sensor_lookup": 0.5, "db_write": 0.1} in seconds
+    phase_durations = models.JSONField(default=dict, blank=True)
+    # {"/locations": {"requests": 10, "retries": 0, "p50_ms": ..., "p95_ms": ..., ...}, ...}
+    endpoint_stats = models.JSONField(default=dict, blank=True)
+    # [{"school": "...", "error": "..."}, ...]
+    failures = models.JSONField(default=list, blank=True)
+
+    @property
+    def duration(self):
+        """Wall-clock seconds, or None while the run is in progress"""
+        if self.finished_at is None:
+            return None
+        return (self.finished_at - self.started_at).total_seconds()
+
+    def summary(self):
+        """Everything about the run as a JSON-serialisable dict"""
+        return {
+            'id': self.id,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration_s': self.duration,
+            'schools_total': self.schools_total,
+            'schools_succeeded': self.schools_succeeded,
+            'schools_failed': self.schools_failed,
+            'stations': self.stations,
+            'api_calls_saved': self.api_calls_saved,
+            'rows_inserted': self.rows_inserted,
+            'rows_stale': self.rows_stale,
+            'rows_skipped': self.rows_skipped,
+            'phase_durations': self.phase_durations,
+            'endpoint_stats': self.endpoint_stats,
+            'failures': self.failures,
+        }
+
+    def __str__(self):
+        return f"Fetch run {self.started_at:%Y-%m-%d %H:%M} ({self.schools_succeeded}/{self.schools_total} schools)"
+
+    class Meta:
+        ordering = ['-started_at']
+
+
+class BackfillCheckpoint(models.Model):
+    """Progress of a historical backfill for one school and pollutant, so it can resume"""
+
+    school = models.ForeignKey(School, on_delete=models.CASCADE, related_name='backfill_checkpoints')
+    pollutant = models.CharField(max_length=50, choices=AirQualityReading.POLLUTANT_CHOICES)
+    sensor_id = models.BigIntegerField()
+    date_from = models.DateTimeField()
+    date_to = models.DateTimeField()
+    cursor = models.DateTimeField(null=True, blank=True)
+    rows_inserted = models.PositiveIntegerField(default=0)
+    completed = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.school.name} - {self.pollutant} backfill to {self.cursor or self.date_from}"
+
+    class Meta:
+        constraints = [
+            # date_to is left out so a resumed run with a later --to extends the same checkpoint
+            models.UniqueConstraint(
+                fields=['school', 'pollutant', 'date_from'],
+                name='unique_backfill_per_start',
+            ),
+        ]
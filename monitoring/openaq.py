@@ -0,0 +1,267 @@
+"""OpenAQ API v3 client shared by the air quality management commands"""
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+API_BASE_URL = "https://api.openaq.org/v3"
+
+# OpenAQ parameter IDs mapped to our pollutant names
+POLLUTANT_MAP = {
+    1: 'PM10',   # Fresh data available
+    2: 'PM2.5',  # Will be filtered if stale
+    5: 'NO2'     # Fresh data available
+}
+
+# Responses worth retrying: rate limited or a temporary server problem
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def parse_timestamp(timestamp_str):
+    """Parse an OpenAQ UTC timestamp such as '2025-11-14T09:00:00Z'"""
+    return datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
+
+
+class TokenBucket:
+    """Thread-safe token bucket shared by every worker hitting the API.
+
+    `rate` tokens are added per second up to `capacity`; each request takes
+    one token and blocks until one is available.
+    """
+
+    def __init__(self, rate, capacity=1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = max(1, int(capacity))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until the bucket has refilled enough"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+
+                wait = (1 - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+def retry_after_seconds(response):
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None"""
+    value = response.headers.get('Retry-After') if response is not None else None
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, (retry_at - datetime.now(retry_at.tzinfo)).total_seconds())
+
+
+def endpoint_name(path):
+    """Group paths by endpoint, e.g. '/locations/42/latest' -> '/locations/{id}/latest'"""
+    return re.sub(r'/\d+', '/{id}', path)
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class OpenAQClient:
+    """Small wrapper around the OpenAQ endpoints we use.
+
+    All calls share one pooled keep-alive session and one rate limiter.
+    429/5xx responses and connection errors are retried with bounded
+    exponential backoff and full jitter, honouring Retry-After.
+    """
+
+    def __init__(self, api_key, limiter, pool_size=10, max_retries=4, backoff_base=0.5, backoff_max=30):
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            'Accept': 'application/json',
+            'X-API-Key': api_key
+        })
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+        # Per-endpoint request latencies in seconds, and retry counts
+        self.latencies = defaultdict(list)
+        self.retries = defaultdict(int)
+        self.stats_lock = threading.Lock()
+
+        # Cache sensor info to avoid repeated API calls (shared between workers)
+        self.sensor_cache = {}
+        self.sensor_locks = {}
+        self.sensor_lock = threading.Lock()
+
+        # Bookkeeping so the caller can persist the cache after a run; a
+        # fetched sensor maps to None when it could not be looked up
+        self.sensors_used = set()
+        self.sensors_fetched = {}
+
+    def get(self, path, params=None, timeout=15, headers=None):
+        """GET an API path, waiting for a rate limit token before every attempt"""
+        endpoint = endpoint_name(path)
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire()
+            started = time.monotonic()
+            response = None
+
+            try:
+                response = self.session.get(f"{API_BASE_URL}{path}", params=params, headers=headers, timeout=timeout)
+            except (requests.exceptions.Timeout, requests.exceptions.ConnectionError):
+                if attempt == self.max_retries:
+                    raise
+            finally:
+                self.record_latency(endpoint, time.monotonic() - started)
+
+            if response is not None and (response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries):
+                return response
+
+            with self.stats_lock:
+                self.retries[endpoint] += 1
+            time.sleep(self.backoff_delay(attempt, response))
+
+    def backoff_delay(self, attempt, response=None):
+        """Retry-After if the server sent one, otherwise capped exponential backoff with full jitter"""
+        delay = retry_after_seconds(response)
+        if delay is not None:
+            return min(delay, self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def record_latency(self, endpoint, seconds):
+        with self.stats_lock:
+            self.latencies[endpoint].append(seconds)
+
+    def latency_summary(self):
+        """Request count, retries and latency percentiles (ms) for each endpoint"""
+        summary = {}
+        with self.stats_lock:
+            for endpoint, values in sorted(self.latencies.items()):
+                values = sorted(values)
+                summary[endpoint] = {
+                    'requests': len(values),
+                    'retries': self.retries[endpoint],
+                    'p50_ms': round(percentile(values, 0.5) * 1000, 1),
+                    'p95_ms': round(percentile(values, 0.95) * 1000, 1),
+                    'max_ms': round(values[-1] * 1000, 1),
+                    'total_ms': round(sum(values) * 1000, 1),
+                }
+        return summary
+
+    def find_locations(self, latitude, longitude, radius=5000, limit=5):
+        """Find monitoring stations within `radius` metres of a point"""
+        params = {
+            'coordinates': f"{latitude},{longitude}",
+            'radius': radius,
+            'limit': limit
+        }
+        return self.get("/locations", params=params)
+
+    def latest(self, location_id, etag='', last_modified=''):
+        """Latest measurement from every sensor at a station.
+
+        Passing the validators from a previous response makes the request
+        conditional, so an unchanged station can answer 304 Not Modified.
+        """
+        headers = {}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        return self.get(f"/locations/{location_id}/latest", headers=headers or None)
+
+    def measurement_pages(self, sensors_id, date_from, date_to, limit=1000):
+        """Yield pages of a sensor's historical measurements, oldest first.
+
+        Pages are fetched lazily so callers can store each one before the
+        next is requested.
+        """
+        page = 1
+        while True:
+            params = {
+                'datetime_from': date_from.isoformat(),
+                'datetime_to': date_to.isoformat(),
+                'limit': limit,
+                'page': page
+            }
+            response = self.get(f"/sensors/{sensors_id}/measurements", params=params, timeout=30)
+            if response.status_code != 200:
+                raise requests.HTTPError(f"API error: {response.status_code}")
+
+            results = response.json().get('results', [])
+            if results:
+                yield results
+            if len(results) < limit:
+                return
+            page += 1
+
+    def sensor_parameter(self, sensors_id):
+        """Return (parameter info, message) for a sensor, using the cache where possible.
+
+        Parameter info is a dict with 'id' and 'name', or None if the sensor
+        could not be looked up. The message is only set on a fresh lookup.
+        """
+        # One lock per sensor so two workers never look up the same sensor twice
+        with self.sensor_lock:
+            lock = self.sensor_locks.setdefault(sensors_id, threading.Lock())
+            self.sensors_used.add(sensors_id)
+
+        with lock:
+            if sensors_id in self.sensor_cache:
+                return self.sensor_cache[sensors_id], None
+            return self._lookup_sensor(sensors_id)
+
+    def _lookup_sensor(self, sensors_id):
+        """Fetch a sensor's parameter from the API and cache it"""
+        sensors_response = self.get(f"/sensors/{sensors_id}", timeout=10)
+        info = None
+
+        if sensors_response.status_code == 200:
+            # Access results array first
+            sensor_results = sensors_response.json().get('results', [])
+            if sensor_results:
+                parameter_info = sensor_results[0].get('parameter', {})
+                info = {
+                    'id': parameter_info.get('id'),
+                    'name': parameter_info.get('name')
+                }
+                message = f"Sensor {sensors_id}: {info['name']} (ID: {info['id']})"
+            else:
+                message = f"Sensor {sensors_id}: no results"
+        else:
+            message = f"✗ Sensor {sensors_id} API error: {sensors_response.status_code}"
+
+        self.sensor_cache[sensors_id] = info
+        self.sensors_fetched[sensors_id] = info
+        return info, message
@@ -0,0 +1,97 @@
+"""Bulk school import from CSV: validate every row, then insert all or nothing"""
+import csv
+from typing import NamedTuple
+
+from django.db import transaction
+
+from .cache import bump_data_version
+from .forms import SchoolForm
+from .models import School, grid_cell
+
+IMPORT_COLUMNS = ['name', 'location', 'latitude', 'longitude']
+
+# Schools created per INSERT
+IMPORT_BATCH_SIZE = 500
+
+# Coordinates are compared at the precision SchoolForm accepts (~11 m)
+COORDINATE_PLACES = 4
+
+# Furthest a coordinate can be from its rounded value
+ROUNDING_SLACK = 0.5 * 10 ** -COORDINATE_PLACES
+
+
+class ImportResult(NamedTuple):
+    """Schools created, or (line, errors) for every rejected row and nothing created"""
+    schools: list
+    errors: list
+
+
+def duplicate_key(name, latitude, longitude):
+    return name.strip().casefold(), round(latitude, COORDINATE_PLACES), round(longitude, COORDINATE_PLACES)
+
+
+def candidate_cells(latitude, longitude):
+    """Grid cells that can hold a school whose coordinates round the same as these"""
+    _, latitude, longitude = duplicate_key('', latitude, longitude)
+    return {
+        grid_cell(latitude + lat_offset, longitude + lon_offset)
+        for lat_offset in (-ROUNDING_SLACK, ROUNDING_SLACK)
+        for lon_offset in (-ROUNDING_SLACK, ROUNDING_SLACK)
+    }
+
+
+def read_school_csv(fp):
+    """(line, row) pairs from a CSV file with a header row, raising ValueError if columns are missing"""
+    reader = csv.DictReader(fp)
+    missing = set(IMPORT_COLUMNS) - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"Missing column(s): {', '.join(sorted(missing))}")
+    # Line 1 is the header
+    return [(line, row) for line, row in enumerate(reader, start=2)]
+
+
+def import_schools(rows, user=None, batch_size=IMPORT_BATCH_SIZE):
+    """Validate (line, row) pairs with SchoolForm and create them all in one transaction.
+
+    A row is a duplicate when another row, or an existing school, has the
+    same name at the same coordinates. Existing schools are looked up in
+    one query on the grid cells the rows fall in, plus any neighbour a
+    rounding-equal point could fall in. If any row is invalid,
+    nothing is created and every row's errors are returned.
+    """
+    errors = []
+    schools = []
+    lines = {}
+    for line, row in rows:
+        form = SchoolForm(data=row)
+        if not form.is_valid():
+            errors.append((line, [f"{field}: {message}" for field, messages in form.errors.items() for message in messages]))
+            continue
+
+        school = form.save(commit=False)
+        school.created_by = user
+
+        key = duplicate_key(school.name, school.latitude, school.longitude)
+        if key in lines:
+            errors.append((line, [f"Duplicate of line {lines[key]}"]))
+            continue
+        lines[key] = line
+        schools.append(school)
+
+    cells = set()
+    for school in schools:
+        cells |= candidate_cells(school.latitude, school.longitude)
+    existing = School.objects.filter(grid_cell__in=cells)
+    for name, latitude, longitude in existing.values_list('name', 'latitude', 'longitude'):
+        line = lines.get(duplicate_key(name, latitude, longitude))
+        if line is not None:
+            errors.append((line, [f"A school named '{name}' already exists at these coordinates"]))
+
+    if errors:
+        return ImportResult([], sorted(errors))
+
+    with transaction.atomic():
+        created = School.objects.bulk_create(schools, batch_size=batch_size)
+        # bulk_create sends no post_save signals
+        transaction.on_commit(bump_data_version)
+    return ImportResult(created, [])
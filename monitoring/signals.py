@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .cache import bump_data_version
+from .models import School, AirQualityReading, ReadingRollup
+
+
+@receiver(post_save, sender=School)
+@receiver(post_delete, sender=School)
+def school_changed(sender, **kwargs):
+    # After commit, so a cache rebuilt in between cannot keep the old data
+    transaction.on_commit(bump_data_version)
+
+
+# No post_delete receiver for readings: one would stop Django fast-deleting
+# large reading querysets. AirQualityReading.delete() and its queryset's
+# delete() recount the rollups instead, and bulk writers bump the data
+# version themselves.
+@receiver(post_save, sender=AirQualityReading)
+def reading_saved(sender, instance, created, **kwargs):
+    if created:
+        ReadingRollup.objects.add_readings([instance])
+    else:
+        # The old value and time are gone, so recount this school's pollutant
+        ReadingRollup.objects.rebuild([instance.school_id], instance.pollutant)
+    transaction.on_commit(bump_data_version)
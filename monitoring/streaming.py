@@ -0,0 +1,74 @@
+"""Helpers for streaming large JSON dumps without loading them into memory"""
+import gzip
+import json
+
+# Bytes read from the file per refill of the decode buffer
+READ_SIZE = 64 * 1024
+
+
+def open_dump(path, mode, newline=None):
+    """Open a dump file as text, transparently (de)compressing .gz files"""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8', newline=newline)
+    return open(path, mode, encoding='utf-8', newline=newline)
+
+
+def iter_json_array(fp, read_size=READ_SIZE):
+    """Yield the items of a top-level JSON array one at a time.
+
+    Only the current item (plus at most one read of lookahead) is held in
+    memory, so a multi-gigabyte `dumpdata` file streams in constant space.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    eof = False
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = fp.read(read_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    def skip(chars):
+        """Advance past `chars`, refilling as needed; return the next other character or ''"""
+        nonlocal position
+        while True:
+            while position < len(buffer) and buffer[position] in chars:
+                position += 1
+            if position < len(buffer):
+                return buffer[position]
+            if eof:
+                return ''
+            fill()
+
+    if skip(' \t\r\n') != '[':
+        raise ValueError("Expected a JSON array")
+    position += 1
+
+    while True:
+        char = skip(' \t\r\n,')
+        if char == ']':
+            return
+        if char == '':
+            raise ValueError("Unexpected end of file inside JSON array")
+
+        while True:
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                fill()
+                continue
+
+            # A number at the very end of the buffer may still be incomplete
+            if end == len(buffer) and not eof:
+                fill()
+                continue
+            break
+
+        position = end
+        yield item
@@ -0,0 +1,805 @@
+import csv
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+import requests
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from monitoring.models import (
+    School, AirQualityReading, SensorMetadata, BackfillCheckpoint, StationState, FetchRun, ReadingRollup
+)
+from monitoring.history import reading_history
+from monitoring.openaq import OpenAQClient, TokenBucket
+from monitoring.streaming import iter_json_array, open_dump
+
+
+class FakeResponse:
+    """Minimal stand-in for requests.Response"""
+
+    def __init__(self, payload, status_code=200, headers=None):
+        self.payload = payload
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def json(self):
+        return self.payload
+
+
+# Fixed "latest" timestamp so repeated runs see the same measurements
+MEASURED_AT = (timezone.now() - timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+
+
+def fake_openaq(url, params=None, headers=None, timeout=None):
+    """Answer the three OpenAQ endpoints the fetch command uses"""
+    now = MEASURED_AT.isoformat()
+    if url.endswith('/locations'):
+        return FakeResponse({'results': [{'id': 100, 'name': 'Camberwell Roadside'}]})
+    if url.endswith('/locations/100/latest'):
+        return FakeResponse({'results': [
+            {'sensorsId': 11, 'value': 21.5, 'datetime': {'utc': now}},
+            {'sensorsId': 12, 'value': 38.0, 'datetime': {'utc': now}},
+        ]})
+    if url.endswith('/sensors/11'):
+        return FakeResponse({'results': [{'parameter': {'id': 1, 'name': 'pm10'}}]})
+    if url.endswith('/sensors/12'):
+        return FakeResponse({'results': [{'parameter': {'id': 5, 'name': 'no2'}}]})
+    return FakeResponse({}, status_code=404)
+
+
+class TokenBucketTest(TestCase):
+    """Test the rate limiter shared by fetch workers"""
+
+    def test_burst_is_not_delayed(self):
+        """Test that up to `capacity` tokens are available immediately"""
+        bucket = TokenBucket(rate=1, capacity=3)
+        with mock.patch('monitoring.openaq.time.sleep') as sleep:
+            for _ in range(3):
+                bucket.acquire()
+        sleep.assert_not_called()
+
+    def test_waits_when_empty(self):
+        """Test that an empty bucket sleeps instead of handing out a token"""
+        bucket = TokenBucket(rate=2, capacity=1)
+        bucket.acquire()
+        with mock.patch('monitoring.openaq.time.sleep', side_effect=lambda s: setattr(bucket, 'tokens', 1)) as sleep:
+            bucket.acquire()
+        self.assertTrue(sleep.called)
+        self.assertLessEqual(sleep.call_args[0][0], 0.5)
+
+
+@mock.patch('monitoring.openaq.time.sleep')
+class OpenAQClientRetryTest(TestCase):
+    """Test retry and backoff behaviour of the shared HTTP client"""
+
+    def setUp(self):
+        self.client = OpenAQClient('test-key', TokenBucket(rate=1000, capacity=10), max_retries=2)
+
+    def test_retries_429_honouring_retry_after(self, sleep):
+        """Test that a 429 is retried after the server's Retry-After delay"""
+        responses = [FakeResponse({}, 429, {'Retry-After': '3'}), FakeResponse({'results': []})]
+        with mock.patch('monitoring.openaq.requests.Session.get', side_effect=responses):
+            response = self.client.get('/locations/1/latest')
+
+        self.assertEqual(response.status_code, 200)
+        sleep.assert_called_once_with(3.0)
+        self.assertEqual(self.client.latency_summary()['/locations/{id}/latest']['retries'], 1)
+
+    def test_gives_up_after_max_retries(self, sleep):
+        """Test that persistent 5xx errors are returned after bounded retries"""
+        with mock.patch('monitoring.openaq.requests.Session.get', return_value=FakeResponse({}, 503)) as get:
+            response = self.client.get('/locations')
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(get.call_count, 3)
+        for call in sleep.call_args_list:
+            self.assertLessEqual(call.args[0], self.client.backoff_max)
+
+    def test_timeouts_are_retried(self, sleep):
+        """Test that a transient timeout does not fail the request"""
+        responses = [requests.exceptions.Timeout(), FakeResponse({'results': []})]
+        with mock.patch('monitoring.openaq.requests.Session.get', side_effect=responses):
+            response = self.client.get('/locations')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.latency_summary()['/locations']['requests'], 2)
+
+    def test_client_errors_are_not_retried(self, sleep):
+        """Test that a 404 is returned straight away"""
+        with mock.patch('monitoring.openaq.requests.Session.get', return_value=FakeResponse({}, 404)) as get:
+            self.client.get('/sensors/5')
+
+        self.assertEqual(get.call_count, 1)
+        sleep.assert_not_called()
+
+
+@mock.patch.dict('os.environ', {'OPEN_AQ_API_KEY': 'test-key'})
+class FetchAirQualityCommandTest(TestCase):
+    """Test the fetch_air_quality management command"""
+
+    def setUp(self):
+        for i in range(3):
+            School.objects.create(
+                name=f"School {i}",
+                location="London, UK",
+                latitude=51.47 + i / 100,
+                longitude=-0.08
+            )
+
+    def run_command(self, *args):
+        out = StringIO()
+        with mock.patch('monitoring.openaq.requests.Session.get', side_effect=fake_openaq) as get:
+            call_command('fetch_air_quality', *args, '--rate', '1000', stdout=out)
+        return out.getvalue(), get
+
+    def test_stores_readings_for_every_school(self):
+        """Test that concurrent workers store PM10 and NO2 for each school"""
+        output, _ = self.run_command('--workers', '3')
+
+        self.assertEqual(AirQualityReading.objects.count(), 6)
+        self.assertIn("Successfully fetched data for 3/3 school(s)", output)
+
+    def test_non_positive_limits_are_rejected(self):
+        """Test that a zero or negative rate, burst or worker count is a usage error"""
+        for option, value in [('--rate', '0'), ('--rate', '-1'), ('--rate', 'nan'), ('--burst', '0'), ('--workers', '-2')]:
+            with self.subTest(option=option, value=value):
+                with self.assertRaises(CommandError):
+                    call_command('fetch_air_quality', option, value, stdout=StringIO())
+
+    def test_sensor_lookups_are_shared_between_workers(self):
+        """Test that each sensor is only looked up once per run"""
+        _, get = self.run_command('--workers', '3')
+
+        sensor_calls = [c for c in get.call_args_list if '/sensors/' in c.args[0]]
+        self.assertEqual(len(sensor_calls), 2)
+
+    def test_shared_station_fetched_once(self):
+        """Test that schools resolving to the same station share one /latest call"""
+        output, get = self.run_command()
+
+        latest_calls = [c for c in get.call_args_list if c.args[0].endswith('/latest')]
+        self.assertEqual(len(latest_calls), 1)
+        self.assertIn("3 school(s) shared 1 station(s), saving 2 API call(s)", output)
+
+    def test_rerun_does_not_duplicate_readings(self):
+        """Test that fetching twice does not store the same readings again"""
+        self.run_command()
+        self.run_command()
+
+        self.assertEqual(AirQualityReading.objects.count(), 6)
+
+    def test_warm_run_makes_no_sensor_calls(self):
+        """Test that sensor metadata is reused from the persistent cache"""
+        self.run_command()
+        self.assertEqual(SensorMetadata.objects.count(), 2)
+
+        _, get = self.run_command()
+
+        sensor_calls = [c for c in get.call_args_list if '/sensors/' in c.args[0]]
+        self.assertEqual(sensor_calls, [])
+
+    def test_warm_run_skips_sensors_without_results(self):
+        """Test that a sensor whose lookup found nothing is not looked up again within the TTL"""
+        def openaq_with_unknown_sensor(url, params=None, headers=None, timeout=None):
+            if url.endswith('/locations/100/latest'):
+                return FakeResponse({'results': [
+                    {'sensorsId': 11, 'value': 21.5, 'datetime': {'utc': MEASURED_AT.isoformat()}},
+                    {'sensorsId': 13, 'value': 4.0, 'datetime': {'utc': MEASURED_AT.isoformat()}},
+                ]})
+            if url.endswith('/sensors/13'):
+                return FakeResponse({'results': []})
+            return fake_openaq(url, params, headers, timeout)
+
+        for _ in range(2):
+            with mock.patch('monitoring.openaq.requests.Session.get', side_effect=openaq_with_unknown_sensor) as get:
+                call_command('fetch_air_quality', '--rate', '1000', stdout=StringIO())
+
+        self.assertIsNone(SensorMetadata.objects.get(sensor_id=13).parameter_id)
+        sensor_calls = [c for c in get.call_args_list if '/sensors/' in c.args[0]]
+        self.assertEqual(sensor_calls, [])
+        self.assertEqual(AirQualityReading.objects.count(), 3)
+
+    def test_refresh_sensors_ignores_cache(self):
+        """Test that --refresh-sensors looks every sensor up again"""
+        self.run_command()
+
+        _, get = self.run_command('--refresh-sensors')
+
+        sensor_calls = [c for c in get.call_args_list if '/sensors/' in c.args[0]]
+        self.assertEqual(len(sensor_calls), 2)
+
+    def test_expired_sensor_metadata_is_refetched(self):
+        """Test that cache entries older than the TTL are looked up again"""
+        self.run_command()
+        SensorMetadata.objects.update(fetched_at=timezone.now() - timedelta(days=31))
+
+        _, get = self.run_command()
+
+        sensor_calls = [c for c in get.call_args_list if '/sensors/' in c.args[0]]
+        self.assertEqual(len(sensor_calls), 2)
+
+    def test_unused_sensor_metadata_is_evicted(self):
+        """Test that sensors nobody has used for a long time are dropped"""
+        old = timezone.now() - timedelta(days=200)
+        SensorMetadata.objects.create(sensor_id=999, parameter_id=3, parameter_name='o3', fetched_at=old, last_used_at=old)
+
+        self.run_command()
+
+        self.assertFalse(SensorMetadata.objects.filter(sensor_id=999).exists())
+
+    def test_rerun_skips_readings_at_or_before_watermark(self):
+        """Test that an unchanged station's readings are dropped before any DB write"""
+        self.run_command()
+
+        with mock.patch.object(AirQualityReading.objects, 'bulk_create') as bulk_create:
+            output, _ = self.run_command()
+
+        bulk_create.assert_not_called()
+        self.assertIn("6 reading(s) already stored", output)
+
+    def test_unchanged_station_answers_304(self):
+        """Test that the station's ETag makes the next /latest call conditional"""
+        def etag_openaq(url, params=None, headers=None, timeout=None):
+            if url.endswith('/latest'):
+                if headers and headers.get('If-None-Match') == '"v1"':
+                    return FakeResponse({}, status_code=304)
+                response = fake_openaq(url)
+                response.headers['ETag'] = '"v1"'
+                return response
+            return fake_openaq(url)
+
+        out = StringIO()
+        with mock.patch('monitoring.openaq.requests.Session.get', side_effect=etag_openaq):
+            call_command('fetch_air_quality', '--rate', '1000', stdout=StringIO())
+            call_command('fetch_air_quality', '--rate', '1000', stdout=out)
+
+        state = StationState.objects.get(location_id=100)
+        self.assertEqual(state.etag, '"v1"')
+        self.assertEqual(state.latest_measured_at, MEASURED_AT)
+        self.assertIn("1 station(s) unchanged since last run", out.getvalue())
+        self.assertEqual(AirQualityReading.objects.count(), 6)
+
+    def test_run_is_recorded(self):
+        """Test that each run stores its telemetry in FetchRun"""
+        self.run_command()
+
+        run = FetchRun.objects.get()
+        self.assertIsNotNone(run.finished_at)
+        self.assertEqual(run.schools_succeeded, 3)
+        self.assertEqual(run.rows_inserted, 6)
+        self.assertEqual(run.api_calls_saved, 2)
+        self.assertEqual(
+            set(run.phase_durations),
+            {'location_lookup', 'latest_fetch', 'sensor_lookup', 'db_write'}
+        )
+        self.assertEqual(run.endpoint_stats['/locations']['requests'], 3)
+
+    def test_json_summary(self):
+        """Test that --json prints only a machine-readable summary"""
+        output, _ = self.run_command('--json')
+
+        summary = json.loads(output)
+        self.assertEqual(summary['rows_inserted'], 6)
+        self.assertEqual(summary['failures'], [])
+        self.assertIn('p95_ms', summary['endpoint_stats']['/locations/{id}/latest'])
+
+    def test_failures_are_recorded_per_school(self):
+        """Test that a school without a nearby station is listed as a failure"""
+        def no_station(url, **kwargs):
+            if url.endswith('/locations'):
+                return FakeResponse({'results': []})
+            return fake_openaq(url, **kwargs)
+
+        with mock.patch('monitoring.openaq.requests.Session.get', side_effect=no_station):
+            call_command('fetch_air_quality', '--rate', '1000', stdout=StringIO())
+
+        run = FetchRun.objects.get()
+        self.assertEqual(run.schools_failed, 3)
+        self.assertEqual(run.failures[0]['error'], "No monitoring stations within 5km")
+
+    def test_new_school_on_known_station_skips_conditional_request(self):
+        """Test that a school with nothing stored gets the station's readings instead of a 304"""
+        def etag_openaq(url, params=None, headers=None, timeout=None):
+            if url.endswith('/latest'):
+                if headers and headers.get('If-None-Match') == '"v1"':
+                    return FakeResponse({}, status_code=304)
+                response = fake_openaq(url)
+                response.headers['ETag'] = '"v1"'
+                return response
+            return fake_openaq(url)
+
+        with mock.patch('monitoring.openaq.requests.Session.get', side_effect=etag_openaq):
+            call_command('fetch_air_quality', '--rate', '1000', stdout=StringIO())
+            newcomer = School.objects.create(name="New School", location="London, UK", latitude=51.5, longitude=-0.08)
+            call_command('fetch_air_quality', '--rate', '1000', stdout=StringIO())
+
+        self.assertEqual(newcomer.readings.count(), 2)
+
+    def test_watermarks_only_cover_recent_readings_of_the_run(self):
+        """Test that the watermark query is limited to the run's schools and the staleness window"""
+        self.run_command()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.run_command()
+
+        watermark_sql = next(query['sql'] for query in queries.captured_queries if 'MAX("monitoring_airqualityreading"."measured_at")' in query['sql'])
+        self.assertIn('"school_id" IN', watermark_sql)
+        self.assertIn('"measured_at" >=', watermark_sql)
+
+    def test_schools_linked_to_station_and_scheduled(self):
+        """Test that a run remembers each school's station and learns its cadence"""
+        school = School.objects.first()
+        for hours_ago in (4, 3, 2):
+            AirQualityReading.objects.create(
+                school=school, pollutant='PM10', value=20.0,
+                measured_at=MEASURED_AT - timedelta(hours=hours_ago)
+            )
+
+        self.run_command()
+
+        state = StationState.objects.get(location_id=100)
+        self.assertEqual(set(state.schools.all()), set(School.objects.all()))
+        self.assertEqual(state.update_interval, timedelta(hours=1))
+        self.assertGreaterEqual(state.next_poll_at, MEASURED_AT + timedelta(hours=1))
+
+    def test_linked_schools_reuse_their_station(self):
+        """Test that a rerun skips /locations for schools already linked to a station"""
+        self.run_command()
+
+        output, get = self.run_command()
+
+        location_calls = [c for c in get.call_args_list if c.args[0].endswith('/locations')]
+        self.assertEqual(location_calls, [])
+        self.assertEqual(AirQualityReading.objects.count(), 6)
+        self.assertIn("Reused the stored station for 3 school(s), looked up 0", output)
+
+    def test_old_station_links_are_looked_up_again(self):
+        """Test that links older than the recheck window, or --relink-stations, cost a lookup"""
+        self.run_command()
+        School.objects.filter(name="School 0").update(station_checked_at=timezone.now() - timedelta(days=8))
+
+        _, get = self.run_command()
+        self.assertEqual(len([c for c in get.call_args_list if c.args[0].endswith('/locations')]), 1)
+
+        _, get = self.run_command('--relink-stations')
+        self.assertEqual(len([c for c in get.call_args_list if c.args[0].endswith('/locations')]), 3)
+
+    def test_scheduler_only_polls_due_stations(self):
+        """Test that scheduler mode leaves a station alone until it is due"""
+        self.run_command()
+        StationState.objects.update(next_poll_at=timezone.now() + timedelta(hours=1))
+
+        _, get = self.run_command('--schedule', '--max-ticks', '1')
+        self.assertEqual(get.call_count, 0)
+
+        StationState.objects.update(next_poll_at=timezone.now() - timedelta(minutes=1))
+
+        _, get = self.run_command('--schedule', '--max-ticks', '1')
+        latest_calls = [c for c in get.call_args_list if c.args[0].endswith('/latest')]
+        self.assertEqual(len(latest_calls), 1)
+
+    def test_stale_readings_are_skipped(self):
+        """Test that readings older than the staleness cutoff are dropped"""
+        old = (timezone.now() - timedelta(days=10)).isoformat()
+
+        def stale_openaq(url, **kwargs):
+            if url.endswith('/latest'):
+                return FakeResponse({'results': [{'sensorsId': 11, 'value': 21.5, 'datetime': {'utc': old}}]})
+            return fake_openaq(url, **kwargs)
+
+        out = StringIO()
+        with mock.patch('monitoring.openaq.requests.Session.get', side_effect=stale_openaq):
+            call_command('fetch_air_quality', '--rate', '1000', stdout=out)
+
+        self.assertEqual(AirQualityReading.objects.count(), 0)
+        self.assertIn("Skipping stale PM10", out.getvalue())
+        self.assertEqual(FetchRun.objects.get().rows_stale, 3)
+
+
+def history_page(start_hour, count):
+    """One page of hourly PM10 history starting at 2025-06-01 + start_hour"""
+    return [
+        {
+            'value': float(hour),
+            'period': {'datetimeTo': {'utc': f"2025-06-{1 + hour // 24:02d}T{hour % 24:02d}:00:00Z"}}
+        }
+        for hour in range(start_hour, start_hour + count)
+    ]
+
+
+@mock.patch.dict('os.environ', {'OPEN_AQ_API_KEY': 'test-key'})
+class BackfillAirQualityCommandTest(TestCase):
+    """Test the backfill_air_quality management command"""
+
+    def setUp(self):
+        self.school = School.objects.create(
+            name="Test School",
+            location="London, UK",
+            latitude=51.47,
+            longitude=-0.08
+        )
+        self.pages_requested = []
+
+    def fake_history(self, url, params=None, headers=None, timeout=None, fail_on_page=None):
+        if url.endswith('/locations'):
+            return FakeResponse({'results': [{
+                'id': 100,
+                'name': 'Camberwell Roadside',
+                'sensors': [{'id': 11, 'parameter': {'id': 1, 'name': 'pm10'}}],
+            }]})
+        if url.endswith('/sensors/11/measurements'):
+            self.pages_requested.append((params['datetime_from'], params['page']))
+            if params['page'] == fail_on_page:
+                return FakeResponse({}, status_code=500)
+            # Three pages of two measurements, then a short final page
+            pages = {1: history_page(0, 2), 2: history_page(2, 2), 3: history_page(4, 1)}
+            if params['datetime_from'].startswith('2025-06-01T03'):
+                pages = {1: history_page(3, 2)}
+            return FakeResponse({'results': pages.get(params['page'], [])})
+        return FakeResponse({}, status_code=404)
+
+    def run_command(self, fail_on_page=None, date_to='2025-06-30'):
+        out = StringIO()
+        fake = lambda url, **kwargs: self.fake_history(url, fail_on_page=fail_on_page, **kwargs)
+        with mock.patch('monitoring.openaq.requests.Session.get', side_effect=fake), \
+                mock.patch('monitoring.openaq.time.sleep'):
+            call_command(
+                'backfill_air_quality', '--from', '2025-06-01', '--to', date_to,
+                '--page-size', '2', '--rate', '1000', stdout=out
+            )
+        return out.getvalue()
+
+    def test_pages_are_stored_and_checkpoint_completed(self):
+        """Test that every page is stored and the checkpoint marked complete"""
+        self.run_command()
+
+        self.assertEqual(AirQualityReading.objects.filter(pollutant='PM10').count(), 5)
+        checkpoint = BackfillCheckpoint.objects.get(school=self.school, pollutant='PM10')
+        self.assertTrue(checkpoint.completed)
+        self.assertEqual(checkpoint.rows_inserted, 5)
+
+    def test_interrupted_backfill_resumes_from_cursor(self):
+        """Test that a failed run resumes after the last stored page"""
+        output = self.run_command(fail_on_page=3)
+        self.assertIn("will resume", output)
+        self.assertEqual(AirQualityReading.objects.count(), 4)
+
+        self.pages_requested = []
+        self.run_command()
+
+        self.assertTrue(self.pages_requested[0][0].startswith('2025-06-01T03'))
+        self.assertEqual(AirQualityReading.objects.count(), 5)
+        self.assertTrue(BackfillCheckpoint.objects.get(pollutant='PM10').completed)
+
+    def test_later_end_date_resumes_same_checkpoint(self):
+        """Test that resuming with a later --to (as the default does a day on) keeps the cursor"""
+        self.run_command(fail_on_page=3)
+
+        self.pages_requested = []
+        self.run_command(date_to='2025-07-01')
+
+        self.assertTrue(self.pages_requested[0][0].startswith('2025-06-01T03'))
+        checkpoint = BackfillCheckpoint.objects.get(pollutant='PM10')
+        self.assertEqual(checkpoint.date_to.day, 1)
+        self.assertTrue(checkpoint.completed)
+
+    def test_completed_backfill_is_skipped(self):
+        """Test that re-running a finished range makes no measurement calls"""
+        self.run_command()
+        self.pages_requested = []
+
+        self.run_command()
+
+        self.assertEqual(self.pages_requested, [])
+
+
+class StreamingJSONTest(TestCase):
+    """Test the incremental JSON array reader used by import_air_quality"""
+
+    def test_matches_json_loads_with_tiny_reads(self):
+        """Test that items split across many reads decode correctly"""
+        data = [{'model': 'x', 'pk': i, 'fields': {'value': i / 3, 'name': f"School {i}"}} for i in range(50)]
+        text = json.dumps(data, indent=2)
+
+        self.assertEqual(list(iter_json_array(StringIO(text), read_size=7)), data)
+
+    def test_numbers_at_buffer_edge(self):
+        """Test that a number cut off by a read boundary is not truncated"""
+        self.assertEqual(list(iter_json_array(StringIO('[12345, 678]'), read_size=3)), [12345, 678])
+
+    def test_rejects_non_array(self):
+        """Test that a file that is not a JSON array is refused"""
+        with self.assertRaises(ValueError):
+            list(iter_json_array(StringIO('{"model": "x"}')))
+
+
+FIXTURE_PATH = str(settings.BASE_DIR / 'air_quality_data.json')
+
+
+class ImportExportCommandTest(TestCase):
+    """Test the streaming export_air_quality / import_air_quality commands"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'dump.json.gz')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip(self):
+        """Test that an export can be imported into an empty database"""
+        school = School.objects.create(name="Test School", location="London, UK", latitude=51.47, longitude=-0.08)
+        for hour in range(10):
+            AirQualityReading.objects.create(
+                school=school, pollutant='PM10', value=float(hour),
+                measured_at=MEASURED_AT - timedelta(hours=hour)
+            )
+
+        call_command('export_air_quality', self.path, '--chunk-size', '3', stdout=StringIO())
+        School.objects.all().delete()
+
+        out = StringIO()
+        call_command('import_air_quality', self.path, '--batch-size', '4', stdout=out)
+
+        self.assertIn("Imported 1 school(s) and 10 new reading(s)", out.getvalue())
+        imported = School.objects.get(pk=school.pk)
+        self.assertEqual(imported.get_latest_reading('PM10'), 0.0)
+
+    def test_import_repo_fixture(self):
+        """Test that the bundled air_quality_data.json dump imports"""
+        for pk in range(1, 7):
+            School.objects.create(pk=pk, name=f"School {pk}", location="London, UK", latitude=51.47, longitude=-0.08)
+
+        call_command('import_air_quality', FIXTURE_PATH, stdout=StringIO())
+
+        self.assertEqual(AirQualityReading.objects.count(), 12)
+
+    def test_reimport_does_not_duplicate(self):
+        """Test that importing the same readings twice keeps one copy"""
+        for pk in range(1, 7):
+            School.objects.create(pk=pk, name=f"School {pk}", location="London, UK", latitude=51.47, longitude=-0.08)
+
+        call_command('import_air_quality', FIXTURE_PATH, stdout=StringIO())
+        call_command('import_air_quality', FIXTURE_PATH, stdout=StringIO())
+
+        self.assertEqual(AirQualityReading.objects.count(), 12)
+
+    def test_reading_pk_already_used_here_is_not_lost(self):
+        """Test that an imported reading whose pk is taken by another reading is still stored and counted once"""
+        school = School.objects.create(pk=1, name="School 1", location="London, UK", latitude=51.47, longitude=-0.08)
+        local = AirQualityReading.objects.create(school=school, pollutant='PM10', value=20.0, measured_at=MEASURED_AT)
+        with open_dump(self.path, 'w') as fp:
+            json.dump([{
+                'model': 'monitoring.airqualityreading', 'pk': local.pk,
+                'fields': {'school': 1, 'pollutant': 'PM10', 'value': 500.0,
+                           'measured_at': (MEASURED_AT - timedelta(hours=1)).isoformat()},
+            }], fp)
+
+        out = StringIO()
+        call_command('import_air_quality', self.path, stdout=out)
+
+        self.assertIn("1 new reading(s)", out.getvalue())
+        self.assertEqual(AirQualityReading.objects.count(), 2)
+        self.assertEqual(school.get_peak_reading('PM10'), 500.0)
+        self.assertEqual(AirQualityReading.objects.get(pk=local.pk).value, 20.0)
+
+
+class ExportReadingsCsvCommandTest(TestCase):
+    """Test the streaming CSV export command"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.school = School.objects.create(name="Test School", location="London, UK", latitude=51.47, longitude=-0.08)
+        for hour in range(10):
+            AirQualityReading.objects.create(
+                school=self.school, pollutant='PM10' if hour % 2 else 'NO2', value=float(hour),
+                measured_at=MEASURED_AT - timedelta(hours=hour)
+            )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_export_to_compressed_file(self):
+        """Test that readings stream to a .gz file in chunks"""
+        path = os.path.join(self.directory.name, 'readings.csv.gz')
+        out = StringIO()
+        call_command('export_readings_csv', path, '--pollutant', 'PM10', '--chunk-size', '2', stdout=out)
+
+        self.assertIn("Exported 5 reading(s)", out.getvalue())
+        with open_dump(path, 'r', newline='') as fp:
+            rows = list(csv.DictReader(fp))
+        self.assertEqual([row['value'] for row in rows], ['9.0', '7.0', '5.0', '3.0', '1.0'])
+        self.assertEqual(rows[0]['school'], "Test School")
+
+    def test_invalid_pollutant(self):
+        """Test that an unknown pollutant is an error"""
+        with self.assertRaises(CommandError):
+            call_command('export_readings_csv', '-', '--pollutant', 'CO2', stdout=StringIO())
+
+
+class ImportSchoolsCsvCommandTest(TestCase):
+    """Test bulk school import from a CSV file"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'schools.csv')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, count):
+        with open(self.path, 'w', newline='') as fp:
+            writer = csv.writer(fp)
+            writer.writerow(['name', 'location', 'latitude', 'longitude'])
+            for i in range(count):
+                writer.writerow([f"School {i}", "London, UK", 51.0 + i / 100, -0.1])
+
+    def test_import_in_batches(self):
+        """Test that every row is created with a constant number of queries"""
+        self.write(400)
+        out = StringIO()
+
+        # Duplicate lookup, savepoint, four INSERTs, release
+        with self.assertNumQueries(7):
+            call_command('import_schools_csv', self.path, '--batch-size', '100', stdout=out)
+
+        self.assertIn("Imported 400 school(s)", out.getvalue())
+        self.assertEqual(School.objects.count(), 400)
+
+    def test_duplicate_of_existing_school_aborts_import(self):
+        """Test that a school already in the database rejects the file"""
+        School.objects.create(name="School 3", location="London, UK", latitude=51.03, longitude=-0.1)
+        self.write(5)
+        out = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('import_schools_csv', self.path, stdout=out)
+
+        self.assertIn("Line 5: A school named 'School 3' already exists", out.getvalue())
+        self.assertEqual(School.objects.count(), 1)
+
+    def test_duplicate_across_grid_cell_boundary_is_found(self):
+        """Test that coordinates rounding the same are caught when they straddle a grid cell edge"""
+        School.objects.create(name="Edge School", location="London, UK", latitude=51.49999, longitude=-0.1)
+        with open(self.path, 'w', newline='') as fp:
+            csv.writer(fp).writerows([['name', 'location', 'latitude', 'longitude'], ["edge school", "London, UK", 51.50001, -0.1]])
+        out = StringIO()
+
+        with self.assertRaises(CommandError):
+            call_command('import_schools_csv', self.path, stdout=out)
+
+        self.assertIn("Line 2: A school named 'Edge School' already exists", out.getvalue())
+
+
+class PruneReadingsCommandTest(TestCase):
+    """Test retention of raw readings and hourly rollups"""
+
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", location="London", latitude=51.5, longitude=-0.1)
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.ages = {200: 80.0, 120: 20.0, 100: 30.0, 10: 40.0}
+        self.readings = [
+            AirQualityReading(school=self.school, pollutant='PM10', value=value, measured_at=today - timedelta(days=days, hours=-9))
+            for days, value in self.ages.items()
+        ]
+
+    def prune(self, *args):
+        out = StringIO()
+        call_command('prune_readings', '--raw-days', '90', '--hourly-days', '150', *args, stdout=out)
+        return out.getvalue()
+
+    def test_old_raw_readings_compacted_into_rollups(self):
+        """Test that raw rows and hourly rollups age out while statistics survive"""
+        AirQualityReading.objects.bulk_insert_new(self.readings)
+
+        out = self.prune('--batch-size', '1')
+
+        self.assertIn('Removed 3 raw reading(s)', out)
+        self.assertEqual(list(self.school.readings.values_list('value', flat=True)), [40.0])
+        self.assertEqual(self.school.rollups.filter(period='hour').count(), 3)
+        self.assertEqual(self.school.rollups.filter(period='day').count(), 4)
+        self.assertEqual(self.school.get_average_reading('PM10'), 42.5)
+        self.assertEqual(self.school.get_peak_reading_detail('PM10').value, 80.0)
+
+    def test_pruned_peaks_stay_in_top_readings(self):
+        """Test that top readings include peaks whose raw rows were pruned"""
+        AirQualityReading.objects.bulk_insert_new(self.readings)
+        self.prune()
+
+        top = self.school.get_top_readings('PM10')
+
+        self.assertEqual([reading.value for reading in top], [80.0, 40.0, 30.0, 20.0])
+
+    def test_history_before_raw_cutoff_reads_rollups(self):
+        """Test that history of pruned days falls back to hourly, then daily, rollups"""
+        AirQualityReading.objects.bulk_insert_new(self.readings)
+        self.prune()
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+
+        source, points = reading_history(self.school, 'PM10', today - timedelta(days=125), today - timedelta(days=95))
+        self.assertEqual((source, {value for _, value in points}), ('hour', {20.0, 30.0}))
+
+        source, points = reading_history(self.school, 'PM10', today - timedelta(days=210), today)
+        self.assertEqual((source, {value for _, value in points}), ('day', {80.0, 20.0, 30.0, 40.0}))
+
+    def test_missing_rollups_written_before_delete(self):
+        """Test that readings stored without rollups are summarised before they go"""
+        AirQualityReading.objects.bulk_create(self.readings)
+
+        out = self.prune()
+
+        self.assertIn('Rebuilt missing rollups for 1 school(s)', out)
+        self.assertEqual(self.school.get_peak_reading('PM10'), 80.0)
+        self.assertEqual(self.school.rollups.filter(period='day').count(), 3)
+
+    def test_rebuild_keeps_compacted_history(self):
+        """Test that rebuilding rollups after pruning keeps aggregates of pruned days"""
+        AirQualityReading.objects.bulk_insert_new(self.readings)
+        self.prune()
+
+        call_command('rebuild_rollups', stdout=StringIO())
+
+        self.assertEqual(self.school.get_average_reading('PM10'), 42.5)
+
+    def test_deleting_readings_keeps_pruned_days_between_them(self):
+        """Test that deleting an old and a recent reading leaves the pruned days in between alone"""
+        AirQualityReading.objects.bulk_insert_new(self.readings)
+        self.prune()
+        today = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        AirQualityReading.objects.bulk_insert_new([
+            AirQualityReading(school=self.school, pollutant='PM10', value=60.0, measured_at=today - timedelta(days=150))
+        ])
+
+        self.school.readings.filter(value__in=[60.0, 40.0]).delete()
+
+        self.assertEqual(self.school.rollups.filter(period='day').count(), 3)
+        self.assertEqual(self.school.get_average_reading('PM10'), 130.0 / 3)
+
+    def test_dry_run_deletes_nothing(self):
+        """Test that --dry-run only reports"""
+        AirQualityReading.objects.bulk_insert_new(self.readings)
+
+        out = self.prune('--dry-run')
+
+        self.assertIn('Would remove 3 raw reading(s)', out)
+        self.assertEqual(AirQualityReading.objects.count(), 4)
+
+
+
+class AirQualityReportCommandTest(TestCase):
+    """Test the DAQI and exceedance report"""
+
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", location="London", latitude=51.5, longitude=-0.1)
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=3)
+        AirQualityReading.objects.bulk_insert_new([
+            AirQualityReading(school=self.school, pollutant='NO2', value=value, measured_at=hour + timedelta(hours=offset))
+            for offset, value in enumerate([250.0, 120.0])
+        ])
+
+    def test_json_report(self):
+        """Test that the JSON report lists exceedance hours per school and pollutant"""
+        out = StringIO()
+        call_command('air_quality_report', '--days', '2', '--pollutant', 'NO2', '--json', stdout=out)
+
+        school = json.loads(out.getvalue())['schools'][0]
+        self.assertEqual(school['name'], "Test School")
+        self.assertEqual(school['pollutants']['NO2']['exceedance_hours'], 1)
+        self.assertEqual(school['pollutants']['NO2']['max_band'], 'Moderate')
+
+    def test_text_report(self):
+        """Test that the text report names the school and its worst band"""
+        out = StringIO()
+        call_command('air_quality_report', '--days', '2', stdout=out)
+
+        self.assertIn("Test School: 1 exceedance hour(s), worst band Moderate", out.getvalue())
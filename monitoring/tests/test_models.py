@@ -1,6 +1,14 @@
+from django.db import IntegrityError, connection, transaction
 from django.test import TestCase
-from monitoring.models import School, AirQualityReading
-from datetime import datetime
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.db.models import Avg, Max
+from monitoring.models import School, AirQualityReading, ReadingRollup, StationState, grid_cell, haversine_km
+from datetime import datetime, timedelta
+
+import numpy as np
+from monitoring.aqi import assess, daqi, load_hourly_means, rolling_mean
+from monitoring.cache import data_version
 
 class SchoolModelTest(TestCase):
     """Test the School model - US-1"""
@@ -335,4 +343,423 @@ class MultipleSchoolsTest(TestCase):
         self.assertNotEqual(
             school1.get_latest_reading("PM2.5"),
             school2.get_latest_reading("PM2.5")
-        )
\ No newline at end of file
+        )
+
+
+class BulkInsertReadingsTest(TestCase):
+    """Test batched reading inserts used by the ingest commands"""
+
+    def setUp(self):
+        self.school = School.objects.create(
+            name="Test School",
+            location="Test Location",
+            latitude=51.5,
+            longitude=-0.1
+        )
+        self.measured_at = timezone.make_aware(datetime(2025, 11, 12, 9, 0))
+
+    def make_reading(self, pollutant, value, hour=9):
+        return AirQualityReading(
+            school=self.school,
+            pollutant=pollutant,
+            value=value,
+            measured_at=self.measured_at.replace(hour=hour)
+        )
+
+    def test_duplicate_reading_rejected(self):
+        """Test that the database refuses a second identical reading"""
+        self.make_reading("PM10", 20.0).save()
+        with self.assertRaises(IntegrityError):
+            self.make_reading("PM10", 21.0).save()
+
+    def test_bulk_insert_returns_only_new_readings(self):
+        """Test that already stored readings are skipped and not counted"""
+        self.make_reading("PM10", 20.0).save()
+
+        new_readings = AirQualityReading.objects.bulk_insert_new([
+            self.make_reading("PM10", 20.0),
+            self.make_reading("NO2", 40.0),
+            self.make_reading("PM10", 25.0, hour=10),
+        ])
+
+        self.assertEqual(len(new_readings), 2)
+        self.assertEqual(AirQualityReading.objects.count(), 3)
+
+    def test_bulk_insert_uses_constant_queries(self):
+        """Test that inserting many readings costs one lookup and one insert for readings and rollups each"""
+        readings = [self.make_reading("PM10", float(hour), hour=hour) for hour in range(24)]
+
+        # Plus the school lock, and the savepoint and release around the transaction
+        with self.assertNumQueries(7):
+            AirQualityReading.objects.bulk_insert_new(readings)
+
+        self.assertEqual(AirQualityReading.objects.count(), 24)
+
+    def test_bulk_insert_locks_schools_before_reading_existing_keys(self):
+        """Test that concurrent runs serialise on the batch's schools"""
+        with CaptureQueriesContext(connection) as queries:
+            AirQualityReading.objects.bulk_insert_new([self.make_reading("PM10", 20.0)])
+
+        sql = [query['sql'] for query in queries.captured_queries]
+        lock = next(i for i, query in enumerate(sql) if 'FROM "monitoring_school"' in query)
+        lookup = next(i for i, query in enumerate(sql) if query.startswith('SELECT') and 'monitoring_airqualityreading' in query)
+        self.assertLess(lock, lookup)
+
+    def test_bulk_insert_invalidates_cache_after_commit(self):
+        """Test that the data version only moves once the outermost transaction commits"""
+        version = data_version()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                AirQualityReading.objects.bulk_insert_new([self.make_reading("PM10", 20.0)])
+                self.assertEqual(data_version(), version)
+
+        self.assertNotEqual(data_version(), version)
+
+
+class StationScheduleTest(TestCase):
+    """Test adaptive polling of OpenAQ stations"""
+
+    def setUp(self):
+        self.now = timezone.make_aware(datetime(2025, 11, 12, 9, 30))
+        self.station = StationState(
+            location_id=100,
+            update_interval=timedelta(hours=1),
+            latest_measured_at=self.now - timedelta(minutes=30)
+        )
+
+    def test_polls_after_next_expected_publication(self):
+        """Test that a punctual station is polled just after its next update"""
+        self.station.schedule_next_poll(self.now, got_new_data=True)
+        self.assertEqual(self.station.next_poll_at, self.now + timedelta(minutes=35))
+
+    def test_stale_station_backs_off(self):
+        """Test that each empty poll of an overdue station doubles the wait"""
+        self.station.latest_measured_at = self.now - timedelta(days=3)
+
+        self.station.schedule_next_poll(self.now, got_new_data=False)
+        self.assertEqual(self.station.next_poll_at, self.now + timedelta(hours=2))
+
+        self.station.schedule_next_poll(self.now, got_new_data=False)
+        self.assertEqual(self.station.next_poll_at, self.now + timedelta(hours=4))
+
+    def test_backoff_is_capped(self):
+        """Test that a long-dead station is still polled at least daily"""
+        self.station.latest_measured_at = None
+        self.station.empty_polls = 20
+
+        self.station.schedule_next_poll(self.now, got_new_data=False)
+        self.assertEqual(self.station.next_poll_at, self.now + timedelta(days=1))
+
+
+class SchoolSpatialLookupTest(TestCase):
+    """Test grid-cell bbox and nearest lookups on School"""
+    
+    def setUp(self):
+        self.camberwell = School.objects.create(name="Camberwell", location="London", latitude=51.4744, longitude=-0.0876)
+        self.brixton = School.objects.create(name="Brixton", location="London", latitude=51.4613, longitude=-0.1156)
+        self.croydon = School.objects.create(name="Croydon", location="London", latitude=51.3762, longitude=-0.0982)
+        self.leeds = School.objects.create(name="Leeds", location="Leeds", latitude=53.8008, longitude=-1.5491)
+    
+    def test_grid_cell_kept_in_sync_on_save(self):
+        """Test that moving a school updates its grid cell"""
+        self.assertEqual(self.leeds.grid_cell, grid_cell(53.8008, -1.5491))
+        
+        self.leeds.latitude, self.leeds.longitude = 51.47, -0.09
+        self.leeds.save(update_fields=['latitude', 'longitude'])
+        
+        self.leeds.refresh_from_db()
+        self.assertEqual(self.leeds.grid_cell, self.camberwell.grid_cell)
+    
+    def test_grid_cell_kept_in_sync_without_save(self):
+        """Test that bulk_create() and update(), which skip save(), still set the grid cell"""
+        bulk, = School.objects.bulk_create([School(name="Bulk", location="Leeds", latitude=53.8008, longitude=-1.5491)])
+        School.objects.filter(pk=self.leeds.pk).update(latitude=51.47, longitude=-0.09)
+        
+        self.assertEqual(School.objects.get(pk=bulk.pk).grid_cell, grid_cell(53.8008, -1.5491))
+        self.assertEqual(School.objects.get(pk=self.leeds.pk).grid_cell, self.camberwell.grid_cell)
+        self.assertEqual(list(School.objects.within_bbox(-1.6, 53.7, -1.5, 53.9)), [School.objects.get(pk=bulk.pk)])
+    
+    def test_grid_cell_matches_database_at_cell_edges(self):
+        """Test that grid_cell() agrees with the database where float rounding is closest"""
+        points = [(51.4, -0.1), (51.49999, -0.1), (51.50001, 0.0), (-90.0, -180.0), (90.0, 180.0), (0.3, 0.7)]
+        School.objects.bulk_create(
+            School(name=f"Edge {i}", location="Edge", latitude=latitude, longitude=longitude)
+            for i, (latitude, longitude) in enumerate(points)
+        )
+        
+        for school in School.objects.filter(location="Edge"):
+            with self.subTest(latitude=school.latitude, longitude=school.longitude):
+                self.assertEqual(school.grid_cell, grid_cell(school.latitude, school.longitude))
+    
+    def test_within_bbox(self):
+        """Test that only schools inside the box are returned"""
+        schools = School.objects.within_bbox(-0.2, 51.4, 0.0, 51.5)
+        
+        self.assertEqual(set(schools), {self.camberwell, self.brixton})
+    
+    def test_within_large_bbox(self):
+        """Test that a box spanning many grid rows still filters exactly"""
+        schools = School.objects.within_bbox(-0.12, 40.0, 0.0, 60.0)
+        
+        self.assertEqual(set(schools), {self.camberwell, self.brixton, self.croydon})
+    
+    def test_nearest(self):
+        """Test that the k closest schools come back in distance order"""
+        schools = School.objects.nearest(51.47, -0.09, k=3)
+        
+        self.assertEqual(schools, [self.camberwell, self.brixton, self.croydon])
+        self.assertAlmostEqual(schools[0].distance_km, haversine_km(51.47, -0.09, 51.4744, -0.0876))
+    
+    def test_nearest_expands_search(self):
+        """Test that a distant school is found when nothing is nearby"""
+        schools = School.objects.nearest(55.95, -3.19, k=1)
+        
+        self.assertEqual(schools, [self.leeds])
+    
+    def test_nearest_with_fewer_schools_than_k(self):
+        """Test that every school is returned when k exceeds the table size"""
+        self.assertEqual(len(School.objects.nearest(51.47, -0.09, k=10)), 4)
+
+
+class ReadingRollupTest(TestCase):
+    """Test the hourly/daily rollups behind the school statistics"""
+    
+    def setUp(self):
+        self.school = School.objects.create(name="Test School", location="London", latitude=51.5, longitude=-0.1)
+        self.start = timezone.make_aware(datetime(2025, 11, 10))
+    
+    def add(self, value, hours, pollutant="PM10"):
+        return AirQualityReading(
+            school=self.school,
+            pollutant=pollutant,
+            value=value,
+            measured_at=self.start + timedelta(hours=hours)
+        )
+    
+    def test_batches_merge_into_existing_buckets(self):
+        """Test that a second batch for the same day updates its rollup"""
+        AirQualityReading.objects.bulk_insert_new([self.add(30.0, 1), self.add(50.0, 2)])
+        AirQualityReading.objects.bulk_insert_new([self.add(10.0, 3), self.add(20.0, 1.5)])
+        
+        day = ReadingRollup.objects.get(period='day')
+        self.assertEqual((day.count, day.total, day.minimum, day.maximum), (4, 110.0, 10.0, 50.0))
+        self.assertEqual(day.peak_measured_at, self.start + timedelta(hours=2))
+        self.assertEqual(ReadingRollup.objects.get(period='hour', bucket_start=self.start + timedelta(hours=1)).count, 2)
+    
+    def test_statistics_match_raw_readings_for_any_range(self):
+        """Test that rollup answers equal aggregates over the raw readings"""
+        AirQualityReading.objects.bulk_insert_new(
+            self.add(float((hour * 37) % 101), hour) for hour in range(0, 24 * 6, 2)
+        )
+        
+        ranges = [
+            (None, None),
+            (self.start + timedelta(hours=5), None),
+            (None, self.start + timedelta(days=3, hours=7)),
+            (self.start + timedelta(hours=30), self.start + timedelta(days=4, hours=2)),
+            (self.start + timedelta(hours=3), self.start + timedelta(hours=9)),
+        ]
+        for since, until in ranges:
+            readings = self.school.readings.filter(pollutant="PM10")
+            if since:
+                readings = readings.filter(measured_at__gte=since)
+            if until:
+                readings = readings.filter(measured_at__lt=until)
+            expected = readings.aggregate(Avg('value'), Max('value'))
+            
+            with self.subTest(since=since, until=until):
+                self.assertAlmostEqual(self.school.get_average_reading("PM10", since, until), expected['value__avg'])
+                self.assertEqual(self.school.get_peak_reading("PM10", since, until), expected['value__max'])
+                self.assertEqual(
+                    [reading.value for reading in self.school.get_top_readings("PM10", 3, since, until)],
+                    list(readings.order_by('-value').values_list('value', flat=True)[:3])
+                )
+                self.assertEqual(self.school.get_peak_reading_detail("PM10", since, until).value, expected['value__max'])
+    
+    def test_unaligned_bounds_are_exact(self):
+        """Test that readings outside since/until in a partial hour are left out"""
+        AirQualityReading.objects.bulk_insert_new([
+            self.add(100.0, 9 + 10 / 60), self.add(10.0, 9 + 40 / 60), self.add(30.0, 26), self.add(90.0, 50 + 20 / 60),
+        ])
+        since, until = self.start + timedelta(hours=9, minutes=30), self.start + timedelta(hours=50, minutes=10)
+        
+        self.assertEqual(self.school.get_peak_reading("PM10", since), 90.0)
+        self.assertEqual(self.school.get_average_reading("PM10", since, until), 20.0)
+        self.assertEqual(self.school.get_peak_reading("PM10", since, until), 30.0)
+        self.assertEqual(self.school.get_peak_reading_detail("PM10", since, until).value, 30.0)
+        self.assertEqual([reading.value for reading in self.school.get_top_readings("PM10", 5, since, until)], [30.0, 10.0])
+        
+        within_hour = (since, since + timedelta(minutes=20))
+        self.assertEqual(self.school.get_average_reading("PM10", *within_hour), 10.0)
+        self.assertEqual([reading.value for reading in self.school.get_top_readings("PM10", 5, *within_hour)], [10.0])
+    
+    def test_top_readings_within_one_hour(self):
+        """Test that several top readings in the same hour are all found"""
+        AirQualityReading.objects.bulk_insert_new([self.add(50.0, 9), self.add(45.0, 9.5), self.add(40.0, 30)])
+        
+        top = self.school.get_top_readings("PM10", limit=2)
+        
+        self.assertEqual([reading.value for reading in top], [50.0, 45.0])
+    
+    def test_edited_reading_rebuilds_rollups(self):
+        """Test that changing a saved reading corrects the rollups"""
+        reading = self.add(30.0, 1)
+        reading.save()
+        reading.value = 80.0
+        reading.save()
+        
+        self.assertEqual(self.school.get_peak_reading("PM10"), 80.0)
+        self.assertEqual(ReadingRollup.objects.get(period='day').count, 1)
+    
+    def test_deleted_reading_leaves_the_rollups(self):
+        """Test that deleting a reading, one or a queryset at a time, recounts its day"""
+        AirQualityReading.objects.bulk_insert_new([self.add(30.0, 1), self.add(80.0, 2), self.add(50.0, 26)])
+        
+        self.school.readings.get(value=80.0).delete()
+        peak = self.school.get_peak_reading_detail("PM10")
+        self.assertEqual((peak.value, peak.pk is not None), (50.0, True))
+        
+        self.school.readings.filter(value__gte=50.0).delete()
+        self.assertEqual([reading.value for reading in self.school.get_top_readings("PM10")], [30.0])
+        self.assertEqual(ReadingRollup.objects.get(period='day').count, 1)
+        self.assertFalse(ReadingRollup.objects.filter(bucket_start__gte=self.start + timedelta(days=1)).exists())
+    
+    def test_no_readings(self):
+        """Test that statistics are empty without readings"""
+        self.assertIsNone(self.school.get_average_reading("PM10"))
+        self.assertIsNone(self.school.get_peak_reading_detail("PM10"))
+        self.assertEqual(list(self.school.get_top_readings("PM10")), [])
+
+
+class SchoolStatsTest(TestCase):
+    """Test batched statistics for every school at once"""
+    
+    def setUp(self):
+        self.start = timezone.make_aware(datetime(2025, 11, 10))
+        self.busy = School.objects.create(name="Busy School", location="London", latitude=51.5, longitude=-0.1)
+        self.quiet = School.objects.create(name="Quiet School", location="London", latitude=51.6, longitude=-0.2)
+        AirQualityReading.objects.bulk_insert_new(
+            AirQualityReading(school=self.busy, pollutant="PM10", value=value, measured_at=self.start + timedelta(days=day))
+            for day, value in enumerate([30.0, 60.0, 15.0])
+        )
+    
+    def test_with_stats_matches_per_school_methods(self):
+        """Test that annotations equal what the per-school methods compute"""
+        busy = School.objects.with_stats(["PM10"]).get(id=self.busy.id)
+        
+        self.assertEqual(
+            (busy.latest_pm10, busy.average_pm10, busy.peak_pm10, busy.count_pm10),
+            (self.busy.get_latest_reading("PM10"), self.busy.get_average_reading("PM10"),
+             self.busy.get_peak_reading("PM10"), 3)
+        )
+    
+    def test_school_without_readings(self):
+        """Test that a school with no data gets empty statistics"""
+        quiet = School.objects.with_stats(["PM10"]).get(id=self.quiet.id)
+        
+        self.assertEqual((quiet.latest_pm10, quiet.average_pm10, quiet.peak_pm10, quiet.count_pm10), (None, None, None, 0))
+    
+    def test_with_stats_is_one_query(self):
+        """Test that statistics for all schools cost a single query"""
+        with self.assertNumQueries(1):
+            schools = list(School.objects.with_stats(["PM10", "NO2"]))
+        
+        with self.assertNumQueries(0):
+            for school in schools:
+                school.get_latest_reading("PM10")
+                school.get_average_reading("PM10")
+                school.get_peak_reading("NO2")
+    
+    def test_since_limits_statistics(self):
+        """Test that since restricts the statistics to recent readings"""
+        busy = School.objects.with_stats(["PM10"], since=self.start + timedelta(days=1)).get(id=self.busy.id)
+        
+        self.assertEqual((busy.average_pm10, busy.peak_pm10, busy.count_pm10), (37.5, 60.0, 2))
+        # All-time questions are not answered from the narrower annotations
+        self.assertEqual(busy.get_average_reading("PM10"), 35.0)
+    
+    def test_unaligned_since_is_exact(self):
+        """Test that readings before since in its partial hour are left out"""
+        AirQualityReading.objects.bulk_insert_new(
+            AirQualityReading(school=self.busy, pollutant="PM10", value=value, measured_at=self.start + timedelta(minutes=minutes))
+            for minutes, value in [(10, 100.0), (40, 10.0)]
+        )
+        since = self.start + timedelta(minutes=30)
+        
+        busy = School.objects.with_stats(["PM10"], since=since).get(id=self.busy.id)
+        quiet = School.objects.with_stats(["PM10"], since=since).get(id=self.quiet.id)
+        
+        self.assertEqual((busy.peak_pm10, busy.count_pm10), (60.0, 3))
+        self.assertAlmostEqual(busy.average_pm10, (10.0 + 60.0 + 15.0) / 3)
+        self.assertEqual((busy.average_pm10, busy.peak_pm10), (
+            self.busy.get_average_reading("PM10", since), self.busy.get_peak_reading("PM10", since)
+        ))
+        self.assertEqual((quiet.average_pm10, quiet.peak_pm10, quiet.count_pm10), (None, None, 0))
+
+
+class AirQualityIndexTest(TestCase):
+    """Test the vectorised DAQI and exceedance engine"""
+    
+    def setUp(self):
+        self.start = timezone.make_aware(datetime(2025, 11, 10))
+        self.school = School.objects.create(name="Test School", location="London", latitude=51.5, longitude=-0.1)
+    
+    def test_rolling_mean_respects_coverage(self):
+        """Test that windows with too few hours present are left empty"""
+        hourly = np.array([[10.0, np.nan, 30.0, 50.0]])
+        
+        np.testing.assert_array_equal(rolling_mean(hourly, 2, min_coverage=1.0), [[np.nan, np.nan, np.nan, 40.0]])
+        np.testing.assert_array_equal(rolling_mean(hourly, 2, min_coverage=0.5), [[10.0, 10.0, 30.0, 40.0]])
+    
+    def test_daqi_bands(self):
+        """Test that values map onto DAQI indices with inclusive upper bounds"""
+        np.testing.assert_array_equal(daqi(np.array([16.0, 16.1, 101.0, np.nan]), "PM10"), [1, 2, 10, 0])
+    
+    def test_load_hourly_means_places_each_rollup(self):
+        """Test that each school's hourly means land in its row at their hour"""
+        other = School.objects.create(name="Other School", location="London", latitude=51.6, longitude=-0.2)
+        AirQualityReading.objects.bulk_insert_new([
+            AirQualityReading(school=self.school, pollutant="PM10", value=10.0, measured_at=self.start + timedelta(hours=1)),
+            AirQualityReading(school=self.school, pollutant="PM10", value=30.0, measured_at=self.start + timedelta(hours=1, minutes=30)),
+            AirQualityReading(school=other, pollutant="PM10", value=50.0, measured_at=self.start + timedelta(hours=3)),
+        ])
+        
+        ids, hourly = load_hourly_means("PM10", self.start, self.start + timedelta(hours=4), [self.school.id, other.id, 999])
+        
+        self.assertEqual(list(ids), [self.school.id, other.id, 999])
+        np.testing.assert_array_equal(hourly, [
+            [np.nan, 20.0, np.nan, np.nan],
+            [np.nan, np.nan, np.nan, 50.0],
+            [np.nan, np.nan, np.nan, np.nan],
+        ])
+    
+    def test_assess_counts_exceedance_hours(self):
+        """Test that hourly NO2 above the limit is counted and banded"""
+        AirQualityReading.objects.bulk_insert_new(
+            AirQualityReading(school=self.school, pollutant="NO2", value=value, measured_at=self.start + timedelta(hours=hour))
+            for hour, value in enumerate([250.0, 100.0, 210.0])
+        )
+        
+        summary = assess("NO2", self.start, self.start + timedelta(days=1)).by_school()[self.school.id]
+        
+        self.assertEqual(summary["exceedance_hours"], 2)
+        self.assertEqual((summary["index"], summary["band"]), (4, "Moderate"))
+        self.assertEqual(summary["max_index"], 4)
+    
+    def test_assess_rolling_24h_mean_needs_coverage(self):
+        """Test that a 24-hour mean only appears once 18 of its hours are present"""
+        AirQualityReading.objects.bulk_insert_new(
+            AirQualityReading(school=self.school, pollutant="PM10", value=60.0, measured_at=self.start + timedelta(hours=hour))
+            for hour in range(17)
+        )
+        
+        sparse = assess("PM10", self.start, self.start + timedelta(days=1)).by_school()[self.school.id]
+        self.assertEqual((sparse["rolling_24h_mean"], sparse["exceedance_hours"]), (None, 0))
+        
+        AirQualityReading.objects.create(school=self.school, pollutant="PM10", value=60.0, measured_at=self.start + timedelta(hours=17))
+        
+        covered = assess("PM10", self.start, self.start + timedelta(days=1)).by_school()[self.school.id]
+        self.assertEqual(covered["max_rolling_24h_mean"], 60.0)
+        # Hours 17-23 each close a window with at least 18 hours present
+        self.assertEqual(covered["exceedance_hours"], 7)
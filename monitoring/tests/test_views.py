@@ -1,7 +1,16 @@
+import csv
+from io import StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase, Client
 from django.urls import reverse
-from monitoring.models import School, AirQualityReading
-from datetime import datetime
+from monitoring.cache import bump_data_version, cache_stats
+from monitoring.views import SCHOOLS_PER_PAGE, SEARCH_RESULTS
+from monitoring.models import School, AirQualityReading, grid_cell
+from datetime import datetime, timedelta
 from django.utils import timezone
 
 
@@ -10,6 +19,7 @@ class MapViewTest(TestCase):
     
     def setUp(self):
         """Create test data before each test"""
+        cache.clear()
         self.client = Client()
         
         # Create test school
@@ -42,24 +52,15 @@ class MapViewTest(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertTemplateUsed(response, 'map.html')
     
-    def test_map_view_contains_schools(self):
-        """Test that map view includes school data - US-2"""
+    def test_map_view_does_not_inline_schools(self):
+        """Test that the page leaves school data to the map APIs - US-2"""
         response = self.client.get(reverse('map_view'))
         
-        # Check school name appears
-        self.assertContains(response, 'Test School')
-        
-        # Check coordinates appear (for Leaflet)
-        self.assertContains(response, '51.5074')
-        self.assertContains(response, '-0.1278')
-    
-    def test_map_view_includes_pollution_data(self):
-        """Test that latest pollution readings are shown - US-2"""
-        response = self.client.get(reverse('map_view'))
-        
-        # Check PM2.5 and NO2 values appear
-        self.assertContains(response, '35.2')
-        self.assertContains(response, '42.5')
+        self.assertNotContains(response, 'Test School')
+        self.assertNotContains(response, '35.2')
+        self.assertContains(response, reverse('api_clusters'))
+        self.assertContains(response, reverse('api_schools'))
+        self.assertContains(response, reverse('api_school_search'))
     
     def test_map_view_with_no_schools(self):
         """Test map view when no schools exist - US-2"""
@@ -68,4 +69,655 @@ class MapViewTest(TestCase):
         response = self.client.get(reverse('map_view'))
         
         self.assertEqual(response.status_code, 200)
-        self.assertContains(response, '[]')  # Empty JSON array = no schools in data
\ No newline at end of file
+    
+    def test_map_view_does_not_query_schools(self):
+        """Test that the page costs the same however many schools there are"""
+        for i in range(5):
+            School.objects.create(
+                name=f"Extra School {i}",
+                location="London, UK",
+                latitude=51.5,
+                longitude=-0.1
+            )
+        
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('map_view'))
+        
+        self.assertNotContains(response, 'Extra School 4')
+
+
+class SchoolsApiTest(TestCase):
+    """Test the JSON map data endpoint - US-2"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        
+        self.inside = School.objects.create(
+            name="Camberwell School",
+            location="London, UK",
+            latitude=51.47,
+            longitude=-0.09
+        )
+        self.outside = School.objects.create(
+            name="Manchester School",
+            location="Manchester, UK",
+            latitude=53.48,
+            longitude=-2.24
+        )
+        AirQualityReading.objects.create(
+            school=self.inside,
+            pollutant='PM10',
+            value=35.2,
+            measured_at=timezone.now()
+        )
+    
+    def test_returns_latest_readings(self):
+        """Test that each school comes back with its latest readings"""
+        response = self.client.get(reverse('api_schools'))
+        
+        self.assertEqual(response.status_code, 200)
+        schools = {school['name']: school for school in response.json()['schools']}
+        self.assertEqual(schools['Camberwell School']['readings'], {'PM10': 35.2, 'NO2': None})
+        self.assertEqual(len(schools), 2)
+    
+    def test_schools_carry_current_daqi(self):
+        """Test that each school comes back with its current DAQI band per pollutant and overall"""
+        response = self.client.get(reverse('api_schools'))
+        
+        schools = {school['name']: school for school in response.json()['schools']}
+        camberwell = schools['Camberwell School']
+        self.assertEqual(camberwell['daqi']['PM10'], {'index': 3, 'band': 'Low', 'colour': '#00a651'})
+        self.assertEqual(camberwell['overall']['index'], 3)
+        self.assertEqual(schools['Manchester School']['overall']['band'], 'No data')
+    
+    def test_bbox_filters_schools(self):
+        """Test that only schools inside the bounding box are returned"""
+        response = self.client.get(reverse('api_schools'), {'bbox': '-0.2,51.4,0.0,51.6'})
+        
+        names = [school['name'] for school in response.json()['schools']]
+        self.assertEqual(names, ['Camberwell School'])
+    
+    def test_empty_bbox_returns_no_schools(self):
+        """Test that a bounding box with no schools in it returns an empty list"""
+        response = self.client.get(reverse('api_schools'), {'bbox': '10,10,11,11'})
+        
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['schools'], [])
+    
+    def test_pollutants_parameter(self):
+        """Test that the pollutant set can be chosen"""
+        response = self.client.get(reverse('api_schools'), {'pollutants': 'PM2.5'})
+        
+        self.assertEqual(response.json()['schools'][0]['readings'], {'PM2.5': None})
+    
+    def test_invalid_query_is_rejected(self):
+        """Test that a bad bbox or pollutant returns 400"""
+        self.assertEqual(self.client.get(reverse('api_schools'), {'bbox': '1,2,3'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('api_schools'), {'pollutants': 'CO2'}).status_code, 400)
+    
+    def test_unchanged_data_returns_304(self):
+        """Test that a repeat request with the ETag gets Not Modified"""
+        first = self.client.get(reverse('api_schools'))
+        self.assertIn('Last-Modified', first)
+        
+        second = self.client.get(reverse('api_schools'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+    
+    def test_new_reading_changes_etag(self):
+        """Test that newer data invalidates the client's copy"""
+        first = self.client.get(reverse('api_schools'))
+        AirQualityReading.objects.create(
+            school=self.outside,
+            pollutant='NO2',
+            value=40.0,
+            measured_at=timezone.now()
+        )
+        
+        second = self.client.get(reverse('api_schools'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+    
+    def test_markers_are_cached(self):
+        """Test that a repeat request is served without rebuilding the markers"""
+        self.client.get(reverse('api_schools'), {'bbox': '-0.15,51.35,-0.05,51.55'})
+        
+        with self.assertNumQueries(2):  # ETag state only
+            response = self.client.get(reverse('api_schools'), {'bbox': '-0.12,51.38,-0.06,51.52'})
+        self.assertEqual([school['name'] for school in response.json()['schools']], ['Camberwell School'])
+    
+    def test_cached_markers_are_trimmed_to_bbox(self):
+        """Test that a viewport sharing cached grid cells only gets the schools inside it"""
+        self.client.get(reverse('api_schools'), {'bbox': '-0.15,51.35,-0.05,51.55'})
+        
+        response = self.client.get(reverse('api_schools'), {'bbox': '-0.15,51.35,-0.095,51.55'})
+        self.assertEqual(response.json()['schools'], [])
+    
+    def test_etag_ignores_per_process_data_version(self):
+        """Test that a local-memory data version, which differs per worker, stays out of the ETag"""
+        first = self.client.get(reverse('api_schools'))
+        bump_data_version()
+        
+        second = self.client.get(reverse('api_schools'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        
+        with mock.patch('monitoring.views.cache_is_shared', return_value=True):
+            first = self.client.get(reverse('api_schools'))
+            bump_data_version()
+            second = self.client.get(reverse('api_schools'), HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+    
+    def test_response_is_compressed(self):
+        """Test that gzip is used when the client accepts it"""
+        for i in range(10):
+            School.objects.create(name=f"School {i}", location="London, UK", latitude=51.5, longitude=-0.1)
+        
+        response = self.client.get(reverse('api_schools'), HTTP_ACCEPT_ENCODING='gzip')
+        
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+
+
+class ClustersApiTest(TestCase):
+    """Test the zoom-level cluster endpoint - US-2"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        
+        self.camberwell = School.objects.create(name="Camberwell School", location="London, UK", latitude=51.47, longitude=-0.09)
+        self.brixton = School.objects.create(name="Brixton School", location="London, UK", latitude=51.46, longitude=-0.11)
+        self.leeds = School.objects.create(name="Leeds School", location="Leeds, UK", latitude=53.80, longitude=-1.55)
+        AirQualityReading.objects.create(school=self.camberwell, pollutant='PM10', value=30.0, measured_at=timezone.now())
+        AirQualityReading.objects.create(school=self.brixton, pollutant='PM10', value=50.0, measured_at=timezone.now())
+    
+    def get_clusters(self, **params):
+        response = self.client.get(reverse('api_clusters'), params)
+        self.assertEqual(response.status_code, 200)
+        return sorted(response.json()['clusters'], key=lambda cluster: cluster['count'])
+    
+    def test_low_zoom_groups_nearby_schools(self):
+        """Test that London schools share a cluster with aggregated readings"""
+        leeds, london = self.get_clusters(zoom=6)
+        
+        self.assertEqual(london['count'], 2)
+        self.assertAlmostEqual(london['latitude'], 51.465)
+        self.assertEqual(london['readings']['PM10'], {'max': 50.0, 'mean': 40.0})
+        self.assertEqual(leeds['school_id'], self.leeds.id)
+        self.assertEqual(leeds['readings']['NO2'], {'max': None, 'mean': None})
+    
+    def test_high_zoom_separates_schools(self):
+        """Test that zooming in splits the cluster"""
+        self.assertEqual([cluster['count'] for cluster in self.get_clusters(zoom=14)], [1, 1, 1])
+    
+    def test_bbox_filters_clusters(self):
+        """Test that only clusters inside the viewport are returned"""
+        clusters = self.get_clusters(zoom=6, bbox='-3,50,1,52')
+        
+        self.assertEqual([cluster['count'] for cluster in clusters], [2])
+    
+    def test_invalid_zoom_is_rejected(self):
+        """Test that a non-numeric zoom returns 400"""
+        response = self.client.get(reverse('api_clusters'), {'zoom': 'far'})
+        
+        self.assertEqual(response.status_code, 400)
+    
+    def test_clusters_are_cached(self):
+        """Test that a repeat request is served without rebuilding the clusters"""
+        self.get_clusters(zoom=6)
+        
+        with self.assertNumQueries(2):  # ETag state only
+            self.get_clusters(zoom=6)
+    
+    def test_new_reading_invalidates_clusters(self):
+        """Test that ingesting readings refreshes the cached clusters"""
+        self.get_clusters(zoom=6)
+        with self.captureOnCommitCallbacks(execute=True):
+            AirQualityReading.objects.bulk_insert_new([
+                AirQualityReading(school=self.leeds, pollutant='PM10', value=80.0, measured_at=timezone.now())
+            ])
+        
+        leeds, _ = self.get_clusters(zoom=6)
+        self.assertEqual(leeds['readings']['PM10']['max'], 80.0)
+    
+    def test_school_edit_invalidates_clusters(self):
+        """Test that moving a school refreshes the cached clusters"""
+        self.get_clusters(zoom=6)
+        self.leeds.latitude, self.leeds.longitude = 51.47, -0.10
+        with self.captureOnCommitCallbacks(execute=True):
+            self.leeds.save()
+        
+        self.assertEqual([cluster['count'] for cluster in self.get_clusters(zoom=6)], [3])
+
+
+class SchoolSearchApiTest(TestCase):
+    """Test the map's server-side school search"""
+    
+    def setUp(self):
+        self.client = Client()
+        School.objects.create(name="Camberwell School", location="London, UK", latitude=51.47, longitude=-0.09)
+        School.objects.create(name="Peckham Nursery", location="Camberwell, London", latitude=51.47, longitude=-0.07)
+        School.objects.create(name="Leeds School", location="Leeds, UK", latitude=53.8, longitude=-1.55)
+    
+    def search(self, q):
+        response = self.client.get(reverse('api_school_search'), {'q': q})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['schools']
+    
+    def test_matches_name_or_location(self):
+        """Test that a query matches school names and locations, case-insensitively"""
+        names = [school['name'] for school in self.search('camberwell')]
+        
+        self.assertEqual(names, ['Camberwell School', 'Peckham Nursery'])
+    
+    def test_results_carry_coordinates(self):
+        """Test that each result has what the map needs to move to it"""
+        school, = self.search('Leeds School')
+        
+        self.assertEqual(
+            {key: school[key] for key in ('name', 'address', 'latitude', 'longitude')},
+            {'name': 'Leeds School', 'address': 'Leeds, UK', 'latitude': 53.8, 'longitude': -1.55},
+        )
+    
+    def test_short_query_returns_nothing(self):
+        """Test that a one-letter query does not hit the database"""
+        with self.assertNumQueries(0):
+            self.assertEqual(self.search('c'), [])
+    
+    def test_results_are_limited(self):
+        """Test that a broad query returns at most SEARCH_RESULTS schools"""
+        School.objects.bulk_create([
+            School(name=f"Extra School {i:02d}", location="London, UK", latitude=51.5, longitude=-0.1)
+            for i in range(SEARCH_RESULTS + 5)
+        ])
+        
+        self.assertEqual(len(self.search('school')), SEARCH_RESULTS)
+
+
+class MapCacheTest(TestCase):
+    """Test the versioned map data cache"""
+    
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.school = School.objects.create(name="Camberwell School", location="London, UK", latitude=51.47, longitude=-0.09)
+    
+    def map_clusters(self):
+        return self.client.get(reverse('api_clusters'), {'zoom': 14}).json()['clusters']
+    
+    def test_repeat_request_counts_a_hit(self):
+        """Test that an unchanged map is served from the cache"""
+        self.map_clusters()
+        self.map_clusters()
+        
+        self.assertEqual(cache_stats(['clusters'])['clusters'], {'hit': 1, 'miss': 1})
+    
+    def test_reading_save_invalidates_map(self):
+        """Test that a new reading shows up on the next request"""
+        self.map_clusters()
+        with self.captureOnCommitCallbacks(execute=True):
+            AirQualityReading.objects.create(school=self.school, pollutant='PM10', value=42.0, measured_at=timezone.now())
+        
+        self.assertEqual(self.map_clusters()[0]['readings']['PM10']['max'], 42.0)
+    
+    def test_school_delete_invalidates_map(self):
+        """Test that deleting a school refreshes the map"""
+        self.map_clusters()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.school.delete()
+        
+        self.assertEqual(self.map_clusters(), [])
+    
+    def test_cache_stats_command(self):
+        """Test that hit/miss counts are reported"""
+        self.map_clusters()
+        self.map_clusters()
+        out = StringIO()
+        
+        call_command('cache_stats', '--reset', stdout=out)
+        
+        self.assertIn('clusters   1 hit(s), 1 miss(es), hit rate 50%', out.getvalue())
+        self.assertEqual(cache_stats(['clusters'])['clusters'], {'hit': 0, 'miss': 0})
+
+
+class SchoolHistoryApiTest(TestCase):
+    """Test the downsampled history endpoint for charts - US-7"""
+    
+    @classmethod
+    def setUpTestData(cls):
+        cls.school = School.objects.create(name="Camberwell School", location="London, UK", latitude=51.47, longitude=-0.09)
+        start = timezone.make_aware(datetime(2025, 1, 1))
+        
+        # Hourly readings for 60 days with one sharp spike
+        readings = [
+            AirQualityReading(school=cls.school, pollutant='PM10', value=20.0 + hour % 7, measured_at=start + timedelta(hours=hour))
+            for hour in range(24 * 60)
+        ]
+        readings[1000].value = 250.0
+        AirQualityReading.objects.bulk_insert_new(readings)
+        cls.spike_at = start + timedelta(hours=1000)
+    
+    def setUp(self):
+        self.client = Client()
+    
+    def get_history(self, **params):
+        params.setdefault('pollutant', 'PM10')
+        response = self.client.get(reverse('api_school_history', args=[self.school.id]), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+    
+    def test_short_range_returns_raw_readings(self):
+        """Test that a range holding few readings is not downsampled"""
+        data = self.get_history(**{'from': '2025-01-01', 'to': '2025-01-02'})
+        
+        self.assertEqual(data['source'], 'raw')
+        self.assertEqual(len(data['points']), 24)
+        self.assertEqual(data['points'][1][1], 21.0)
+    
+    def test_long_range_is_downsampled_keeping_peak(self):
+        """Test that the point count is bounded and the spike survives"""
+        data = self.get_history(**{'from': '2025-01-01', 'to': '2025-03-02', 'points': 100})
+        
+        self.assertLessEqual(len(data['points']), 100)
+        self.assertEqual(max(value for _, value in data['points']), 250.0)
+        self.assertIn([self.spike_at.isoformat().replace('+00:00', 'Z'), 250.0], data['points'])
+    
+    def test_long_range_reads_rollups(self):
+        """Test that wide buckets come from rollups rather than raw rows"""
+        data = self.get_history(**{'from': '2025-01-01', 'to': '2025-03-02', 'points': 20})
+        
+        self.assertEqual(data['source'], 'day')
+        self.assertLessEqual(len(data['points']), 20)
+    
+    def test_medium_range_reads_hourly_rollups(self):
+        """Test that buckets between an hour and a day use hourly rollups"""
+        data = self.get_history(**{'from': '2025-01-01', 'to': '2025-01-31', 'points': 200})
+        
+        self.assertEqual(data['source'], 'hour')
+        self.assertEqual(min(value for _, value in data['points']), 20.0)
+    
+    def test_invalid_parameters_are_rejected(self):
+        """Test that bad pollutants, dates and point counts return 400"""
+        url = reverse('api_school_history', args=[self.school.id])
+        for params in ({'pollutant': 'CO2'}, {'from': 'yesterday'}, {'points': 1}, {'from': '2025-02-01', 'to': '2025-01-01'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+    
+    def test_unknown_school_returns_404(self):
+        """Test that a missing school is a 404"""
+        response = self.client.get(reverse('api_school_history', args=[9999]))
+        
+        self.assertEqual(response.status_code, 404)
+
+
+class ExportReadingsCsvTest(TestCase):
+    """Test the streaming CSV export of readings"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.start = timezone.make_aware(datetime(2025, 1, 1))
+        self.school = School.objects.create(name="Camberwell School", location="London, UK", latitude=51.47, longitude=-0.09)
+        other = School.objects.create(name="Leeds School", location="Leeds, UK", latitude=53.8, longitude=-1.55)
+        AirQualityReading.objects.bulk_insert_new(
+            AirQualityReading(school=school, pollutant=pollutant, value=float(day), measured_at=self.start + timedelta(days=day))
+            for school in (self.school, other)
+            for pollutant in ('PM10', 'NO2')
+            for day in range(3)
+        )
+    
+    def export(self, **params):
+        response = self.client.get(reverse('export_readings_csv'), params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+    
+    def test_exports_every_reading_with_header(self):
+        """Test that an unfiltered export streams a header and every reading oldest first"""
+        lines = self.export()
+        
+        self.assertEqual(lines[0], 'school_id,school,pollutant,value,measured_at')
+        self.assertEqual(len(lines), 13)
+        self.assertEqual(lines[1].split(',')[-1], '2025-01-01T00:00:00+00:00')
+    
+    def test_filters_by_school_pollutant_and_range(self):
+        """Test that school, pollutants, from and to narrow the export"""
+        lines = self.export(school=self.school.id, pollutants='PM10', **{'from': '2025-01-02', 'to': '2025-01-03'})
+        
+        self.assertEqual(lines[1:], [f'{self.school.id},Camberwell School,PM10,1.0,2025-01-02T00:00:00+00:00'])
+    
+    def test_formula_like_names_are_quoted(self):
+        """Test that a school name a spreadsheet would run as a formula is exported as text"""
+        self.school.name = '=HYPERLINK("http://example.com")'
+        self.school.save()
+        AirQualityReading.objects.filter(school=self.school, pollutant='PM10', value=0.0).update(value=-1.0)
+        
+        rows = list(csv.reader(self.export(school=self.school.id, pollutants='PM10')))
+        
+        self.assertEqual(rows[1][1], '\'=HYPERLINK("http://example.com")')
+        self.assertEqual(rows[1][3], '-1.0')
+    
+    def test_export_query_count_is_constant(self):
+        """Test that school names come from a JOIN rather than a query per row"""
+        with self.assertNumQueries(1):
+            self.export()
+    
+    def test_invalid_query_is_rejected(self):
+        """Test that a bad pollutant or range returns 400"""
+        self.assertEqual(self.client.get(reverse('export_readings_csv'), {'pollutants': 'CO2'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_readings_csv'), {'from': '2025-02-01', 'to': '2025-01-01'}).status_code, 400)
+
+
+class SchoolListViewTest(TestCase):
+    """Test the school list with its statistics columns - US-READ"""
+    
+    def test_statistics_cost_constant_queries(self):
+        """Test that the list shows statistics without a query per school"""
+        for i in range(5):
+            school = School.objects.create(name=f"School {i}", location="London, UK", latitude=51.5, longitude=-0.1)
+            AirQualityReading.objects.create(school=school, pollutant='PM10', value=20.0 + i, measured_at=timezone.now())
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('school_list'))
+        
+        self.assertContains(response, 'peak 24.0')
+    
+    def walk_pages(self, **params):
+        """Follow next-page cursors from the first page, returning every school seen"""
+        seen = []
+        while True:
+            response = self.client.get(reverse('school_list'), params)
+            seen.extend(response.context['schools'])
+            if not response.context['next_cursor']:
+                return seen
+            params['after'] = response.context['next_cursor']
+    
+    def test_pages_cover_every_school_once(self):
+        """Test that following cursors visits each school once in name order"""
+        School.objects.bulk_create(
+            School(name=f"School {i % 7}", location="London, UK", latitude=51.5, longitude=-0.1)
+            for i in range(SCHOOLS_PER_PAGE * 2 + 5)
+        )
+        
+        seen = self.walk_pages()
+        
+        self.assertEqual(len(seen), SCHOOLS_PER_PAGE * 2 + 5)
+        self.assertEqual(seen, sorted(seen, key=lambda school: (school.name, school.id)))
+    
+    def test_deep_page_costs_one_query(self):
+        """Test that a later page needs no more queries than the first"""
+        School.objects.bulk_create(
+            School(name=f"School {i:03}", location="London, UK", latitude=51.5, longitude=-0.1)
+            for i in range(SCHOOLS_PER_PAGE + 5)
+        )
+        cursor = self.client.get(reverse('school_list')).context['next_cursor']
+        
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('school_list'), {'after': cursor})
+        
+        self.assertEqual(len(response.context['schools']), 5)
+    
+    def test_sort_by_latest_pm10(self):
+        """Test that the worst PM10 comes first and schools without data last"""
+        for name, value in [("Low", 10.0), ("High", 50.0), ("None", None), ("Mid", 30.0)]:
+            school = School.objects.create(name=name, location="London, UK", latitude=51.5, longitude=-0.1)
+            if value is not None:
+                AirQualityReading.objects.create(school=school, pollutant='PM10', value=value, measured_at=timezone.now())
+        
+        names = [school.name for school in self.walk_pages(sort='pm10')]
+        
+        self.assertEqual(names, ["High", "Mid", "Low", "None"])
+    
+    def test_search_by_name_or_location(self):
+        """Test that q filters on name and location"""
+        School.objects.create(name="Camberwell School", location="London, UK", latitude=51.5, longitude=-0.1)
+        School.objects.create(name="Leeds School", location="Leeds, UK", latitude=53.8, longitude=-1.5)
+        
+        self.assertEqual([school.name for school in self.walk_pages(q='camber')], ["Camberwell School"])
+        self.assertEqual([school.name for school in self.walk_pages(q='leeds')], ["Leeds School"])
+    
+    def test_invalid_cursor_shows_first_page(self):
+        """Test that a tampered cursor falls back to the first page"""
+        School.objects.create(name="Camberwell School", location="London, UK", latitude=51.5, longitude=-0.1)
+        
+        response = self.client.get(reverse('school_list'), {'after': 'not-a-cursor'})
+        
+        self.assertEqual(len(response.context['schools']), 1)
+
+
+class ImportSchoolsViewTest(TestCase):
+    """Test bulk school import from an uploaded CSV - US-CREATE"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username='teacher', password='secret-pass-123')
+        self.client.force_login(self.user)
+    
+    def upload(self, text):
+        csv_file = SimpleUploadedFile('schools.csv', text.encode(), content_type='text/csv')
+        return self.client.post(reverse('import_schools'), {'csv_file': csv_file})
+    
+    def test_valid_file_creates_every_school(self):
+        """Test that a valid CSV adds all its schools for the uploading user"""
+        response = self.upload(
+            "name,location,latitude,longitude\n"
+            "Camberwell School,\"London, UK\",51.47,-0.09\n"
+            "Leeds School,\"Leeds, UK\",53.8,-1.55\n"
+        )
+        
+        self.assertRedirects(response, reverse('school_list'))
+        self.assertEqual(School.objects.filter(created_by=self.user).count(), 2)
+        self.assertEqual(School.objects.get(name="Leeds School").grid_cell, grid_cell(53.8, -1.55))
+    
+    def test_invalid_rows_are_reported_and_nothing_is_created(self):
+        """Test that one bad row rejects the whole file with per-line errors"""
+        School.objects.create(name="Leeds School", location="Leeds, UK", latitude=53.8, longitude=-1.55)
+        
+        response = self.upload(
+            "name,location,latitude,longitude\n"
+            "Camberwell School,\"London, UK\",51.47,-0.09\n"
+            "Nowhere School,Somewhere,north,-0.1\n"
+            "leeds school,\"Leeds, UK\",53.80001,-1.55\n"
+            "Camberwell School,\"London, UK\",51.47,-0.09\n"
+        )
+        
+        self.assertEqual(response.status_code, 200)
+        lines = [line for line, _ in response.context['errors']]
+        self.assertEqual(lines, [3, 4, 5])
+        self.assertContains(response, 'Duplicate of line 2')
+        self.assertEqual(School.objects.count(), 1)
+    
+    def test_missing_columns_are_rejected(self):
+        """Test that a file without the expected header is refused"""
+        response = self.upload("school,address\nCamberwell School,London\n")
+        
+        self.assertContains(response, 'Missing column(s): latitude, location, longitude, name')
+        self.assertEqual(School.objects.count(), 0)
+    
+    def test_login_required(self):
+        """Test that anonymous users are sent to log in"""
+        self.client.logout()
+        
+        response = self.client.get(reverse('import_schools'))
+        
+        self.assertEqual(response.status_code, 302)
+
+
+class ReadingAdminTest(TestCase):
+    """Test that the readings changelist stays cheap on a large table"""
+    
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(User.objects.create_superuser(username='admin', password='secret-pass-123'))
+        start = timezone.make_aware(datetime(2024, 11, 1))
+        self.schools = [
+            School.objects.create(name=f"School {i}", location="London, UK", latitude=51.4 + i / 100, longitude=-0.1)
+            for i in range(3)
+        ]
+        AirQualityReading.objects.bulk_insert_new(
+            AirQualityReading(school=school, pollutant='PM10', value=float(day), measured_at=start + timedelta(days=day * 20))
+            for school in self.schools
+            for day in range(10)
+        )
+        self.url = reverse('admin:monitoring_airqualityreading_changelist')
+    
+    def changelist(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return response
+    
+    def test_query_count_does_not_grow_with_rows(self):
+        """Test that school names are joined in rather than fetched per row"""
+        # Session, user, month filter bounds, bounded count, page of readings
+        with self.assertNumQueries(5) as queries:
+            self.changelist()
+        
+        # No unfiltered COUNT(*) for "N of M" and no DISTINCT date scan
+        sql = ' '.join(query['sql'] for query in queries.captured_queries)
+        self.assertNotIn('DISTINCT', sql)
+        self.assertIn('INNER JOIN "monitoring_school"', sql)
+    
+    def test_count_is_bounded(self):
+        """Test that the paginator stops counting at COUNT_LIMIT"""
+        with mock.patch('monitoring.admin.COUNT_LIMIT', 5):
+            response = self.changelist()
+        
+        self.assertEqual(response.context['cl'].result_count, 5)
+    
+    def test_school_filter_renders_only_the_selected_school(self):
+        """Test that the school filter is an autocomplete holding just the chosen school"""
+        school = self.schools[1]
+        
+        response = self.changelist(school=school.id)
+        
+        self.assertEqual(response.context['cl'].result_count, 10)
+        self.assertContains(response, 'admin-autocomplete')
+        self.assertContains(response, f'<option value="{school.id}" selected>School 1 (London, UK)</option>', html=True)
+        self.assertNotContains(response, 'School 2 (London, UK)</option>')
+        
+        # The widget searches schools through the admin's autocomplete endpoint
+        found = self.client.get(reverse('admin:autocomplete'), {
+            'app_label': 'monitoring', 'model_name': 'airqualityreading', 'field_name': 'school', 'term': 'School 2',
+        }).json()
+        self.assertEqual([result['text'] for result in found['results']], ['School 2 (London, UK)'])
+    
+    def test_month_filter_drills_down_by_range(self):
+        """Test that years, then months, filter on measured_at ranges"""
+        response = self.changelist(measured='2025')
+        
+        self.assertEqual(response.context['cl'].result_count, 3 * 6)
+        self.assertContains(response, 'March 2025')
+        self.assertNotContains(response, 'May 2025')
+        self.assertNotContains(response, 'December 2024')
+        
+        response = self.changelist(measured='2025-03')
+        self.assertEqual(response.context['cl'].result_count, 3 * 2)
+    
+    def test_bulk_delete_recounts_rollups(self):
+        """Test that deleting readings from the admin updates the rollups"""
+        school = self.schools[0]
+        ids = list(school.readings.filter(value__gte=5).values_list('id', flat=True))
+        
+        self.client.post(self.url, {'action': 'delete_selected', '_selected_action': ids, 'post': 'yes'})
+        
+        self.assertEqual(school.readings.count(), 5)
+        self.assertEqual(school.get_peak_reading('PM10'), 4.0)
+        self.assertEqual(school.get_average_reading('PM10'), 2.0)
+
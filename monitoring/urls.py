@@ -6,8 +6,14 @@ urlpatterns = [
     path('', views.map_view, name='map_view'),
     path('schools/', views.school_list, name='school_list'),
     path('schools/add/', views.add_school, name='add_school'),
+    path('schools/import/', views.import_schools_view, name='import_schools'),
     path('schools/<int:school_id>/edit/', views.edit_school, name='edit_school'),
     path('schools/<int:school_id>/delete/', views.delete_school, name='delete_school'),
+    path('api/schools/', views.api_schools, name='api_schools'),
+    path('api/schools/search/', views.api_school_search, name='api_school_search'),
+    path('api/clusters/', views.api_clusters, name='api_clusters'),
+    path('api/schools/<int:school_id>/history/', views.api_school_history, name='api_school_history'),
+    path('export/readings.csv', views.export_readings_csv, name='export_readings_csv'),
     path('signup/', views.signup_view, name='signup'),
     path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'),
     path('logout/', views.custom_logout, name='custom_logout'),
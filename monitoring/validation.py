@@ -0,0 +1,45 @@
+"""Input checks shared by the views and management commands"""
+import argparse
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from .models import AirQualityReading
+
+VALID_POLLUTANTS = {choice for choice, _ in AirQualityReading.POLLUTANT_CHOICES}
+
+
+def check_pollutants(pollutants):
+    """Raise ValueError naming any pollutant that is not one of POLLUTANT_CHOICES"""
+    unknown = set(pollutants or []) - VALID_POLLUTANTS
+    if unknown:
+        raise ValueError(f"Unknown pollutant(s): {', '.join(sorted(unknown))}")
+
+
+def positive_int(value):
+    """argparse type for a whole number above zero"""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer '{value}'")
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be positive, got {value}")
+    return number
+
+
+def positive_float(value):
+    """argparse type for a number above zero"""
+    try:
+        number = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid number '{value}'")
+    if not (math.isfinite(number) and number > 0):
+        raise argparse.ArgumentTypeError(f"must be a finite number above zero, got {value}")
+    return number
+
+
+def parse_date(value):
+    """argparse type for YYYY-MM-DD dates, returned as midnight UTC"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').replace(tzinfo=dt_timezone.utc)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date '{value}', expected YYYY-MM-DD")
@@ -1,55 +1,302 @@
+import hashlib
+import io
+from datetime import datetime, timedelta
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth import login, logout
-from .models import School, AirQualityReading
-from .forms import SchoolForm
+from django.db.models import Max, Q
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import condition, require_GET
+from .aqi import current_indices, overall_index
+from .cache import cache_is_shared, data_version, get_or_build
+from .clusters import MIN_ZOOM, MAX_ZOOM, build_clusters, in_bbox
+from .export import export_readings, iter_csv
+from .history import DEFAULT_POINTS, MAX_POINTS, reading_history
+from .models import School, AirQualityReading, grid_column, grid_row, pollutant_key
+from .pagination import keyset_page
+from .school_import import import_schools, read_school_csv
+from .validation import VALID_POLLUTANTS, check_pollutants
+from .forms import SchoolForm, SchoolImportForm
+
+# Pollutants shown on the map unless the API is asked for others
+MAP_POLLUTANTS = ['PM10', 'NO2']
+
+# School list orderings: ?sort= value -> (field, descending); worst air first
+SCHOOL_SORTS = {
+    'name': ('name', False),
+    'pm10': ('latest_pm10', True),
+    'no2': ('latest_no2', True),
+}
+
+SCHOOLS_PER_PAGE = 50
+
+# Map search: suggestions per request, and the shortest query worth sending
+SEARCH_RESULTS = 10
+SEARCH_MIN_LENGTH = 2
+
+# History shown when no range is asked for
+DEFAULT_HISTORY_DAYS = 30
+
+
+def school_marker(school, pollutants, indices):
+    """Map marker data for a school annotated by with_latest_readings(), with its current_indices() entry"""
+    daqi = {
+        pollutant: {key: summary[key] for key in ('index', 'band', 'colour')}
+        for pollutant, summary in indices.get(school.id, {}).items()
+    }
+    return {
+        'id': school.id,
+        'name': school.name,
+        'address': school.location,
+        'latitude': school.latitude,
+        'longitude': school.longitude,
+        'readings': {
+            pollutant: getattr(school, f'latest_{pollutant_key(pollutant)}')
+            for pollutant in pollutants
+        },
+        'daqi': daqi,
+        'overall': overall_index(daqi.values()),
+    }
+
+
+def build_markers(pollutants, cells=None):
+    """school_marker() for every school, or those in a (first_row, last_row, first_column, last_column) grid block"""
+    schools = School.objects.with_latest_readings(pollutants)
+    if cells:
+        schools = list(schools.within_grid(*cells))
+        indices = current_indices(pollutants, [school.id for school in schools])
+    else:
+        indices = current_indices(pollutants)
+    return [school_marker(school, pollutants, indices) for school in schools]
 
 
 def map_view(request):
     """Display interactive map with schools and pollution data - US-READ"""
-    schools = School.objects.all()
-    
-    schools_data = []
-    for school in schools:
-        # Get latest readings for PM10 and NO2
-        pm10_reading = AirQualityReading.objects.filter(
-            school=school,
-            pollutant='PM10'
-        ).order_by('-measured_at').first()
-        
-        no2_reading = AirQualityReading.objects.filter(
-            school=school,
-            pollutant='NO2'
-        ).order_by('-measured_at').first()
-        
-        school_dict = {
-            'name': school.name,
-            'address': school.location,
-            'latitude': school.latitude,
-            'longitude': school.longitude,
-            'readings': {
-                'PM10': pm10_reading.value if pm10_reading else None,
-                'NO2': no2_reading.value if no2_reading else None
-            }
+    # Markers come from api_clusters/api_schools for the visible area only
+    return render(request, 'map.html')
+
+
+def parse_map_query(request):
+    """Read bbox and pollutants from the query string, raising ValueError if invalid.
+
+    bbox uses Leaflet's toBBoxString() order: west,south,east,north.
+    """
+    bbox = request.GET.get('bbox')
+    if bbox:
+        west, south, east, north = (float(part) for part in bbox.split(','))
+        if south > north or west > east:
+            raise ValueError("bbox must be west,south,east,north")
+        bbox = (west, south, east, north)
+
+    pollutants = request.GET.get('pollutants')
+    pollutants = pollutants.split(',') if pollutants else MAP_POLLUTANTS
+    check_pollutants(pollutants)
+
+    return bbox, pollutants
+
+
+def map_data_state(request):
+    """Newest measured_at and school count, computed once per request for ETag/Last-Modified"""
+    if not hasattr(request, '_map_data_state'):
+        newest = AirQualityReading.objects.aggregate(newest=Max('measured_at'))['newest']
+        request._map_data_state = (newest, School.objects.count())
+    return request._map_data_state
+
+
+def map_data_etag(request):
+    newest, school_count = map_data_state(request)
+    stamp = newest.timestamp() if newest else 0
+    key = f"{stamp}-{school_count}-{request.GET.urlencode()}"
+    # The data version also changes when a school is edited in place, but a
+    # per-process cache holds a different one in every worker
+    if cache_is_shared():
+        key = f"{data_version()}-{key}"
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def map_data_last_modified(request):
+    return map_data_state(request)[0]
+
+
+@require_GET
+@gzip_page
+@cache_control(max_age=60)
+@condition(etag_func=map_data_etag, last_modified_func=map_data_last_modified)
+def api_schools(request):
+    """School markers with latest readings, optionally limited to a bounding box - US-READ"""
+    try:
+        bbox, pollutants = parse_map_query(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    if bbox:
+        # Viewports over the same grid cells share one cached marker list
+        west, south, east, north = bbox
+        cells = (grid_row(south), grid_row(north), grid_column(west), grid_column(east))
+        markers = get_or_build('schools', lambda: build_markers(pollutants, cells), ','.join(pollutants), *cells)
+        markers = [marker for marker in markers if in_bbox(marker, bbox)]
+    else:
+        markers = get_or_build('schools', lambda: build_markers(pollutants), ','.join(pollutants))
+    
+    return JsonResponse({'schools': markers})
+
+
+
+@require_GET
+@gzip_page
+@cache_control(max_age=60)
+@condition(etag_func=map_data_etag, last_modified_func=map_data_last_modified)
+def api_clusters(request):
+    """Schools grouped into grid clusters for a zoom level, optionally limited to a bounding box - US-READ"""
+    try:
+        bbox, pollutants = parse_map_query(request)
+        zoom = min(max(int(request.GET.get('zoom', MIN_ZOOM)), MIN_ZOOM), MAX_ZOOM)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    # Every viewport at this zoom shares one cached clustering
+    clusters = get_or_build('clusters', lambda: build_clusters(zoom, pollutants), zoom, ','.join(pollutants))
+    if bbox:
+        clusters = [cluster for cluster in clusters if in_bbox(cluster, bbox)]
+    
+    return JsonResponse({'zoom': zoom, 'clusters': clusters})
+
+
+@require_GET
+@cache_control(max_age=60)
+def api_school_search(request):
+    """Schools whose name or location matches ?q=, for the map's search box - US-READ"""
+    query = request.GET.get('q', '').strip()
+    if len(query) < SEARCH_MIN_LENGTH:
+        return JsonResponse({'schools': []})
+
+    schools = (
+        School.objects.filter(Q(name__icontains=query) | Q(location__icontains=query))
+        .order_by('name', 'id')
+        .values('id', 'name', 'location', 'latitude', 'longitude')[:SEARCH_RESULTS]
+    )
+    return JsonResponse({'schools': [
+        {
+            'id': school['id'],
+            'name': school['name'],
+            'address': school['location'],
+            'latitude': school['latitude'],
+            'longitude': school['longitude'],
         }
-        
-        schools_data.append(school_dict)
+        for school in schools
+    ]})
+
+
+def parse_moment(value):
+    """An aware datetime from an ISO date or datetime, raising ValueError if invalid"""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f"Invalid date '{value}'")
+        moment = datetime.combine(day, datetime.min.time())
+    return timezone.make_aware(moment) if timezone.is_naive(moment) else moment
+
+
+def parse_history_query(request):
+    """Read pollutant, from, to and points from the query string, raising ValueError if invalid"""
+    pollutant = request.GET.get('pollutant', 'PM2.5')
+    if pollutant not in VALID_POLLUTANTS:
+        raise ValueError(f"Unknown pollutant: {pollutant}")
+
+    until = parse_moment(request.GET['to']) if request.GET.get('to') else timezone.now()
+    since = parse_moment(request.GET['from']) if request.GET.get('from') else until - timedelta(days=DEFAULT_HISTORY_DAYS)
+    if since >= until:
+        raise ValueError("from must be before to")
+
+    points = int(request.GET.get('points', DEFAULT_POINTS))
+    if not 2 <= points <= MAX_POINTS:
+        raise ValueError(f"points must be between 2 and {MAX_POINTS}")
+
+    return pollutant, since, until, points
+
+
+@require_GET
+@gzip_page
+@cache_control(max_age=60)
+def api_school_history(request, school_id):
+    """A school's readings for one pollutant over time, downsampled for charts - US-7"""
+    school = get_object_or_404(School, id=school_id)
+    try:
+        pollutant, since, until, points = parse_history_query(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    context = {
-        'schools_data': schools_data  # Pass Python list directly, not JSON string
-    }
+    source, history = reading_history(school, pollutant, since, until, points)
+    
+    return JsonResponse({
+        'school': school.id,
+        'pollutant': pollutant,
+        'from': since,
+        'to': until,
+        'source': source,
+        'points': [[moment, value] for moment, value in history],
+    })
+
+
+def parse_export_query(request):
+    """Read school, pollutants, from and to from the query string, raising ValueError if invalid"""
+    school_ids = [int(school_id) for school_id in request.GET.getlist('school')]
+
+    pollutants = request.GET.get('pollutants')
+    pollutants = pollutants.split(',') if pollutants else None
+    check_pollutants(pollutants)
+
+    since = parse_moment(request.GET['from']) if request.GET.get('from') else None
+    until = parse_moment(request.GET['to']) if request.GET.get('to') else None
+    if since and until and since >= until:
+        raise ValueError("from must be before to")
+
+    return school_ids, pollutants, since, until
+
+
+@require_GET
+def export_readings_csv(request):
+    """Stream readings as CSV, optionally filtered by school, pollutant and date range"""
+    try:
+        school_ids, pollutants, since, until = parse_export_query(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    return render(request, 'map.html', context)  # ✅ FIXED
+    readings = export_readings(school_ids, pollutants, since, until)
+    response = StreamingHttpResponse(iter_csv(readings), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="air_quality_readings.csv"'
+    return response
 
 
 def school_list(request):
-    """List all schools with edit/delete options - US-READ"""
-    schools = School.objects.all().order_by('name')
+    """List schools a page at a time with edit/delete options - US-READ"""
+    sort = request.GET.get('sort', 'name')
+    if sort not in SCHOOL_SORTS:
+        sort = 'name'
+    query = request.GET.get('q', '').strip()
+    
+    # Latest, average and peak PM10/NO2 for the page's schools in one query
+    schools = School.objects.with_stats(MAP_POLLUTANTS)
+    if query:
+        schools = schools.filter(Q(name__icontains=query) | Q(location__icontains=query))
+    
+    field, descending = SCHOOL_SORTS[sort]
+    cursor = request.GET.get('after')
+    page, next_cursor = keyset_page(schools, field, descending, cursor, SCHOOLS_PER_PAGE)
     
     context = {
-        'schools': schools,
+        'schools': page,
+        'sort': sort,
+        'query': query,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
     }
     return render(request, 'school_list.html', context)  # ✅ FIXED
 
@@ -99,6 +346,33 @@ def add_school(request):
     return render(request, 'add_school.html', context)  # ✅ FIXED
 
 
+@login_required
+def import_schools_view(request):
+    """Add many schools from an uploaded CSV, all or none - US-CREATE"""
+    errors = []
+    if request.method == 'POST':
+        form = SchoolImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            try:
+                rows = read_school_csv(io.TextIOWrapper(form.cleaned_data['csv_file'], encoding='utf-8-sig', newline=''))
+            except (UnicodeDecodeError, ValueError) as e:
+                form.add_error('csv_file', f'Could not read the file: {e}')
+            else:
+                result = import_schools(rows, request.user)
+                if not result.errors:
+                    messages.success(request, f'✓ {len(result.schools)} schools have been added successfully!')
+                    return redirect('school_list')
+                errors = result.errors
+    else:
+        form = SchoolImportForm()
+    
+    context = {
+        'form': form,
+        'errors': errors,
+    }
+    return render(request, 'import_schools.html', context)
+
+
 @login_required
 def edit_school(request, school_id):
     """Edit existing school details - US-UPDATE"""
@@ -95,6 +95,29 @@ else:
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Holds the versioned map markers and clusters. Set CACHE_DIR to use a
+# file-based cache that the web server and fetch_air_quality share, so an
+# ingest invalidates the map immediately rather than after a timeout. The
+# default is per process, so the map's ETags then leave out the data version.
+
+if 'CACHE_DIR' in os.environ:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.environ.get('CACHE_DIR'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'schools-airquality',
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 